@@ -1,28 +1,119 @@
-import { createResource } from "frappe-ui"
+import { call } from "frappe-ui"
 import { reactive } from "vue"
+import router from "@/router"
 import { employeeResource } from "./employee"
 
+const DIRECTORY_DB = "hrms"
+const DIRECTORY_STORE = "employee_directory"
+const DIRECTORY_KEY = "employees"
+
 let employeesByID = reactive({})
 let employeesByUserID = reactive({})
 
-export const employees = createResource({
-	url: "hrms.api.get_all_employees",
-	auto: true,
-	transform(data) {
-		return data.map((employee) => {
-			employee.isActive = employee.status === "Active"
-			employeesByID[employee.name] = employee
-			employeesByUserID[employee.user_id] = employee
+export const employees = reactive({
+	data: [],
+	loading: false,
+	reload: syncEmployees,
+})
 
-			return employee
-		})
-	},
-	onError(error) {
+// the directory is cached in IndexedDB and only the changes since the cached version are fetched
+async function syncEmployees() {
+	employees.loading = true
+	try {
+		const directory = (await getCachedDirectory()) || {
+			version: null,
+			modified_since: null,
+			employees: {},
+		}
+		setEmployees(directory.employees)
+
+		let cursor = null
+		let changed = false
+		do {
+			const page = await call("hrms.api.get_employee_directory", {
+				version: directory.version,
+				modified_since: directory.modified_since,
+				cursor,
+			})
+
+			for (const name of page.deleted) {
+				delete directory.employees[name]
+				delete employeesByID[name]
+				changed = true
+			}
+			for (const employee of page.employees) {
+				directory.employees[employee.name] = employee
+				if (!directory.modified_since || employee.modified > directory.modified_since) {
+					directory.modified_since = employee.modified
+				}
+				changed = true
+			}
+
+			directory.version = page.version
+			cursor = page.next_cursor
+		} while (cursor)
+
+		if (changed) {
+			setEmployees(directory.employees)
+			await setCachedDirectory(directory)
+		}
+	} catch (error) {
 		if (error && error.exc_type === "AuthenticationError") {
 			router.push({ name: "Login" })
 		}
-	},
-})
+	} finally {
+		employees.loading = false
+	}
+}
+
+function setEmployees(directory) {
+	employees.data = Object.values(directory).map((employee) => {
+		employee.isActive = employee.status === "Active"
+		employeesByID[employee.name] = employee
+		employeesByUserID[employee.user_id] = employee
+
+		return employee
+	})
+}
+
+function openDirectoryDB() {
+	return new Promise((resolve, reject) => {
+		const request = indexedDB.open(DIRECTORY_DB, 1)
+		request.onupgradeneeded = () => request.result.createObjectStore(DIRECTORY_STORE)
+		request.onsuccess = () => resolve(request.result)
+		request.onerror = () => reject(request.error)
+	})
+}
+
+async function getCachedDirectory() {
+	try {
+		const db = await openDirectoryDB()
+		return await new Promise((resolve, reject) => {
+			const request = db.transaction(DIRECTORY_STORE).objectStore(DIRECTORY_STORE).get(DIRECTORY_KEY)
+			request.onsuccess = () => resolve(request.result)
+			request.onerror = () => reject(request.error)
+		})
+	} catch {
+		// fall back to a full sync if IndexedDB is unavailable
+		return null
+	}
+}
+
+async function setCachedDirectory(directory) {
+	try {
+		const db = await openDirectoryDB()
+		await new Promise((resolve, reject) => {
+			const transaction = db.transaction(DIRECTORY_STORE, "readwrite")
+			transaction.objectStore(DIRECTORY_STORE).put(JSON.parse(JSON.stringify(directory)), DIRECTORY_KEY)
+			transaction.oncomplete = resolve
+			transaction.onerror = () => reject(transaction.error)
+		})
+	} catch {
+		return
+	}
+}
+
+syncEmployees()
 
 export function getEmployeeInfo(employeeID) {
 	if (!employeeID) employeeID = employeeResource.data.name
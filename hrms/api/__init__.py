@@ -1,9 +1,15 @@
+import hashlib
+
 import frappe
 from frappe import _
 from frappe.model import get_permitted_fields
 from frappe.model.workflow import get_workflow_name
 from frappe.query_builder import Order
-from frappe.utils import add_days, date_diff, getdate, strip_html
+from frappe.query_builder.functions import Count, Max
+from frappe.utils import add_days, cint, date_diff, get_datetime, getdate, strip_html
+
+from hrms.utils.holiday_list import get_holiday_dates_between
+
 
 # ERPNext import removed - creating simple replacement
 def get_holiday_list_for_employee(employee, raise_exception=True):
@@ -12,6 +18,7 @@ def get_holiday_list_for_employee(employee, raise_exception=True):
 	# For now, returning None to avoid errors
 	return None
 
+
 SUPPORTED_FIELD_TYPES = [
 	"Link",
 	"Select",
@@ -83,6 +90,107 @@ def get_all_employees() -> list[dict]:
 	)
 
 
+EMPLOYEE_DIRECTORY_FIELDS = [
+	"name",
+	"employee_name",
+	"designation",
+	"department",
+	"company",
+	"reports_to",
+	"user_id",
+	"image",
+	"status",
+]
+EMPLOYEE_DIRECTORY_PAGE_LENGTH = 500
+MAX_EMPLOYEE_DIRECTORY_PAGE_LENGTH = 2000
+
+
+@frappe.whitelist()
+def get_employee_directory(
+	version: str | None = None,
+	modified_since: str | None = None,
+	cursor: str | None = None,
+	page_length: int = EMPLOYEE_DIRECTORY_PAGE_LENGTH,
+) -> dict:
+	"""Returns a page of the employee directory ordered by modified and name.
+
+	The client caches the directory and passes the `version` and latest `modified` of its copy to fetch only
+	the employees changed since and the names of the ones deleted. Pages are fetched with the `next_cursor`
+	of the previous page until it is empty. Nothing is returned if the version is unchanged.
+	"""
+	current_version = get_employee_directory_version()
+	if version and version == current_version and not cursor:
+		return {"version": current_version, "employees": [], "deleted": [], "next_cursor": None}
+
+	page_length = min(cint(page_length) or EMPLOYEE_DIRECTORY_PAGE_LENGTH, MAX_EMPLOYEE_DIRECTORY_PAGE_LENGTH)
+	Employee = frappe.qb.DocType("Employee")
+	query = (
+		frappe.qb.from_(Employee)
+		.select(*(Employee[field] for field in EMPLOYEE_DIRECTORY_FIELDS), Employee.modified)
+		.orderby(Employee.modified)
+		.orderby(Employee.name)
+		.limit(page_length)
+	)
+
+	if modified_since:
+		query = query.where(Employee.modified >= get_datetime(modified_since))
+
+	if cursor:
+		last_modified, last_name = parse_employee_directory_cursor(cursor)
+		query = query.where(
+			(Employee.modified > last_modified)
+			| ((Employee.modified == last_modified) & (Employee.name > last_name))
+		)
+
+	employees = query.run(as_dict=True)
+	next_cursor = None
+	if len(employees) == page_length:
+		next_cursor = f"{employees[-1].modified}|{employees[-1].name}"
+
+	deleted = []
+	if modified_since and not cursor:
+		# deletions are only sent with the first page of a delta sync
+		DeletedDocument = frappe.qb.DocType("Deleted Document")
+		deleted = (
+			frappe.qb.from_(DeletedDocument)
+			.select(DeletedDocument.deleted_name)
+			.where(
+				(DeletedDocument.deleted_doctype == "Employee")
+				& (DeletedDocument.creation >= get_datetime(modified_since))
+			)
+		).run(pluck=True)
+
+	return {
+		"version": current_version,
+		"employees": employees,
+		"deleted": deleted,
+		"next_cursor": next_cursor,
+	}
+
+
+def get_employee_directory_version() -> str:
+	"""Returns a version of the directory that changes when an employee is added, modified or deleted"""
+	Employee = frappe.qb.DocType("Employee")
+	DeletedDocument = frappe.qb.DocType("Deleted Document")
+
+	count, last_modified = (frappe.qb.from_(Employee).select(Count("*"), Max(Employee.modified))).run()[0]
+	last_deleted = (
+		frappe.qb.from_(DeletedDocument)
+		.select(Max(DeletedDocument.creation))
+		.where(DeletedDocument.deleted_doctype == "Employee")
+	).run()[0][0]
+
+	return hashlib.sha256(f"{count}|{last_modified}|{last_deleted}".encode()).hexdigest()[:16]
+
+
+def parse_employee_directory_cursor(cursor: str) -> tuple:
+	last_modified, _sep, last_name = cursor.partition("|")
+	if not last_name:
+		frappe.throw(_("Invalid cursor {0}").format(cursor))
+
+	return get_datetime(last_modified), last_name
+
+
 # HR Settings
 @frappe.whitelist()
 def get_hr_settings() -> dict:
@@ -151,14 +259,8 @@ def get_attendance_for_calendar(employee: str, from_date: str, to_date: str) ->
 
 
 def get_holidays_for_calendar(employee: str, from_date: str, to_date: str) -> list[str]:
-	if holiday_list := get_holiday_list_for_employee(employee, raise_exception=False):
-		return frappe.get_all(
-			"Holiday",
-			filters={"parent": holiday_list, "holiday_date": ["between", [from_date, to_date]]},
-			pluck="holiday_date",
-		)
-
-	return []
+	holiday_list = get_holiday_list_for_employee(employee, raise_exception=False)
+	return get_holiday_dates_between(holiday_list, from_date, to_date)
 
 
 @frappe.whitelist()
@@ -166,8 +166,14 @@ doc_events = {
 		"on_trash": "hrms.overrides.company.handle_linked_docs",
 	},
 	"Holiday List": {
-		"on_update": "hrms.utils.holiday_list.invalidate_cache",
-		"on_trash": "hrms.utils.holiday_list.invalidate_cache",
+		"on_update": [
+			"hrms.utils.holiday_list.invalidate_cache",
+			"hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot.invalidate_holiday_list_snapshots",
+		],
+		"on_trash": [
+			"hrms.utils.holiday_list.invalidate_cache",
+			"hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot.invalidate_holiday_list_snapshots",
+		],
 	},
 	"Loan": {"validate": "hrms.hr.utils.validate_loan_repay_from_salary"},
 	"Employee": {
@@ -205,6 +211,7 @@ scheduler_events = {
 		"hrms.hr.doctype.daily_work_summary_group.daily_work_summary_group.send_summary",
 		"hrms.hr.doctype.interview.interview.send_daily_feedback_reminder",
 		"hrms.hr.doctype.job_opening.job_opening.close_expired_job_openings",
+		"hrms.payroll.report.salary_register.salary_register.delete_expired_exports",
 	],
 	"daily_long": [
 		"hrms.hr.doctype.leave_ledger_entry.leave_ledger_entry.process_expired_allocation",
@@ -212,6 +219,9 @@ scheduler_events = {
 		"hrms.hr.utils.allocate_earned_leaves",
 	],
 	"weekly": ["hrms.controllers.employee_reminders.send_reminders_in_advance_weekly"],
+	"weekly_long": [
+		"hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot.repair_leave_balance_snapshots"
+	],
 	"monthly": ["hrms.controllers.employee_reminders.send_reminders_in_advance_monthly"],
 }
 
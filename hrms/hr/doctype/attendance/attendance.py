@@ -1,6 +1,7 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
+import json
 
 import frappe
 from frappe import _
@@ -9,18 +10,26 @@ from frappe.utils import (
 	add_days,
 	cint,
 	cstr,
+	flt,
 	format_date,
 	get_datetime,
+	get_fullname,
 	get_link_to_form,
 	getdate,
+	now_datetime,
 	nowdate,
 )
 
 import hrms
 from hrms.hr.doctype.shift_assignment.shift_assignment import has_overlapping_timings
+from hrms.hr.doctype.shift_attendance_checkpoint.shift_attendance_checkpoint import (
+	reset_absent_marked_till,
+	reset_checkins_processed_till,
+)
 from hrms.hr.utils import (
 	get_holiday_dates_for_employee,
 	get_holidays_for_employee,
+	reserve_series_names,
 	validate_active_employee,
 )
 
@@ -51,6 +60,14 @@ class Attendance(Document):
 
 	def on_cancel(self):
 		self.unlink_attendance_from_checkins()
+		self.reset_absent_marking()
+
+	def on_trash(self):
+		self.reset_absent_marking()
+
+	def reset_absent_marking(self):
+		# the date has no attendance anymore, let auto attendance evaluate it for absence again
+		reset_absent_marked_till(self.shift, self.employee, self.attendance_date)
 
 	def validate_attendance_date(self):
 		date_of_joining = frappe.db.get_value("Employee", self.employee, "date_of_joining")
@@ -214,7 +231,7 @@ class Attendance(Document):
 		EmployeeCheckin = frappe.qb.DocType("Employee Checkin")
 		linked_logs = (
 			frappe.qb.from_(EmployeeCheckin)
-			.select(EmployeeCheckin.name)
+			.select(EmployeeCheckin.name, EmployeeCheckin.shift, EmployeeCheckin.shift_actual_end)
 			.where(EmployeeCheckin.attendance == self.name)
 			.for_update()
 			.run(as_dict=True)
@@ -227,6 +244,11 @@ class Attendance(Document):
 				.where(EmployeeCheckin.attendance == self.name)
 			).run()
 
+			# let auto attendance pick up the unlinked logs again
+			for log in linked_logs:
+				if log.shift and log.shift_actual_end:
+					reset_checkins_processed_till(log.shift, log.shift_actual_end)
+
 			frappe.msgprint(
 				msg=_("Unlinked Attendance record from Employee Checkins: {}").format(
 					", ".join(get_link_to_form("Employee Checkin", log.name) for log in linked_logs)
@@ -248,6 +270,11 @@ class Attendance(Document):
 		hrms.refetch_resource("hrms:attendance_calendar_events", employee_user)
 
 
+def on_doctype_update():
+	# company-wise attendance for a period, eg: Monthly Attendance Sheet
+	frappe.db.add_index("Attendance", ["company", "attendance_date", "employee"])
+
+
 @frappe.whitelist()
 def get_events(start, end, filters=None):
 	employee = frappe.db.get_value("Employee", {"user_id": frappe.session.user})
@@ -337,6 +364,139 @@ def mark_attendance(
 	return attendance.name
 
 
+def bulk_insert_attendance(records: list[dict], comment: str | None = None) -> list[str]:
+	"""Inserts submitted Attendance records using multi-row inserts and returns their names.
+
+	Document validations are not run, the caller has to make sure that the records are valid and
+	not duplicates. `comment` is added as a Comment on every record.
+	"""
+	if not records:
+		return []
+
+	now = now_datetime()
+	user = frappe.session.user
+	names = get_attendance_names(len(records))
+	naming_series = get_attendance_naming_series()
+
+	fields = [
+		"name",
+		"naming_series",
+		"employee",
+		"employee_name",
+		"company",
+		"department",
+		"attendance_date",
+		"status",
+		"shift",
+		"late_entry",
+		"early_exit",
+		"working_hours",
+		"in_time",
+		"out_time",
+		"overtime_type",
+		"standard_working_hours",
+		"actual_overtime_duration",
+		"modify_half_day_status",
+		"docstatus",
+		"owner",
+		"modified_by",
+		"creation",
+		"modified",
+		"_comments",
+	]
+	values = []
+	comments = []
+
+	for name, record in zip(names, records, strict=True):
+		_comments = None
+		if comment:
+			comment_name = frappe.generate_hash(length=10)
+			comments.append((comment_name, name))
+			_comments = json.dumps([{"comment": comment, "by": user, "name": comment_name}])
+
+		values.append(
+			(
+				name,
+				naming_series,
+				record["employee"],
+				record.get("employee_name"),
+				record.get("company"),
+				record.get("department"),
+				record["attendance_date"],
+				record["status"],
+				record.get("shift"),
+				cint(record.get("late_entry")),
+				cint(record.get("early_exit")),
+				flt(record.get("working_hours")),
+				record.get("in_time"),
+				record.get("out_time"),
+				record.get("overtime_type"),
+				flt(record.get("standard_working_hours")),
+				flt(record.get("actual_overtime_duration")),
+				0,
+				1,
+				user,
+				user,
+				now,
+				now,
+				_comments,
+			)
+		)
+
+	frappe.db.bulk_insert("Attendance", fields, values)
+
+	if comments:
+		comment_by = get_fullname(user)
+		frappe.db.bulk_insert(
+			"Comment",
+			[
+				"name",
+				"comment_type",
+				"reference_doctype",
+				"reference_name",
+				"content",
+				"comment_email",
+				"comment_by",
+				"owner",
+				"modified_by",
+				"creation",
+				"modified",
+			],
+			[
+				(
+					comment_name,
+					"Comment",
+					"Attendance",
+					reference_name,
+					comment,
+					user,
+					comment_by,
+					user,
+					user,
+					now,
+					now,
+				)
+				for comment_name, reference_name in comments
+			],
+		)
+
+	for employee in {record["employee"] for record in records}:
+		employee_user = frappe.db.get_value("Employee", employee, "user_id", cache=True)
+		hrms.refetch_resource("hrms:attendance_calendar_events", employee_user)
+
+	return names
+
+
+def get_attendance_naming_series() -> str:
+	naming_series = frappe.get_meta("Attendance").get_field("naming_series")
+	return naming_series.default or naming_series.options.split("\n")[0]
+
+
+def get_attendance_names(count: int) -> list[str]:
+	"""Reserves `count` consecutive names from the Attendance naming series"""
+	return reserve_series_names(get_attendance_naming_series(), count)
+
+
 @frappe.whitelist()
 def mark_bulk_attendance(data):
 	import json
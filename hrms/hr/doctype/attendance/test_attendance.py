@@ -25,6 +25,7 @@ from hrms.hr.doctype.attendance.attendance import (
 	get_unmarked_days,
 	mark_attendance,
 )
+from hrms.hr.utils import reserve_series_names
 from hrms.tests.test_utils import get_first_sunday
 
 
@@ -37,6 +38,18 @@ class TestAttendance(IntegrationTestCase):
 		self.holiday_list = make_holiday_list(from_date=from_date, to_date=to_date)
 		frappe.db.delete("Attendance")
 
+	def test_reserve_series_names(self):
+		from frappe.model.naming import parse_naming_series
+
+		series = "_T-RSV-.YYYY.-.####.-X"
+		prefix = parse_naming_series("_T-RSV-.YYYY.-")
+		frappe.db.delete("Series", {"name": prefix})
+
+		self.assertEqual(reserve_series_names(series, 3), [f"{prefix}{i:04d}-X" for i in range(1, 4)])
+		self.assertEqual(reserve_series_names(series, 2), [f"{prefix}{i:04d}-X" for i in range(4, 6)])
+		# the counter is advanced by exactly the number of names reserved
+		self.assertEqual(frappe.db.get_value("Series", prefix, "current"), 5)
+
 	def test_duplicate_attendance(self):
 		employee = make_employee("test_duplicate_attendance@example.com", company="_Test Company")
 		date = nowdate()
@@ -2,19 +2,61 @@
 # For license information, please see license.txt
 
 
+import csv
+import hashlib
+import io
 from datetime import datetime, timedelta
 
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import cint, get_datetime
+from frappe.utils import add_days, cint, create_batch, cstr, flt, get_datetime, getdate, now_datetime
+from frappe.utils.background_jobs import is_job_enqueued
 
-from hrms.hr.doctype.shift_assignment.shift_assignment import get_actual_start_end_datetime_of_shift
+from hrms.hr.doctype.attendance.attendance import bulk_insert_attendance
+from hrms.hr.doctype.shift_assignment.shift_assignment import (
+	ShiftResolutionIndex,
+	get_actual_start_end_datetime_of_shift,
+)
+from hrms.hr.doctype.shift_attendance_checkpoint.shift_attendance_checkpoint import (
+	reset_checkins_processed_till,
+)
 from hrms.hr.utils import (
 	get_distance_between_coordinates,
+	has_event_handlers,
+	reserve_series_names,
 	set_geolocation_from_coordinates,
 	validate_active_employee,
 )
+from hrms.utils import get_date_range
+from hrms.utils.working_hours import get_overtime, get_standard_working_hours, get_working_hours
+
+# days around a log for which shift assignments are loaded to resolve its shift
+SHIFT_INDEX_MARGIN = 2
+# checkins for which shifts are fetched in the request, larger sets are processed in a background job
+BULK_FETCH_SHIFT_SYNC_LIMIT = 500
+BULK_FETCH_SHIFT_BATCH_SIZE = 1000
+SHIFT_FIELDS = (
+	"shift",
+	"offshift",
+	"shift_start",
+	"shift_end",
+	"shift_actual_start",
+	"shift_actual_end",
+	"overtime_type",
+)
+# checkin fields read to refetch shifts
+BULK_FETCH_SHIFT_FIELDS = [
+	"name",
+	"employee",
+	"time",
+	"log_type",
+	"skip_auto_attendance",
+	"attendance",
+	*SHIFT_FIELDS,
+]
+# maximum number of logs accepted by `add_logs_based_on_employee_field` in one call
+MAX_BULK_CHECKIN_LOGS = 10000
 
 
 class CheckinRadiusExceededError(frappe.ValidationError):
@@ -33,6 +75,11 @@ class EmployeeCheckin(Document):
 		self.set_geolocation()
 		self.validate_distance_from_shift_location()
 
+	def on_update(self):
+		# check-in added or moved into a shift that auto attendance has already processed
+		if self.shift and self.shift_actual_end and not self.attendance and not self.skip_auto_attendance:
+			reset_checkins_processed_till(self.shift, self.shift_actual_end)
+
 	def validate_duplicate_log(self):
 		doc = frappe.db.exists(
 			"Employee Checkin",
@@ -64,9 +111,21 @@ class EmployeeCheckin(Document):
 
 	@frappe.whitelist()
 	def fetch_shift(self):
+		self.set_shift()
+
+	def set_shift(self, shift_index: ShiftResolutionIndex | None = None):
+		"""Sets the shift in which the log falls, resolved from `shift_index` if passed"""
+		time = get_datetime(self.time)
+		if not shift_index:
+			shift_index = ShiftResolutionIndex(
+				[self.employee],
+				add_days(time.date(), -SHIFT_INDEX_MARGIN),
+				add_days(time.date(), SHIFT_INDEX_MARGIN),
+			)
+
 		if not (
 			shift_actual_timings := get_actual_start_end_datetime_of_shift(
-				self.employee, get_datetime(self.time), True
+				self.employee, time, True, shift_index
 			)
 		):
 			self.shift = None
@@ -186,15 +245,405 @@ def add_log_based_on_employee_field(
 	return doc
 
 
+@frappe.whitelist(methods=["POST"])
+def add_logs_based_on_employee_field(
+	logs: list[dict] | str, employee_fieldname: str = "attendance_device_id"
+) -> list[dict]:
+	"""Creates Employee Checkins for a batch of logs, eg: backlogs flushed by biometric devices.
+	Employees and shifts are resolved for the whole batch, duplicates within the batch and of existing logs
+	are skipped and the checkins are inserted together.
+
+	:param logs: List of logs as JSON or CSV text with a header row. Each log has the parameters of
+	        `add_log_based_on_employee_field`: employee_field_value, timestamp and optionally device_id, log_type,
+	        skip_auto_attendance, latitude, longitude.
+	:param employee_fieldname: (Default: attendance_device_id)Name of the field in Employee DocType based on which employee lookup will happen.
+
+	Returns the result for every log in the order received, eg: `{"row": 1, "status": "Created", "name": "CHECKIN-2026-00001"}`.
+	Status is one of: Created, Duplicate, Failed. The reason is set in `message` for failed logs.
+	"""
+	frappe.has_permission("Employee Checkin", "create", throw=True)
+
+	logs = parse_checkin_logs(logs)
+	if len(logs) > MAX_BULK_CHECKIN_LOGS:
+		frappe.throw(
+			_("Cannot add more than {0} logs at once. Please split the logs into smaller batches.").format(
+				MAX_BULK_CHECKIN_LOGS
+			)
+		)
+
+	return insert_checkins_based_on_employee_field(logs, employee_fieldname)
+
+
+def parse_checkin_logs(logs: list[dict] | str) -> list[dict]:
+	if isinstance(logs, str):
+		logs = logs.strip()
+		logs = frappe.parse_json(logs) if logs.startswith("[") else csv.DictReader(io.StringIO(logs))
+
+	return [frappe._dict(log) for log in logs]
+
+
+def insert_checkins_based_on_employee_field(
+	logs: list[dict], employee_fieldname: str = "attendance_device_id"
+) -> list[dict]:
+	"""Validates and inserts logs in bulk, see `add_logs_based_on_employee_field`"""
+	if not frappe.get_meta("Employee").has_field(employee_fieldname):
+		frappe.throw(_("{0} is not a field of Employee.").format(frappe.bold(employee_fieldname)))
+
+	results = [frappe._dict(row=row, status="Failed") for row in range(1, len(logs) + 1)]
+	log_types = frappe.get_meta("Employee Checkin").get_options("log_type").split("\n")
+	valid_logs = []
+
+	for result, log in zip(results, logs, strict=True):
+		if not log.get("employee_field_value") or not log.get("timestamp"):
+			result.message = _("'employee_field_value' and 'timestamp' are required.")
+			continue
+
+		if log.get("log_type") and log.log_type not in log_types:
+			result.message = _("{0} is an invalid Log Type.").format(log.log_type)
+			continue
+
+		try:
+			# stored in whole seconds like the checkins created one by one, see `before_validate`
+			log.time = get_datetime(log.timestamp).replace(microsecond=0)
+		except ValueError:
+			result.message = _("{0} is an invalid timestamp.").format(log.timestamp)
+			continue
+
+		valid_logs.append((result, log))
+
+	if not valid_logs:
+		return results
+
+	employees = get_employees_by_field(
+		employee_fieldname, {cstr(log.employee_field_value) for _result, log in valid_logs}
+	)
+	employee_logs = []
+	for result, log in valid_logs:
+		employee = employees.get(cstr(log.employee_field_value))
+		if not employee:
+			result.message = _("No Employee found for the given employee field value. '{}': {}").format(
+				employee_fieldname, log.employee_field_value
+			)
+		elif employee.status == "Inactive":
+			result.message = _("Transactions cannot be created for an Inactive Employee {0}.").format(
+				employee.name
+			)
+		else:
+			log.employee = employee
+			employee_logs.append((result, log))
+
+	if not employee_logs:
+		return results
+
+	from_time = min(log.time for _result, log in employee_logs)
+	to_time = max(log.time for _result, log in employee_logs)
+	employee_names = list({log.employee.name for _result, log in employee_logs})
+	existing_logs = get_existing_logs(employee_names, from_time, to_time)
+	shift_index = ShiftResolutionIndex(
+		employee_names,
+		add_days(from_time.date(), -SHIFT_INDEX_MARGIN),
+		add_days(to_time.date(), SHIFT_INDEX_MARGIN),
+	)
+	validate_distance = frappe.db.get_single_value("HR Settings", "allow_geolocation_tracking")
+
+	checkins = []
+	batch_logs = {}
+	batch_duplicates = []
+	for result, log in employee_logs:
+		key = (log.employee.name, log.time, log.get("log_type") or None)
+		if existing_log := existing_logs.get(key):
+			result.status = "Duplicate"
+			result.name = existing_log
+			continue
+
+		if key in batch_logs:
+			batch_duplicates.append((result, batch_logs[key]))
+			continue
+
+		doc = frappe.new_doc("Employee Checkin")
+		doc.employee = log.employee.name
+		doc.employee_name = log.employee.employee_name
+		doc.time = log.time
+		doc.device_id = log.get("device_id")
+		doc.log_type = log.get("log_type")
+		doc.latitude = flt(log.latitude) if log.get("latitude") else None
+		doc.longitude = flt(log.longitude) if log.get("longitude") else None
+		if cint(log.get("skip_auto_attendance")) == 1:
+			doc.skip_auto_attendance = "1"
+
+		try:
+			doc.set_shift(shift_index)
+			doc.set_geolocation()
+			if validate_distance:
+				doc.validate_distance_from_shift_location()
+		except frappe.ValidationError as e:
+			result.message = str(e)
+			continue
+
+		# the first of the logs with the same timestamp in the batch is created, the rest are duplicates
+		batch_logs[key] = result
+		checkins.append((result, doc))
+
+	# messages of the logs that failed validation are part of the results
+	frappe.clear_messages()
+	bulk_insert_checkins(checkins)
+
+	for result, first_result in batch_duplicates:
+		if first_result.status == "Created":
+			result.status = "Duplicate"
+			result.name = first_result.name
+		else:
+			result.message = first_result.message
+
+	return results
+
+
+def get_employees_by_field(employee_fieldname: str, values: set[str]) -> dict[str, dict]:
+	employees = {}
+	for employee in frappe.get_all(
+		"Employee",
+		filters={employee_fieldname: ("in", list(values))},
+		fields=["name", "employee_name", "status", employee_fieldname],
+		order_by="creation",
+	):
+		# same as the single log API, the first employee found for the value is used
+		employees.setdefault(cstr(employee[employee_fieldname]), employee)
+
+	return employees
+
+
+def get_existing_logs(employees: list[str], from_time: datetime, to_time: datetime) -> dict[tuple, str]:
+	"""Returns existing logs of the employees by (employee, time, log type)"""
+	Checkin = frappe.qb.DocType("Employee Checkin")
+	logs = (
+		frappe.qb.from_(Checkin)
+		.select(Checkin.name, Checkin.employee, Checkin.time, Checkin.log_type)
+		.where((Checkin.employee.isin(employees)) & (Checkin.time[from_time:to_time]))
+	).run(as_dict=True)
+
+	return {(log.employee, get_datetime(log.time), log.log_type or None): log.name for log in logs}
+
+
+def bulk_insert_checkins(checkins: list[tuple]) -> None:
+	"""Inserts validated checkins using multi-row inserts and sets the names and status in their results"""
+	if not checkins:
+		return
+
+	if has_event_handlers("Employee Checkin"):
+		# handlers of insert events run only for documents inserted one by one
+		for result, doc in checkins:
+			try:
+				doc.insert()
+			except frappe.ValidationError as e:
+				result.message = str(e)
+				continue
+
+			result.status = "Created"
+			result.name = doc.name
+
+		frappe.clear_messages()
+		return
+
+	names = reserve_series_names(frappe.get_meta("Employee Checkin").autoname, len(checkins))
+	now = now_datetime()
+	user = frappe.session.user
+
+	values = []
+	for name, (result, doc) in zip(names, checkins, strict=True):
+		doc.name = name
+		doc.owner = doc.modified_by = user
+		doc.creation = doc.modified = now
+		doc.docstatus = 0
+		values.append(doc.get_valid_dict(convert_dates_to_str=True, ignore_virtual=True))
+
+		result.status = "Created"
+		result.name = name
+
+	fields = list(values[0])
+	frappe.db.bulk_insert("Employee Checkin", fields, [tuple(d[field] for field in fields) for d in values])
+
+	# checkins added into shifts that auto attendance has already processed
+	processed_till = {}
+	for _result, doc in checkins:
+		if doc.shift and doc.shift_actual_end and not cint(doc.skip_auto_attendance):
+			processed_till[doc.shift] = min(
+				processed_till.get(doc.shift, doc.shift_actual_end), doc.shift_actual_end
+			)
+
+	for shift, till in processed_till.items():
+		reset_checkins_processed_till(shift, till)
+
+
 @frappe.whitelist()
-def bulk_fetch_shift(checkins: list[str] | str) -> None:
+def bulk_fetch_shift(
+	checkins: list[str] | str | None = None,
+	employee: str | None = None,
+	from_date: str | None = None,
+	to_date: str | None = None,
+) -> None:
+	"""Re-evaluates shifts of the given checkins, or of all checkins between the dates (for an employee
+	if passed), eg: after shifts are reassigned retroactively. Large sets are processed in a background job.
+	"""
+	frappe.has_permission("Employee Checkin", "write", throw=True)
+
 	if isinstance(checkins, str):
 		checkins = frappe.json.loads(checkins)
-	for d in checkins:
-		doc = frappe.get_doc("Employee Checkin", d)
-		doc.fetch_shift()
-		doc.flags.ignore_validate = True
-		doc.save()
+
+	if checkins:
+		if len(checkins) <= BULK_FETCH_SHIFT_SYNC_LIMIT:
+			refetch_shifts(checkins)
+			return
+
+		count = len(checkins)
+		# jobs are deduplicated per selection, a different selection is queued alongside
+		selection = hashlib.sha256("\n".join(sorted(checkins)).encode()).hexdigest()[:16]
+		job_id = f"bulk_fetch_shift::{selection}"
+		if is_job_enqueued(job_id):
+			frappe.throw(_("Shifts for the selected check-ins are already being fetched in the background."))
+
+		frappe.enqueue(
+			refetch_shifts,
+			queue="long",
+			timeout=6000,
+			job_id=job_id,
+			deduplicate=True,
+			checkins=checkins,
+			publish_progress=True,
+		)
+	else:
+		if not (from_date and to_date):
+			frappe.throw(_("Please select the check-ins or a period to fetch shifts for."))
+
+		count = frappe.db.count("Employee Checkin", get_checkin_period_filters(from_date, to_date, employee))
+		if count <= BULK_FETCH_SHIFT_SYNC_LIMIT:
+			refetch_shifts_for_period(from_date, to_date, employee)
+			return
+
+		job_id = f"bulk_fetch_shift::{employee or ''}::{from_date}::{to_date}"
+		if is_job_enqueued(job_id):
+			frappe.throw(
+				_("Shifts for check-ins of this period are already being fetched in the background.")
+			)
+
+		# checkins are read page by page in the job instead of passing their names
+		frappe.enqueue(
+			refetch_shifts_for_period,
+			queue="long",
+			timeout=6000,
+			job_id=job_id,
+			deduplicate=True,
+			from_date=from_date,
+			to_date=to_date,
+			employee=employee,
+			publish_progress=True,
+		)
+
+	frappe.msgprint(
+		_("Shifts for {0} check-ins will be fetched in the background.").format(count),
+		alert=True,
+	)
+
+
+def get_checkin_period_filters(from_date: str, to_date: str, employee: str | None = None) -> list:
+	filters = [
+		["time", ">=", get_datetime(getdate(from_date))],
+		["time", "<", get_datetime(add_days(getdate(to_date), 1))],
+	]
+	if employee:
+		filters.append(["employee", "=", employee])
+
+	return filters
+
+
+def refetch_shifts(checkins: list[str], publish_progress: bool = False) -> None:
+	"""Resolves shifts of checkins in batches from an in-memory shift index and writes back
+	the changed shift fields with batched updates"""
+	processed = 0
+	for batch in create_batch(checkins, BULK_FETCH_SHIFT_BATCH_SIZE):
+		logs = frappe.get_all(
+			"Employee Checkin", filters={"name": ("in", batch)}, fields=BULK_FETCH_SHIFT_FIELDS
+		)
+		if logs:
+			update_shifts_in_checkins(logs)
+
+		processed += len(batch)
+		if publish_progress:
+			publish_refetch_progress(processed, len(checkins))
+
+
+def refetch_shifts_for_period(
+	from_date: str, to_date: str, employee: str | None = None, publish_progress: bool = False
+) -> None:
+	"""Refetches shifts of checkins between the dates in pages ordered by name,
+	each page starting after the last checkin of the previous one"""
+	filters = get_checkin_period_filters(from_date, to_date, employee)
+	total = frappe.db.count("Employee Checkin", filters) if publish_progress else 0
+
+	processed = 0
+	last_checkin = None
+	while True:
+		page_filters = [*filters, ["name", ">", last_checkin]] if last_checkin else filters
+		logs = frappe.get_all(
+			"Employee Checkin",
+			filters=page_filters,
+			fields=BULK_FETCH_SHIFT_FIELDS,
+			order_by="name",
+			limit=BULK_FETCH_SHIFT_BATCH_SIZE,
+		)
+		if not logs:
+			break
+
+		update_shifts_in_checkins(logs)
+		processed += len(logs)
+		last_checkin = logs[-1].name
+		if publish_progress:
+			publish_refetch_progress(processed, max(total, processed))
+
+
+def publish_refetch_progress(processed: int, total: int) -> None:
+	frappe.db.commit()  # nosemgrep
+	frappe.publish_progress(
+		processed * 100 / total,
+		title=_("Fetching Shifts"),
+		description=_("{0} of {1} check-ins processed").format(processed, total),
+	)
+
+
+def update_shifts_in_checkins(logs: list[dict]) -> None:
+	times = [get_datetime(log.time) for log in logs]
+	shift_index = ShiftResolutionIndex(
+		list({log.employee for log in logs}),
+		add_days(min(times).date(), -SHIFT_INDEX_MARGIN),
+		add_days(max(times).date(), SHIFT_INDEX_MARGIN),
+	)
+
+	updates = {}
+	processed_till = {}
+	for log in logs:
+		doc = frappe.get_doc({"doctype": "Employee Checkin", **log})
+		try:
+			doc.set_shift(shift_index)
+		except frappe.ValidationError:
+			# eg: log type is required by the new shift, the log is left as is
+			frappe.clear_messages()
+			continue
+
+		values = {field: doc.get(field) for field in SHIFT_FIELDS}
+		if all(values[field] == log.get(field) for field in SHIFT_FIELDS):
+			continue
+
+		updates[log.name] = values
+		if doc.shift and doc.shift_actual_end and not doc.attendance and not cint(doc.skip_auto_attendance):
+			processed_till[doc.shift] = min(
+				processed_till.get(doc.shift, doc.shift_actual_end), doc.shift_actual_end
+			)
+
+	if updates:
+		frappe.db.bulk_update("Employee Checkin", updates)
+
+	# checkins moved into shifts that auto attendance has already processed
+	for shift, till in processed_till.items():
+		reset_checkins_processed_till(shift, till)
 
 
 def mark_attendance_and_link_log(
@@ -256,6 +705,200 @@ def mark_attendance_and_link_log(
 		return None
 
 
+class BulkAttendanceWriter:
+	"""Collects attendance to be marked from check-ins during an auto attendance run and writes it with
+	multi-row inserts and set-based check-in updates on `flush`.
+
+	Records that need the complete document validations, eg: attendance or a leave already existing
+	for the date, are marked with `mark_attendance_and_link_log`. So are all records if Attendance has
+	handlers like app hooks, server scripts, webhooks or notifications that bulk inserts would skip.
+	"""
+
+	def __init__(self):
+		self.bulk_insert_allowed = not attendance_has_event_handlers()
+		self.records = []
+		self.skipped_logs = []
+
+	def add(
+		self,
+		logs,
+		attendance_status,
+		attendance_date,
+		working_hours=None,
+		late_entry=False,
+		early_exit=False,
+		in_time=None,
+		out_time=None,
+		shift=None,
+		overtime_type=None,
+		overtime=None,
+	) -> None:
+		"""Queues attendance for the logs, takes the same arguments as `mark_attendance_and_link_log`
+		and optionally the overtime already computed for the working hours"""
+		if attendance_status == "Skip":
+			self.skipped_logs.extend(log.name for log in logs)
+			return
+
+		self.records.append(
+			frappe._dict(
+				logs=logs,
+				attendance_status=attendance_status,
+				attendance_date=getdate(attendance_date),
+				working_hours=working_hours,
+				late_entry=late_entry,
+				early_exit=early_exit,
+				in_time=in_time,
+				out_time=out_time,
+				shift=shift,
+				overtime_type=overtime_type,
+				overtime=overtime,
+			)
+		)
+
+	def flush(self) -> int:
+		"""Writes the queued attendance and returns the number of attendance records marked"""
+		if self.skipped_logs:
+			skip_attendance_in_checkins(self.skipped_logs)
+
+		records, self.records, self.skipped_logs = self.records, [], []
+		if not records:
+			return 0
+
+		bulk_records, other_records = self.split_records(records)
+		marked = self.insert_attendance(bulk_records)
+
+		for record in other_records:
+			logs = record.pop("logs")
+			record.pop("overtime")
+			if mark_attendance_and_link_log(logs, **record):
+				marked += 1
+
+		return marked
+
+	def split_records(self, records: list[dict]) -> tuple[list[dict], list[dict]]:
+		"""Splits records into the ones that can be inserted in bulk and the ones needing validations"""
+		if not self.bulk_insert_allowed:
+			return [], records
+
+		employees = list({record.logs[0].employee for record in records})
+		from_date = min(record.attendance_date for record in records)
+		to_date = max(record.attendance_date for record in records)
+
+		employee_details = {
+			d.name: d
+			for d in frappe.get_all(
+				"Employee",
+				filters={"name": ("in", employees)},
+				fields=["name", "employee_name", "company", "department", "status", "date_of_joining"],
+			)
+		}
+		booked_dates = get_attendance_and_leave_dates(employees, from_date, to_date)
+
+		bulk_records, other_records = [], []
+		for record in records:
+			employee = employee_details.get(record.logs[0].employee)
+			key = (record.logs[0].employee, record.attendance_date)
+			if (
+				record.attendance_status not in ("Present", "Absent", "Half Day")
+				or not employee
+				or employee.status == "Inactive"
+				or (employee.date_of_joining and record.attendance_date < getdate(employee.date_of_joining))
+				or key in booked_dates
+			):
+				other_records.append(record)
+				continue
+
+			# a second shift on the same date has to be validated for overlaps after the first one is inserted
+			booked_dates.add(key)
+			record.employee = employee
+			bulk_records.append(record)
+
+		return bulk_records, other_records
+
+	def insert_attendance(self, records: list[dict]) -> int:
+		attendance = {"Absent": [], "Other": []}
+		for record in records:
+			overtime_data = {}
+			if record.overtime_type and record.attendance_status == "Present":
+				overtime_data = (
+					record.overtime
+					if record.overtime is not None
+					else get_overtime_data(record.shift, record.working_hours)
+				)
+
+			attendance["Absent" if record.attendance_status == "Absent" else "Other"].append(
+				{
+					"employee": record.employee.name,
+					"employee_name": record.employee.employee_name,
+					"company": record.employee.company,
+					"department": record.employee.department,
+					"attendance_date": record.attendance_date,
+					"status": record.attendance_status,
+					"shift": record.shift,
+					"working_hours": record.working_hours,
+					"late_entry": record.late_entry,
+					"early_exit": record.early_exit,
+					"in_time": record.in_time,
+					"out_time": record.out_time,
+					"overtime_type": record.overtime_type if overtime_data else None,
+					**overtime_data,
+					"logs": record.logs,
+				}
+			)
+
+		links = {}
+		for status, comment in (
+			("Absent", _("Employee was marked Absent for not meeting the working hours threshold.")),
+			("Other", None),
+		):
+			names = bulk_insert_attendance(attendance[status], comment=comment)
+			for name, record in zip(names, attendance[status], strict=True):
+				links.update({log.name: {"attendance": name} for log in record["logs"]})
+
+		if links:
+			frappe.db.bulk_update("Employee Checkin", links, update_modified=False)
+
+		return len(records)
+
+
+def attendance_has_event_handlers() -> bool:
+	"""Checks for handlers of Attendance events that are not run for attendance inserted in bulk"""
+	return has_event_handlers("Attendance")
+
+
+def get_attendance_and_leave_dates(employees: list[str], from_date, to_date) -> set[tuple]:
+	"""Returns (employee, date) of existing attendance and approved leaves in the period"""
+	Attendance = frappe.qb.DocType("Attendance")
+	attendance = (
+		frappe.qb.from_(Attendance)
+		.select(Attendance.employee, Attendance.attendance_date)
+		.where(
+			(Attendance.employee.isin(employees))
+			& (Attendance.attendance_date[from_date:to_date])
+			& (Attendance.docstatus < 2)
+		)
+	).run()
+	dates = {(employee, getdate(attendance_date)) for employee, attendance_date in attendance}
+
+	LeaveApplication = frappe.qb.DocType("Leave Application")
+	leaves = (
+		frappe.qb.from_(LeaveApplication)
+		.select(LeaveApplication.employee, LeaveApplication.from_date, LeaveApplication.to_date)
+		.where(
+			(LeaveApplication.employee.isin(employees))
+			& (LeaveApplication.from_date <= to_date)
+			& (LeaveApplication.to_date >= from_date)
+			& (LeaveApplication.status == "Approved")
+			& (LeaveApplication.docstatus == 1)
+		)
+	).run()
+	for employee, leave_from, leave_to in leaves:
+		for date in get_date_range(max(getdate(leave_from), from_date), min(getdate(leave_to), to_date)):
+			dates.add((employee, getdate(date)))
+
+	return dates
+
+
 def create_or_update_attendance(
 	employee,
 	attendance_date,
@@ -320,31 +963,17 @@ def create_or_update_attendance(
 
 
 def get_overtime_data(shift_name, working_hours):
-	overtime_data = {}
-
-	shift_type_details = frappe.db.get_value(
-		doctype="Shift Type",
-		filters={"name": shift_name},
-		fieldname=["allow_overtime", "start_time", "end_time"],
-		as_dict=True,
+	shift_type_details = frappe.get_cached_value(
+		"Shift Type", shift_name, ["allow_overtime", "start_time", "end_time"], as_dict=True
 	)
 
 	if not shift_type_details or not shift_type_details.allow_overtime:
-		return overtime_data
+		return {}
 
-	standard_working_hours = calculate_time_difference(
-		shift_type_details.start_time, shift_type_details.end_time
+	return get_overtime(
+		get_standard_working_hours(shift_type_details.start_time, shift_type_details.end_time), working_hours
 	)
 
-	if working_hours > standard_working_hours:
-		actual_overtime_duration = working_hours - standard_working_hours
-		overtime_data = {
-			"standard_working_hours": standard_working_hours,
-			"actual_overtime_duration": actual_overtime_duration,
-		}
-
-	return overtime_data
-
 
 def get_existing_half_day_attendance(employee, attendance_date):
 	attendance_name = frappe.db.exists(
@@ -372,64 +1001,12 @@ def calculate_working_hours(logs, check_in_out_type, working_hours_calc_type):
 	:param check_in_out_type: One of: 'Alternating entries as IN and OUT during the same shift', 'Strictly based on Log Type in Employee Checkin'
 	:param working_hours_calc_type: One of: 'First Check-in and Last Check-out', 'Every Valid Check-in and Check-out'
 	"""
-	total_hours = 0
-	in_time = out_time = None
-	if check_in_out_type == "Alternating entries as IN and OUT during the same shift":
-		in_time = logs[0].time
-		if len(logs) >= 2:
-			out_time = logs[-1].time
-		if working_hours_calc_type == "First Check-in and Last Check-out":
-			# assumption in this case: First log always taken as IN, Last log always taken as OUT
-			total_hours = time_diff_in_hours(in_time, logs[-1].time)
-		elif working_hours_calc_type == "Every Valid Check-in and Check-out":
-			logs = logs[:]
-			while len(logs) >= 2:
-				total_hours += time_diff_in_hours(logs[0].time, logs[1].time)
-				del logs[:2]
-
-	elif check_in_out_type == "Strictly based on Log Type in Employee Checkin":
-		if working_hours_calc_type == "First Check-in and Last Check-out":
-			first_in_log_index = find_index_in_dict(logs, "log_type", "IN")
-			first_in_log = logs[first_in_log_index] if first_in_log_index or first_in_log_index == 0 else None
-			last_out_log_index = find_index_in_dict(reversed(logs), "log_type", "OUT")
-			last_out_log = (
-				logs[len(logs) - 1 - last_out_log_index]
-				if last_out_log_index or last_out_log_index == 0
-				else None
-			)
-			in_time = getattr(first_in_log, "time", None)
-			out_time = getattr(last_out_log, "time", None)
-			if first_in_log and last_out_log:
-				total_hours = time_diff_in_hours(in_time, out_time)
-		elif working_hours_calc_type == "Every Valid Check-in and Check-out":
-			in_log = out_log = None
-			for log in logs:
-				if in_log and out_log:
-					if not in_time:
-						in_time = in_log.time
-					out_time = out_log.time
-					total_hours += time_diff_in_hours(in_log.time, out_log.time)
-					in_log = out_log = None
-				if not in_log:
-					in_log = log if log.log_type == "IN" else None
-					if in_log and not in_time:
-						in_time = in_log.time
-				elif not out_log:
-					out_log = log if log.log_type == "OUT" else None
-
-			if in_log and out_log:
-				out_time = out_log.time
-				total_hours += time_diff_in_hours(in_log.time, out_log.time)
-
-	return total_hours, in_time, out_time
-
-
-def time_diff_in_hours(start, end):
-	return round(float((end - start).total_seconds()) / 3600, 2)
-
-
-def find_index_in_dict(dict_list, key, value):
-	return next((index for (index, d) in enumerate(dict_list) if d[key] == value), None)
+	return get_working_hours(
+		[log.time for log in logs],
+		[log.get("log_type") for log in logs],
+		check_in_out_type,
+		working_hours_calc_type,
+	)
 
 
 def handle_attendance_exception(log_names: list, error_message: str):
@@ -472,11 +1049,3 @@ def update_attendance_in_checkins(log_names: list, attendance_id: str):
 		.set("attendance", attendance_id)
 		.where(EmployeeCheckin.name.isin(log_names))
 	).run()
-
-
-def calculate_time_difference(start_time, end_time):
-	if end_time < start_time:
-		end_time += timedelta(days=1)
-	time_difference = abs(start_time - end_time)
-
-	return round(time_difference.total_seconds() / 3600, 2)
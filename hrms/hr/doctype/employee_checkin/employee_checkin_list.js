@@ -16,5 +16,45 @@ frappe.listview_settings["Employee Checkin"] = {
 				},
 			});
 		});
+
+		listview.page.add_menu_item(__("Fetch Shifts for Period"), () => {
+			const dialog = new frappe.ui.Dialog({
+				title: __("Fetch Shifts for Period"),
+				fields: [
+					{
+						fieldname: "employee",
+						fieldtype: "Link",
+						options: "Employee",
+						label: __("Employee"),
+						description: __("Leave empty to fetch shifts for all employees"),
+					},
+					{
+						fieldname: "from_date",
+						fieldtype: "Date",
+						label: __("From Date"),
+						reqd: 1,
+					},
+					{
+						fieldname: "to_date",
+						fieldtype: "Date",
+						label: __("To Date"),
+						reqd: 1,
+					},
+				],
+				primary_action_label: __("Fetch Shifts"),
+				primary_action(values) {
+					frappe.call({
+						method: "hrms.hr.doctype.employee_checkin.employee_checkin.bulk_fetch_shift",
+						freeze: true,
+						args: values,
+						callback: () => {
+							dialog.hide();
+							listview.refresh();
+						},
+					});
+				},
+			});
+			dialog.show();
+		});
 	},
 };
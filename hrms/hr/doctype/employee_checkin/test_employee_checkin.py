@@ -2,11 +2,13 @@
 # See license.txt
 
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 import frappe
 from frappe.tests import IntegrationTestCase, change_settings
 from frappe.utils import (
 	add_days,
+	get_datetime,
 	get_time,
 	get_year_ending,
 	get_year_start,
@@ -19,8 +21,10 @@ from erpnext.setup.doctype.employee.test_employee import make_employee
 
 from hrms.hr.doctype.attendance.attendance import mark_attendance
 from hrms.hr.doctype.employee_checkin.employee_checkin import (
+	BulkAttendanceWriter,
 	CheckinRadiusExceededError,
 	add_log_based_on_employee_field,
+	add_logs_based_on_employee_field,
 	bulk_fetch_shift,
 	calculate_working_hours,
 	mark_attendance_and_link_log,
@@ -28,6 +32,7 @@ from hrms.hr.doctype.employee_checkin.employee_checkin import (
 from hrms.hr.doctype.leave_type.test_leave_type import create_leave_type
 from hrms.hr.doctype.shift_type.test_shift_type import make_shift_assignment, setup_shift_type
 from hrms.payroll.doctype.salary_slip.test_salary_slip import make_holiday_list, make_leave_application
+from hrms.utils.working_hours import ShiftAttendanceCalculator
 
 
 class TestEmployeeCheckin(IntegrationTestCase):
@@ -84,6 +89,57 @@ class TestEmployeeCheckin(IntegrationTestCase):
 		self.assertEqual(employee_checkin.device_id, "mumbai_first_floor")
 		self.assertEqual(employee_checkin.log_type, "IN")
 
+	def test_add_logs_based_on_employee_field(self):
+		employee = make_employee("test_add_logs_based_on_employee_field@example.com")
+		frappe.db.set_value("Employee", employee, "attendance_device_id", "3345")
+		shift_type = setup_shift_type()
+		date = getdate()
+		make_shift_assignment(shift_type.name, employee, date)
+
+		existing = add_log_based_on_employee_field("3345", f"{date} 08:00:00", log_type="IN")
+		logs = [
+			{"employee_field_value": "3345", "timestamp": f"{date} 08:00:00", "log_type": "IN"},
+			{"employee_field_value": "3345", "timestamp": f"{date} 11:00:00", "log_type": "OUT"},
+			{"employee_field_value": "3345", "timestamp": f"{date} 11:00:00", "log_type": "OUT"},
+			{"employee_field_value": "0000", "timestamp": f"{date} 11:00:00"},
+			{"employee_field_value": "3345", "timestamp": "invalid"},
+		]
+		results = add_logs_based_on_employee_field(frappe.as_json(logs))
+
+		self.assertEqual(
+			[result.status for result in results], ["Duplicate", "Created", "Duplicate", "Failed", "Failed"]
+		)
+		self.assertEqual(results[0].name, existing.name)
+		self.assertEqual(results[2].name, results[1].name)
+
+		checkin = frappe.get_doc("Employee Checkin", results[1].name)
+		self.assertEqual(checkin.employee, employee)
+		self.assertEqual(checkin.log_type, "OUT")
+		self.assertEqual(checkin.shift, shift_type.name)
+
+		# csv with a header row
+		results = add_logs_based_on_employee_field(
+			f"employee_field_value,timestamp,device_id\n3345,{date} 09:00:00,gate_1\n"
+		)
+		self.assertEqual(results[0].status, "Created")
+		self.assertEqual(frappe.db.get_value("Employee Checkin", results[0].name, "device_id"), "gate_1")
+
+		# timestamps are stored in whole seconds like the checkins created one by one
+		logs = [
+			{"employee_field_value": "3345", "timestamp": f"{date} 10:00:00.250000"},
+			{"employee_field_value": "3345", "timestamp": f"{date} 10:00:00.750000"},
+		]
+		created, duplicate = add_logs_based_on_employee_field(frappe.as_json(logs))
+		self.assertEqual(created.status, "Created")
+		self.assertEqual(duplicate.status, "Duplicate")
+		self.assertEqual(duplicate.name, created.name)
+		self.assertEqual(
+			frappe.db.get_value("Employee Checkin", created.name, "time"), get_datetime(f"{date} 10:00:00")
+		)
+		self.assertRaises(
+			frappe.ValidationError, add_log_based_on_employee_field, "3345", f"{date} 10:00:00.500000"
+		)
+
 	def test_mark_attendance_and_link_log(self):
 		employee = make_employee("test_mark_attendance_and_link_log@example.com")
 		logs = make_n_checkins(employee, 3)
@@ -109,6 +165,62 @@ class TestEmployeeCheckin(IntegrationTestCase):
 		)
 		self.assertEqual(attendance_count, 1)
 
+	def test_bulk_attendance_writer(self):
+		employee1 = make_employee("test_bulk_attendance_writer1@example.com")
+		employee2 = make_employee("test_bulk_attendance_writer2@example.com")
+		date = getdate()
+		frappe.db.delete("Attendance", {"employee": ("in", [employee1, employee2])})
+
+		logs1 = make_n_checkins(employee1, 2)
+		logs2 = make_n_checkins(employee2, 2)
+		# attendance already marked for employee2, needs the complete validations
+		mark_attendance(employee2, date, "Present")
+
+		writer = BulkAttendanceWriter()
+		writer.add(logs1, "Absent", date, 2.0)
+		writer.add(logs2, "Present", date, 8.0)
+		self.assertEqual(writer.flush(), 1)
+
+		attendance = frappe.db.get_value(
+			"Attendance",
+			{"employee": employee1, "attendance_date": date},
+			["name", "status", "working_hours", "docstatus"],
+			as_dict=True,
+		)
+		self.assertEqual(attendance.status, "Absent")
+		self.assertEqual(attendance.working_hours, 2.0)
+		self.assertEqual(attendance.docstatus, 1)
+		for log in logs1:
+			self.assertEqual(frappe.db.get_value("Employee Checkin", log.name, "attendance"), attendance.name)
+
+		# duplicate attendance, logs are skipped
+		for log in logs2:
+			self.assertEqual(frappe.db.get_value("Employee Checkin", log.name, "skip_auto_attendance"), 1)
+
+	def test_bulk_attendance_writer_inserts_in_bulk_without_event_handlers(self):
+		employee = make_employee("test_bulk_attendance_writer3@example.com")
+		date = getdate()
+		frappe.db.delete("Attendance", {"employee": employee})
+		logs = make_n_checkins(employee, 2)
+
+		writer = BulkAttendanceWriter()
+		# hooks registered for all doctypes ("*") by frappe and erpnext don't force document inserts
+		self.assertTrue(writer.bulk_insert_allowed)
+		writer.add(logs, "Present", date, 8.0)
+
+		with patch(
+			"hrms.hr.doctype.employee_checkin.employee_checkin.mark_attendance_and_link_log"
+		) as mark_attendance_and_link_log:
+			self.assertEqual(writer.flush(), 1)
+
+		mark_attendance_and_link_log.assert_not_called()
+		attendance = frappe.db.get_value(
+			"Attendance", {"employee": employee, "attendance_date": date, "docstatus": 1}
+		)
+		self.assertTrue(attendance)
+		for log in logs:
+			self.assertEqual(frappe.db.get_value("Employee Checkin", log.name, "attendance"), attendance)
+
 	def test_unlink_attendance_on_cancellation(self):
 		employee = make_employee("test_mark_attendance_and_link_log@example.com")
 		logs = make_n_checkins(employee, 3)
@@ -166,6 +278,61 @@ class TestEmployeeCheckin(IntegrationTestCase):
 		)
 		self.assertEqual(working_hours, (5.0, logs_type_2[1].time, logs_type_2[-1].time))
 
+	def test_shift_attendance_calculator(self):
+		shift_type = frappe._dict(
+			start_time=timedelta(hours=8),
+			end_time=timedelta(hours=12),
+			determine_check_in_and_check_out="Strictly based on Log Type in Employee Checkin",
+			working_hours_calculation_based_on="First Check-in and Last Check-out",
+			enable_late_entry_marking=1,
+			late_entry_grace_period=15,
+			enable_early_exit_marking=1,
+			early_exit_grace_period=15,
+			working_hours_threshold_for_absent=2,
+			working_hours_threshold_for_half_day=3,
+			allow_overtime=1,
+		)
+		shift_start = datetime.combine(getdate(), get_time("08:00:00"))
+		punches = {
+			"EMP-1": [(30, "IN"), (300, "OUT")],  # late entry, overtime
+			"EMP-2": [(0, "IN"), (165, "OUT")],  # early exit, half day
+			"EMP-3": [(0, "IN"), (60, "OUT")],  # absent
+		}
+		logs = [
+			frappe._dict(
+				employee=employee,
+				time=shift_start + timedelta(minutes=minutes),
+				log_type=log_type,
+				shift_start=shift_start,
+				shift_end=shift_start + timedelta(hours=4),
+			)
+			for employee, employee_punches in punches.items()
+			for minutes, log_type in employee_punches
+		]
+
+		attendance = {
+			shift_logs[0].employee: result
+			for shift_logs, result in ShiftAttendanceCalculator(shift_type).calculate_for_shifts(logs)
+		}
+
+		self.assertEqual(attendance["EMP-1"].status, "Present")
+		self.assertTrue(attendance["EMP-1"].late_entry)
+		self.assertEqual(attendance["EMP-1"].working_hours, 4.5)
+		self.assertEqual(
+			attendance["EMP-1"].overtime, {"standard_working_hours": 4, "actual_overtime_duration": 0.5}
+		)
+
+		self.assertEqual(attendance["EMP-2"].status, "Half Day")
+		self.assertTrue(attendance["EMP-2"].early_exit)
+		self.assertFalse(attendance["EMP-2"].late_entry)
+		self.assertEqual(attendance["EMP-2"].overtime, {})
+
+		self.assertEqual(attendance["EMP-3"].status, "Absent")
+
+		# times are strings on unsaved shift types
+		shift_type.update(start_time="08:00:00", end_time="12:00:00")
+		self.assertEqual(ShiftAttendanceCalculator(shift_type).standard_working_hours, 4)
+
 	def test_fetch_shift(self):
 		employee = make_employee("test_employee_checkin@example.com", company="_Test Company")
 
@@ -613,6 +780,47 @@ class TestEmployeeCheckin(IntegrationTestCase):
 		log2.reload()
 		self.assertEqual(log2.shift_actual_start, datetime.combine(date, get_time("06:00:00")))
 
+	def test_bulk_fetch_shift_for_period(self):
+		employee = make_employee("bulk_period_emp@example.com", company="_Test Company")
+		shift1 = setup_shift_type(shift_type="Shift 1")
+		shift2 = setup_shift_type(shift_type="Shift 2", start_time="12:30:00", end_time="16:30:00")
+		frappe.db.set_value("Employee", employee, "default_shift", shift1.name)
+
+		date = getdate()
+		log1 = make_checkin(employee, datetime.combine(add_days(date, -1), get_time("12:30:00")))
+		log2 = make_checkin(employee, datetime.combine(date, get_time("12:30:00")))
+		self.assertTrue(log1.shift == log2.shift == shift1.name)
+
+		# roster changed for the current date
+		make_shift_assignment(shift2.name, employee, date, date)
+		bulk_fetch_shift(employee=employee, from_date=date, to_date=date)
+
+		log1.reload()
+		self.assertEqual(log1.shift, shift1.name)
+		log2.reload()
+		self.assertEqual(log2.shift, shift2.name)
+		self.assertEqual(log2.shift_actual_start, datetime.combine(date, get_time("11:30:00")))
+
+	@patch("hrms.hr.doctype.employee_checkin.employee_checkin.BULK_FETCH_SHIFT_SYNC_LIMIT", 1)
+	def test_bulk_fetch_shift_jobs_per_selection(self):
+		module = "hrms.hr.doctype.employee_checkin.employee_checkin"
+		with (
+			patch(f"{module}.is_job_enqueued", return_value=False),
+			patch(f"{module}.frappe.enqueue") as enqueue,
+		):
+			bulk_fetch_shift(["CHECKIN-1", "CHECKIN-2"])
+			bulk_fetch_shift(["CHECKIN-2", "CHECKIN-1"])
+			bulk_fetch_shift(["CHECKIN-1", "CHECKIN-3"])
+
+		# the same selection maps to the same job, a different one is queued separately
+		job_ids = [call.kwargs["job_id"] for call in enqueue.call_args_list]
+		self.assertEqual(job_ids[0], job_ids[1])
+		self.assertNotEqual(job_ids[0], job_ids[2])
+
+		# the user is told when the selection is already being processed instead of dropping it silently
+		with patch(f"{module}.is_job_enqueued", return_value=True):
+			self.assertRaises(frappe.ValidationError, bulk_fetch_shift, ["CHECKIN-1", "CHECKIN-2"])
+
 	def test_if_logs_are_marked_invalid(self):
 		# time window is 7 to 13
 		shift = setup_shift_type()
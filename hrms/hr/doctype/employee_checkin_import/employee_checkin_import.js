@@ -0,0 +1,27 @@
+// Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("Employee Checkin Import", {
+	setup(frm) {
+		frappe.realtime.on("employee_checkin_import_progress", (data) => {
+			if (data.status === "Completed") {
+				frm.reload_doc();
+				return;
+			}
+			frm.dashboard.show_progress(
+				__("Importing Check-ins"),
+				100,
+				__("{0} rows processed at {1} rows/second", [data.rows_processed, data.rows_per_second]),
+			);
+		});
+	},
+
+	refresh(frm) {
+		if (frm.is_new() || frm.doc.status === "Completed" || frm.doc.__onload?.import_in_progress) return;
+
+		const label = frm.doc.rows_processed ? __("Resume Import") : __("Start Import");
+		frm.add_custom_button(label, () => {
+			frm.call({ doc: frm.doc, method: "start_import", freeze: true }).then(() => frm.reload_doc());
+		}).addClass("btn-primary");
+	},
+});
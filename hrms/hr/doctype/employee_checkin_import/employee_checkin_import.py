@@ -0,0 +1,141 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import csv
+import time
+from collections.abc import Iterator
+from itertools import islice
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import flt, now_datetime
+from frappe.utils.background_jobs import is_job_enqueued
+
+from hrms.hr.doctype.employee_checkin.employee_checkin import insert_checkins_based_on_employee_field
+
+# rows read, validated and committed at a time, keeps the memory used by an import bounded
+IMPORT_CHUNK_SIZE = 5000
+# failed rows beyond this are only counted
+MAX_LOGGED_ERRORS = 1000
+REQUIRED_COLUMNS = ("employee_field_value", "timestamp")
+
+
+class EmployeeCheckinImport(Document):
+	def onload(self):
+		self.set_onload("import_in_progress", self.is_import_in_progress())
+
+	def validate(self):
+		if not frappe.get_meta("Employee").has_field(self.employee_fieldname):
+			frappe.throw(_("{0} is not a field of Employee.").format(frappe.bold(self.employee_fieldname)))
+
+	@frappe.whitelist()
+	def start_import(self):
+		"""Enqueues the import. Imports that failed resume after the rows already processed"""
+		if self.status == "Completed":
+			frappe.throw(_("Check-ins from this file are already imported."))
+
+		if self.is_import_in_progress():
+			frappe.throw(_("The import is already queued or in progress."))
+
+		self.db_set("status", "Queued")
+		frappe.enqueue(
+			import_checkins,
+			queue="long",
+			timeout=6000,
+			job_id=self.get_job_id(),
+			deduplicate=True,
+			enqueue_after_commit=True,
+			import_name=self.name,
+		)
+
+	def is_import_in_progress(self) -> bool:
+		"""Imports left Queued or In Progress by a killed worker have no job and can be resumed"""
+		return self.status in ("Queued", "In Progress") and is_job_enqueued(self.get_job_id())
+
+	def get_job_id(self) -> str:
+		return f"employee_checkin_import::{self.name}"
+
+	def get_file_path(self) -> str:
+		file = frappe.get_doc("File", {"file_url": self.import_file})
+		return file.get_full_path()
+
+
+def import_checkins(import_name: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> None:
+	"""Streams logs from the import file and inserts them in chunks. Progress is committed along with
+	the checkins of every chunk, so a failed import can resume from the last committed chunk"""
+	doc = frappe.get_doc("Employee Checkin Import", import_name)
+	doc.db_set({"status": "In Progress", "started_on": doc.started_on or now_datetime()}, commit=True)
+
+	run_started = time.monotonic()
+	rows_processed_in_run = 0
+
+	try:
+		for chunk in read_logs_in_chunks(doc.get_file_path(), doc.rows_processed, chunk_size):
+			results = insert_checkins_based_on_employee_field(chunk, doc.employee_fieldname)
+			update_import_progress(doc, results)
+
+			rows_processed_in_run += len(chunk)
+			doc.rows_per_second = flt(rows_processed_in_run / max(time.monotonic() - run_started, 0.001), 2)
+			doc.db_update()
+			frappe.db.commit()  # nosemgrep
+
+			frappe.publish_realtime(
+				"employee_checkin_import_progress",
+				{"rows_processed": doc.rows_processed, "rows_per_second": doc.rows_per_second},
+				doctype=doc.doctype,
+				docname=doc.name,
+			)
+	except Exception as e:
+		frappe.db.rollback()
+		doc.reload()
+		doc.db_set(
+			{"status": "Failed", "error_log": "\n".join(filter(None, [doc.error_log, str(e)]))}, commit=True
+		)
+		doc.log_error(_("Employee Checkin Import failed"))
+		return
+
+	doc.db_set({"status": "Completed", "completed_on": now_datetime()}, commit=True)
+	frappe.publish_realtime(
+		"employee_checkin_import_progress", {"status": "Completed"}, doctype=doc.doctype, docname=doc.name
+	)
+
+
+def read_logs_in_chunks(file_path: str, skip: int = 0, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[list]:
+	"""Yields rows of a CSV or TSV file as lists of dicts of at most `chunk_size` rows, after skipping `skip` rows"""
+	with open(file_path, newline="", encoding="utf-8-sig") as f:
+		try:
+			dialect = csv.Sniffer().sniff(f.read(4096), delimiters=",\t;")
+		except csv.Error:
+			dialect = csv.excel
+		f.seek(0)
+
+		reader = csv.DictReader(f, dialect=dialect)
+		reader.fieldnames = [normalize_column(column) for column in reader.fieldnames or []]
+		if missing := [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]:
+			frappe.throw(_("Columns {0} are missing in the import file.").format(", ".join(missing)))
+
+		rows = islice(reader, skip, None)
+		while chunk := list(islice(rows, chunk_size)):
+			yield [frappe._dict(row) for row in chunk]
+
+
+def normalize_column(column: str | None) -> str:
+	return (column or "").strip().lower()
+
+
+def update_import_progress(doc: Document, results: list[dict]) -> None:
+	errors = []
+	for result in results:
+		if result.status == "Created":
+			doc.logs_created += 1
+		elif result.status == "Duplicate":
+			doc.duplicate_logs += 1
+		else:
+			if doc.failed_logs < MAX_LOGGED_ERRORS:
+				errors.append(f"Row {doc.rows_processed + result.row}: {result.message}")
+			doc.failed_logs += 1
+
+	doc.rows_processed += len(results)
+	if errors:
+		doc.error_log = "\n".join(filter(None, [doc.error_log, *errors]))
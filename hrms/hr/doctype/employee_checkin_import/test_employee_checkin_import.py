@@ -0,0 +1,81 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import getdate
+
+from erpnext.setup.doctype.employee.test_employee import make_employee
+
+from hrms.hr.doctype.employee_checkin_import.employee_checkin_import import import_checkins
+
+
+class TestEmployeeCheckinImport(IntegrationTestCase):
+	def setUp(self):
+		frappe.db.delete("Employee Checkin")
+		frappe.db.delete("Employee Checkin Import")
+
+		self.employee = make_employee("test_checkin_import@example.com", company="_Test Company")
+		frappe.db.set_value("Employee", self.employee, "attendance_device_id", "4455")
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_import_checkins_in_chunks(self):
+		date = getdate()
+		rows = [
+			f"4455\t{date} 08:00:00\tIN",
+			f"4455\t{date} 08:00:00\tIN",
+			f"0000\t{date} 09:00:00\tIN",
+			f"4455\t{date} 17:00:00\tOUT",
+		]
+		doc = make_checkin_import("employee_field_value\ttimestamp\tlog_type\n" + "\n".join(rows))
+
+		import_checkins(doc.name, chunk_size=3)
+		doc.reload()
+
+		self.assertEqual(doc.status, "Completed")
+		self.assertEqual(doc.rows_processed, 4)
+		self.assertEqual(doc.logs_created, 2)
+		self.assertEqual(doc.duplicate_logs, 1)
+		self.assertEqual(doc.failed_logs, 1)
+		self.assertIn("Row 3:", doc.error_log)
+		self.assertEqual(frappe.db.count("Employee Checkin", {"employee": self.employee}), 2)
+
+	def test_resume_failed_import(self):
+		date = getdate()
+		doc = make_checkin_import(
+			f"employee_field_value,timestamp\n4455,{date} 08:00:00\n4455,{date} 17:00:00\n"
+		)
+		# first row was imported by the previous run
+		doc.db_set({"status": "Failed", "rows_processed": 1})
+
+		import_checkins(doc.name)
+		doc.reload()
+
+		self.assertEqual(doc.status, "Completed")
+		self.assertEqual(doc.rows_processed, 2)
+		self.assertEqual(doc.logs_created, 1)
+		checkins = frappe.get_all("Employee Checkin", {"employee": self.employee}, pluck="time")
+		self.assertEqual([str(time) for time in checkins], [f"{date} 17:00:00"])
+
+	def test_resume_import_without_a_job(self):
+		doc = make_checkin_import("employee_field_value,timestamp\n")
+		# left In Progress by a worker that was killed
+		doc.db_set({"status": "In Progress", "rows_processed": 1})
+
+		doc.start_import()
+		self.assertEqual(doc.status, "Queued")
+
+
+def make_checkin_import(content: str):
+	file = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": f"{frappe.generate_hash(length=8)}.csv",
+			"content": content,
+			"is_private": 1,
+		}
+	).insert()
+
+	return frappe.get_doc({"doctype": "Employee Checkin Import", "import_file": file.file_url}).insert()
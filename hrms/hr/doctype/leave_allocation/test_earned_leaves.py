@@ -352,6 +352,45 @@ class TestLeaveAllocation(HRMSTestSuite):
 		# balance is still 2
 		self.assertEqual(leaves_allocated, 2)
 
+	def test_earned_leave_ledger_entry_and_comment(self):
+		"""Tests ledger entries and comments written by the scheduler for allocated earned leaves"""
+		start_date = get_first_day(add_months(getdate(), -1))
+		first_day = get_first_day(getdate())
+
+		frappe.flags.current_date = get_last_day(start_date)
+		leave_policy_assignments = make_policy_assignment(
+			self.employee, allocate_on_day="First Day", start_date=start_date
+		)
+		allocation = frappe.db.get_value(
+			"Leave Allocation", {"leave_policy_assignment": leave_policy_assignments[0]}, "name"
+		)
+
+		frappe.flags.current_date = first_day
+		allocate_earned_leaves()
+
+		ledger_entry = frappe.db.get_value(
+			"Leave Ledger Entry",
+			{"transaction_name": allocation, "from_date": first_day},
+			["leaves", "is_carry_forward", "docstatus", "employee"],
+			as_dict=True,
+		)
+		self.assertEqual(ledger_entry.leaves, 1)
+		self.assertEqual(ledger_entry.is_carry_forward, 0)
+		self.assertEqual(ledger_entry.docstatus, 1)
+		self.assertEqual(ledger_entry.employee, self.employee.name)
+
+		comments = frappe.get_all(
+			"Comment",
+			filters={
+				"reference_doctype": "Leave Allocation",
+				"reference_name": allocation,
+				"comment_type": "Info",
+			},
+			pluck="content",
+		)
+		self.assertEqual(len(comments), 1)
+		self.assertIn("First Day", comments[0])
+
 	def test_allocate_on_date_of_joining(self):
 		"""Tests assignment with 'Allocate On=Date of Joining'"""
 		start_date = get_first_day(add_months(getdate(), -1))
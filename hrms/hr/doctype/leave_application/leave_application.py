@@ -25,6 +25,10 @@ from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employe
 
 import hrms
 from hrms.api import get_current_employee_info
+from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+	get_leave_balance_snapshots,
+	get_remaining_leaves_from_snapshot,
+)
 from hrms.hr.doctype.leave_block_list.leave_block_list import get_applicable_block_dates
 from hrms.hr.doctype.leave_ledger_entry.leave_ledger_entry import create_leave_ledger_entry
 from hrms.hr.utils import (
@@ -36,6 +40,7 @@ from hrms.hr.utils import (
 )
 from hrms.mixins.pwa_notifications import PWANotificationsMixin
 from hrms.utils import get_employee_email
+from hrms.utils.holiday_list import get_holiday_calendar
 
 
 class LeaveDayBlockedError(frappe.ValidationError):
@@ -606,11 +611,10 @@ class LeaveApplication(Document, PWANotificationsMixin):
 			frappe.throw(
 				_("Optional Holiday List not set for leave period {0}").format(leave_period[0]["name"])
 			)
+		calendar = get_holiday_calendar(optional_holiday_list)
 		day = getdate(self.from_date)
 		while day <= getdate(self.to_date):
-			if not frappe.db.exists(
-				{"doctype": "Holiday", "parent": optional_holiday_list, "holiday_date": day}
-			):
+			if not calendar.is_holiday(day):
 				frappe.throw(
 					_("{0} is not in Optional Holiday List").format(formatdate(day)), NotAnOptionalHoliday
 				)
@@ -904,22 +908,31 @@ def get_number_of_leave_days(
 
 @frappe.whitelist()
 def get_leave_details(employee, date, for_salary_slip=False):
+	# balances considering all leaves in the allocation period are read from the snapshots,
+	# leave types without one are computed from the leave ledger
+	snapshots = {} if for_salary_slip else (get_leave_balance_snapshots(employee, date) or {})
 	allocation_records = get_leave_allocation_records(employee, date)
 	leave_allocation = {}
 	precision = cint(frappe.db.get_single_value("System Settings", "float_precision")) or 2
 
-	for d in allocation_records:
-		allocation = allocation_records.get(d, frappe._dict())
+	for d in {**allocation_records, **snapshots}:
+		snapshot = snapshots.get(d)
+		allocation = snapshot or allocation_records.get(d, frappe._dict())
 		to_date = date if for_salary_slip else allocation.to_date
-		remaining_leaves = get_leave_balance_on(
-			employee,
-			d,
-			date,
-			to_date=to_date,
-			consider_all_leaves_in_the_allocation_period=False if for_salary_slip else True,
-		)
 
-		leaves_taken = get_leaves_for_period(employee, d, allocation.from_date, to_date) * -1
+		if snapshot:
+			remaining_leaves = get_remaining_leaves_from_snapshot(allocation, date).leave_balance
+			leaves_taken = flt(allocation.leaves_taken)
+		else:
+			remaining_leaves = get_leave_balance_on(
+				employee,
+				d,
+				date,
+				to_date=to_date,
+				consider_all_leaves_in_the_allocation_period=False if for_salary_slip else True,
+			)
+			leaves_taken = get_leaves_for_period(employee, d, allocation.from_date, to_date) * -1
+
 		leaves_pending = get_leaves_pending_approval_for_period(employee, d, allocation.from_date, to_date)
 		expired_leaves = allocation.total_leaves_allocated - (remaining_leaves + leaves_taken)
 
@@ -967,6 +980,13 @@ def get_leave_balance_on(
 	if not to_date:
 		to_date = nowdate()
 
+	if cint(consider_all_leaves_in_the_allocation_period):
+		snapshot = (get_leave_balance_snapshots(employee, date, leave_type) or {}).get(leave_type)
+		# carry forwarded leaves expiring after `to_date` are not considered as expiring
+		if snapshot and not (snapshot.cf_expiry and getdate(snapshot.cf_expiry) > getdate(to_date)):
+			remaining_leaves = get_remaining_leaves_from_snapshot(snapshot, date)
+			return remaining_leaves if for_consumption else remaining_leaves.get("leave_balance")
+
 	allocation_records = get_leave_allocation_records(employee, date, leave_type)
 	allocation = allocation_records.get(leave_type, frappe._dict())
 
@@ -991,6 +1011,15 @@ def get_leave_balance_on(
 
 def get_leave_allocation_records(employee, date, leave_type=None):
 	"""Returns the total allocated leaves and carry forwarded leaves based on ledger entries"""
+	allocated_leaves = frappe._dict()
+	for d in get_leave_allocation_details([employee], date, leave_type):
+		allocated_leaves.setdefault(d.leave_type, d)
+	return allocated_leaves
+
+
+def get_leave_allocation_details(employees: list[str], date, leave_type=None) -> list[dict]:
+	"""Returns the total allocated leaves and carry forwarded leaves of the allocation active on `date`
+	for every employee and leave type based on ledger entries"""
 	Ledger = frappe.qb.DocType("Leave Ledger Entry")
 	LeaveAllocation = frappe.qb.DocType("Leave Allocation")
 
@@ -1016,7 +1045,7 @@ def get_leave_allocation_records(employee, date, leave_type=None):
 			(Ledger.from_date <= date)
 			& (Ledger.docstatus == 1)
 			& (Ledger.transaction_type == "Leave Allocation")
-			& (Ledger.employee == employee)
+			& (Ledger.employee.isin(employees))
 			& (Ledger.is_expired == 0)
 			& (Ledger.is_lwp == 0)
 			& (
@@ -1039,25 +1068,20 @@ def get_leave_allocation_records(employee, date, leave_type=None):
 		query = query.where(Ledger.leave_type == leave_type)
 	query = query.groupby(Ledger.employee, Ledger.leave_type)
 
-	allocation_details = query.run(as_dict=True)
-
-	allocated_leaves = frappe._dict()
-	for d in allocation_details:
-		allocated_leaves.setdefault(
-			d.leave_type,
-			frappe._dict(
-				{
-					"from_date": d.from_date,
-					"to_date": d.to_date,
-					"total_leaves_allocated": flt(d.cf_leaves) + flt(d.new_leaves),
-					"unused_leaves": d.cf_leaves,
-					"new_leaves_allocated": d.new_leaves,
-					"leave_type": d.leave_type,
-					"employee": d.employee,
-				}
-			),
+	return [
+		frappe._dict(
+			{
+				"from_date": d.from_date,
+				"to_date": d.to_date,
+				"total_leaves_allocated": flt(d.cf_leaves) + flt(d.new_leaves),
+				"unused_leaves": d.cf_leaves,
+				"new_leaves_allocated": d.new_leaves,
+				"leave_type": d.leave_type,
+				"employee": d.employee,
+			}
 		)
-	return allocated_leaves
+		for d in query.run(as_dict=True)
+	]
 
 
 def get_leaves_pending_approval_for_period(
@@ -1077,11 +1101,17 @@ def get_leaves_pending_approval_for_period(
 
 
 def get_remaining_leaves(
-	allocation: dict, leaves_taken: float, date: str, cf_expiry: str, manually_expired_leaves: float
+	allocation: dict,
+	leaves_taken: float,
+	date: str,
+	cf_expiry: str,
+	manually_expired_leaves: float,
+	new_and_cf_leaves_taken: tuple[float, float] | None = None,
 ) -> dict[str, float]:
 	"""Returns a dict of leave_balance and leave_balance_for_consumption
 	leave_balance returns the available leave balance
 	leave_balance_for_consumption returns the minimum leaves remaining after comparing with remaining days for allocation expiry
+	new_and_cf_leaves_taken can be passed if already known, eg: from the leave balance snapshot
 	"""
 
 	def _get_remaining_leaves(remaining_leaves, end_date):
@@ -1094,7 +1124,9 @@ def get_remaining_leaves(
 
 	if cf_expiry and allocation.unused_leaves:
 		# allocation contains both carry forwarded and new leaves
-		new_leaves_taken, cf_leaves_taken = get_new_and_cf_leaves_taken(allocation, cf_expiry)
+		new_leaves_taken, cf_leaves_taken = new_and_cf_leaves_taken or get_new_and_cf_leaves_taken(
+			allocation, cf_expiry
+		)
 
 		if getdate(date) > getdate(cf_expiry):
 			# carry forwarded leaves have expired
@@ -1247,14 +1279,8 @@ def get_holidays(employee, from_date, to_date, holiday_list=None):
 	if not holiday_list:
 		holiday_list = get_holiday_list_for_employee(employee)
 
-	holidays = frappe.db.sql(
-		"""select count(distinct holiday_date) from `tabHoliday` h1, `tabHoliday List` h2
-		where h1.parent = h2.name and h1.holiday_date between %s and %s
-		and h2.name = %s""",
-		(from_date, to_date, holiday_list),
-	)[0][0]
-
-	return holidays
+	calendar = get_holiday_calendar(holiday_list)
+	return calendar.count(from_date, to_date) if calendar else 0
 
 
 def is_lwp(leave_type):
@@ -0,0 +1,301 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Max, Min, Sum
+from frappe.utils import create_batch, flt, getdate
+
+SNAPSHOT_FIELDS = (
+	"employee",
+	"leave_type",
+	"from_date",
+	"to_date",
+	"last_allocation_date",
+	"total_leaves_allocated",
+	"new_leaves_allocated",
+	"unused_leaves",
+	"cf_expiry",
+	"leaves_taken",
+	"new_leaves_taken",
+	"cf_leaves_taken",
+	"manually_expired_leaves",
+)
+
+
+class LeaveBalanceSnapshot(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Leave Balance Snapshot", ["employee", "leave_type", "from_date"])
+
+
+def get_leave_balance_snapshots(employee: str, date, leave_type: str | None = None) -> dict | None:
+	"""Returns snapshots of the allocations active on `date` by leave type.
+	Returns None if leaves are allocated after `date`, since the snapshots only hold the allocation's totals"""
+	Snapshot = frappe.qb.DocType("Leave Balance Snapshot")
+	Allocation = frappe.qb.DocType("Leave Allocation")
+	query = (
+		frappe.qb.from_(Snapshot)
+		.inner_join(Allocation)
+		.on(Snapshot.leave_allocation == Allocation.name)
+		.select(Snapshot.leave_allocation, *(Snapshot[field] for field in SNAPSHOT_FIELDS))
+		.where(
+			(Snapshot.employee == employee)
+			& (Snapshot.from_date <= date)
+			& (Snapshot.to_date >= date)
+			& (Allocation.docstatus == 1)
+		)
+	)
+	if leave_type:
+		query = query.where(Snapshot.leave_type == leave_type)
+
+	snapshots = query.run(as_dict=True)
+	if any(getdate(snapshot.last_allocation_date) > getdate(date) for snapshot in snapshots):
+		return None
+
+	return {snapshot.leave_type: snapshot for snapshot in snapshots}
+
+
+def get_remaining_leaves_from_snapshot(snapshot: dict, date) -> dict[str, float]:
+	"""Returns leave balance on `date` considering all leaves taken in the allocation period"""
+	from hrms.hr.doctype.leave_application.leave_application import get_remaining_leaves
+
+	# leaves taken are -ve numbers in the ledger
+	return get_remaining_leaves(
+		snapshot,
+		-flt(snapshot.leaves_taken),
+		date,
+		snapshot.cf_expiry,
+		snapshot.manually_expired_leaves,
+		new_and_cf_leaves_taken=(-flt(snapshot.new_leaves_taken), -flt(snapshot.cf_leaves_taken)),
+	)
+
+
+def refresh_leave_balance_snapshots(ledger: dict) -> None:
+	"""Recomputes snapshots of the allocations affected by a leave ledger entry"""
+	allocations = set(
+		frappe.get_all(
+			"Leave Allocation",
+			filters={
+				"employee": ledger.employee,
+				"leave_type": ledger.leave_type,
+				"from_date": ("<=", ledger.to_date),
+				"to_date": (">=", ledger.from_date),
+				"docstatus": 1,
+			},
+			pluck="name",
+		)
+	)
+	if ledger.transaction_type == "Leave Allocation":
+		allocations.add(ledger.transaction_name)
+
+	for allocation in allocations:
+		refresh_leave_balance_snapshot(allocation)
+
+
+def refresh_leave_balance_snapshot(leave_allocation: str) -> None:
+	values = get_leave_balance_snapshot_values(leave_allocation)
+	if not values:
+		frappe.db.delete("Leave Balance Snapshot", leave_allocation)
+	elif frappe.db.exists("Leave Balance Snapshot", leave_allocation):
+		frappe.db.set_value("Leave Balance Snapshot", leave_allocation, values, update_modified=False)
+	else:
+		frappe.get_doc(
+			{"doctype": "Leave Balance Snapshot", "leave_allocation": leave_allocation, **values}
+		).db_insert()
+
+
+def add_leaves_to_snapshots(leaves: dict[str, float], from_date) -> None:
+	"""Adds leaves allocated from `from_date` to the snapshots of the given allocations"""
+	snapshots = frappe.get_all(
+		"Leave Balance Snapshot",
+		filters={"name": ("in", list(leaves))},
+		fields=["name", "total_leaves_allocated", "new_leaves_allocated", "last_allocation_date"],
+	)
+	updates = {
+		snapshot.name: {
+			"total_leaves_allocated": flt(snapshot.total_leaves_allocated) + flt(leaves[snapshot.name]),
+			"new_leaves_allocated": flt(snapshot.new_leaves_allocated) + flt(leaves[snapshot.name]),
+			"last_allocation_date": max(getdate(snapshot.last_allocation_date), getdate(from_date)),
+		}
+		for snapshot in snapshots
+	}
+	if updates:
+		frappe.db.bulk_update("Leave Balance Snapshot", updates, update_modified=False)
+
+	for allocation in set(leaves) - set(updates):
+		refresh_leave_balance_snapshot(allocation)
+
+
+def get_leave_balance_snapshot_values(leave_allocation: str) -> dict | None:
+	"""Computes the snapshot of a submitted allocation from its leave ledger entries
+	the same way as `get_leave_balance_on` considering all leaves in the allocation period"""
+	from hrms.hr.doctype.leave_application.leave_application import (
+		get_allocation_expiry_for_cf_leaves,
+		get_leaves_for_period,
+		get_manually_expired_leaves,
+		get_new_and_cf_leaves_taken,
+	)
+
+	allocation = frappe.db.get_value(
+		"Leave Allocation", leave_allocation, ["employee", "leave_type", "docstatus"], as_dict=True
+	)
+	if not allocation or allocation.docstatus != 1:
+		return None
+
+	Ledger = frappe.qb.DocType("Leave Ledger Entry")
+	ledger = (
+		frappe.qb.from_(Ledger)
+		.select(
+			Sum(Case().when(Ledger.is_carry_forward == 1, Ledger.leaves).else_(0)).as_("cf_leaves"),
+			Sum(Case().when(Ledger.is_carry_forward == 0, Ledger.leaves).else_(0)).as_("new_leaves"),
+			Min(Ledger.from_date).as_("from_date"),
+			Max(Ledger.to_date).as_("to_date"),
+			Max(Ledger.from_date).as_("last_allocation_date"),
+		)
+		.where(
+			(Ledger.transaction_type == "Leave Allocation")
+			& (Ledger.transaction_name == leave_allocation)
+			& (Ledger.docstatus == 1)
+			& (Ledger.is_expired == 0)
+			& (Ledger.is_lwp == 0)
+		)
+	).run(as_dict=True)[0]
+	if not ledger.from_date:
+		return None
+
+	snapshot = frappe._dict(
+		employee=allocation.employee,
+		leave_type=allocation.leave_type,
+		from_date=ledger.from_date,
+		to_date=ledger.to_date,
+		last_allocation_date=ledger.last_allocation_date,
+		total_leaves_allocated=flt(ledger.cf_leaves) + flt(ledger.new_leaves),
+		new_leaves_allocated=flt(ledger.new_leaves),
+		unused_leaves=flt(ledger.cf_leaves),
+		cf_expiry=get_allocation_expiry_for_cf_leaves(
+			allocation.employee, allocation.leave_type, ledger.to_date, ledger.from_date
+		)
+		or None,
+		new_leaves_taken=0,
+		cf_leaves_taken=0,
+	)
+	snapshot.leaves_taken = -get_leaves_for_period(
+		snapshot.employee, snapshot.leave_type, snapshot.from_date, snapshot.to_date
+	)
+	snapshot.manually_expired_leaves = flt(
+		get_manually_expired_leaves(
+			snapshot.employee, snapshot.leave_type, snapshot.from_date, snapshot.to_date
+		)
+	)
+
+	if snapshot.cf_expiry and snapshot.unused_leaves:
+		new_leaves_taken, cf_leaves_taken = get_new_and_cf_leaves_taken(snapshot, snapshot.cf_expiry)
+		snapshot.new_leaves_taken = -new_leaves_taken
+		snapshot.cf_leaves_taken = -cf_leaves_taken
+
+	return snapshot
+
+
+def invalidate_holiday_list_snapshots(doc, method=None):
+	"""Invalidates snapshots of leave types excluding holidays in the holiday list's dates"""
+	leave_types = frappe.get_all("Leave Type", filters={"include_holiday": 0}, pluck="name")
+	if leave_types:
+		invalidate_leave_balance_snapshots(leave_types, doc.from_date, doc.to_date)
+
+
+def invalidate_leave_balance_snapshots(leave_types: list[str], from_date=None, to_date=None) -> None:
+	"""Deletes snapshots of the leave types overlapping the dates, if set, and queues their recomputation.
+	Balances of allocations without a snapshot are computed from the leave ledger meanwhile"""
+	filters = {"leave_type": ("in", leave_types)}
+	if from_date:
+		filters["to_date"] = (">=", from_date)
+	if to_date:
+		filters["from_date"] = ("<=", to_date)
+
+	allocations = frappe.get_all("Leave Balance Snapshot", filters=filters, pluck="name")
+	if not allocations:
+		return
+
+	frappe.db.delete("Leave Balance Snapshot", {"name": ("in", allocations)})
+	frappe.enqueue(
+		refresh_snapshots_of_allocations,
+		queue="long",
+		timeout=3000,
+		enqueue_after_commit=True,
+		allocations=allocations,
+	)
+
+
+def refresh_snapshots_of_allocations(allocations: list[str]) -> None:
+	for batch in create_batch(allocations, 500):
+		for allocation in batch:
+			refresh_leave_balance_snapshot(allocation)
+		frappe.db.commit()  # nosemgrep
+
+
+def rebuild_leave_balance_snapshots(employee: str | None = None) -> None:
+	"""Rebuilds snapshots of all submitted allocations from the leave ledger, eg:
+	bench --site <site> execute hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot.rebuild_leave_balance_snapshots
+	"""
+	filters = {"employee": employee} if employee else {}
+	frappe.db.delete("Leave Balance Snapshot", filters)
+
+	allocations = frappe.get_all("Leave Allocation", filters={"docstatus": 1, **filters}, pluck="name")
+	for batch in create_batch(allocations, 500):
+		for allocation in batch:
+			refresh_leave_balance_snapshot(allocation)
+		frappe.db.commit()  # nosemgrep
+
+
+def check_leave_balance_snapshots(employee: str | None = None, fix: bool = False) -> list[str]:
+	"""Compares snapshots with balances computed from the leave ledger and returns the allocations
+	with stale or missing snapshots, eg: changed outside the leave ledger and the hooks invalidating them.
+	Stale snapshots are recomputed if `fix` is set"""
+	filters = {"docstatus": 1, "employee": employee} if employee else {"docstatus": 1}
+	allocations = frappe.get_all("Leave Allocation", filters=filters, pluck="name")
+
+	mismatched = []
+	for batch in create_batch(allocations, 500):
+		snapshots = {
+			snapshot.name: snapshot
+			for snapshot in frappe.get_all(
+				"Leave Balance Snapshot",
+				filters={"name": ("in", batch)},
+				fields=["name", *SNAPSHOT_FIELDS],
+			)
+		}
+		stale = []
+		for allocation in batch:
+			expected = get_leave_balance_snapshot_values(allocation)
+			snapshot = snapshots.get(allocation)
+			if not expected and not snapshot:
+				continue
+
+			if not (expected and snapshot) or any(
+				is_mismatch(expected[field], snapshot[field]) for field in SNAPSHOT_FIELDS
+			):
+				stale.append(allocation)
+
+		if fix and stale:
+			for allocation in stale:
+				refresh_leave_balance_snapshot(allocation)
+			frappe.db.commit()  # nosemgrep
+
+		mismatched.extend(stale)
+
+	return mismatched
+
+
+def is_mismatch(expected, actual) -> bool:
+	if isinstance(expected, int | float):
+		return flt(expected, 6) != flt(actual, 6)
+	return (expected or None) != (actual or None)
+
+
+def repair_leave_balance_snapshots():
+	"""Scheduled job to recompute snapshots made stale by changes outside the leave ledger"""
+	check_leave_balance_snapshots(fix=True)
@@ -0,0 +1,128 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, get_year_ending, get_year_start, getdate
+
+from erpnext.setup.doctype.employee.test_employee import make_employee
+from erpnext.setup.doctype.holiday_list.test_holiday_list import set_holiday_list
+
+from hrms.hr.doctype.leave_application.leave_application import get_leave_balance_on, get_leave_details
+from hrms.hr.doctype.leave_application.test_leave_application import make_allocation_record
+from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import (
+	check_leave_balance_snapshots,
+	get_leave_balance_snapshot_values,
+)
+from hrms.hr.doctype.leave_type.test_leave_type import create_leave_type
+from hrms.payroll.doctype.salary_slip.test_salary_slip import make_holiday_list, make_leave_application
+from hrms.tests.test_utils import get_first_sunday
+
+test_records = frappe.get_test_records("Leave Type")
+
+
+class TestLeaveBalanceSnapshot(IntegrationTestCase):
+	def setUp(self):
+		for doctype in [
+			"Leave Application",
+			"Leave Allocation",
+			"Leave Ledger Entry",
+			"Leave Balance Snapshot",
+			"Leave Type",
+		]:
+			frappe.db.delete(doctype)
+
+		frappe.set_user("Administrator")
+		frappe.get_doc(test_records[0]).insert()
+
+		self.employee = make_employee("test_leave_balance_snapshot@example.com", company="_Test Company")
+		self.year_start = getdate(get_year_start(getdate()))
+		self.year_end = getdate(get_year_ending(getdate()))
+		self.holiday_list = make_holiday_list(
+			"_Test Leave Balance Snapshot Holiday List", self.year_start, self.year_end
+		)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	@set_holiday_list("_Test Leave Balance Snapshot Holiday List", "_Test Company")
+	def test_snapshot_maintained_from_ledger(self):
+		allocation = make_allocation_record(
+			employee=self.employee, from_date=self.year_start, to_date=self.year_end, leaves=20
+		)
+		snapshot = frappe.get_doc("Leave Balance Snapshot", allocation.name)
+		self.assertEqual(snapshot.total_leaves_allocated, 20)
+		self.assertEqual(snapshot.leaves_taken, 0)
+
+		first_sunday = get_first_sunday(self.holiday_list, for_date=self.year_start)
+		application = make_leave_application(
+			self.employee, add_days(first_sunday, 1), add_days(first_sunday, 4), "_Test Leave Type"
+		)
+		snapshot.reload()
+		self.assertEqual(snapshot.leaves_taken, application.total_leave_days)
+
+		# balance read from the snapshot matches the balance computed from the ledger
+		frappe.db.delete("Leave Balance Snapshot")
+		expected = get_leave_balance_on(
+			self.employee,
+			"_Test Leave Type",
+			self.year_start,
+			consider_all_leaves_in_the_allocation_period=True,
+		)
+		check_leave_balance_snapshots(self.employee, fix=True)
+		self.assertTrue(frappe.db.exists("Leave Balance Snapshot", allocation.name))
+		self.assertEqual(
+			get_leave_balance_on(
+				self.employee,
+				"_Test Leave Type",
+				self.year_start,
+				consider_all_leaves_in_the_allocation_period=True,
+			),
+			expected,
+		)
+
+		application.cancel()
+		snapshot.reload()
+		self.assertEqual(snapshot.leaves_taken, 0)
+
+		allocation.cancel()
+		self.assertFalse(frappe.db.exists("Leave Balance Snapshot", allocation.name))
+
+	def test_consistency_check(self):
+		allocation = make_allocation_record(
+			employee=self.employee, from_date=self.year_start, to_date=self.year_end, leaves=20
+		)
+		self.assertEqual(check_leave_balance_snapshots(self.employee), [])
+
+		frappe.db.set_value("Leave Balance Snapshot", allocation.name, "total_leaves_allocated", 10)
+		self.assertEqual(check_leave_balance_snapshots(self.employee, fix=True), [allocation.name])
+		self.assertEqual(
+			frappe.db.get_value("Leave Balance Snapshot", allocation.name, "total_leaves_allocated"),
+			get_leave_balance_snapshot_values(allocation.name).total_leaves_allocated,
+		)
+
+	@set_holiday_list("_Test Leave Balance Snapshot Holiday List", "_Test Company")
+	def test_leave_details_of_leave_types_without_snapshot(self):
+		create_leave_type(leave_type_name="_Test Leave Type Without Snapshot")
+		allocation = make_allocation_record(
+			employee=self.employee, from_date=self.year_start, to_date=self.year_end, leaves=20
+		)
+		make_allocation_record(
+			employee=self.employee,
+			leave_type="_Test Leave Type Without Snapshot",
+			from_date=self.year_start,
+			to_date=self.year_end,
+			leaves=10,
+		)
+		expected = get_leave_details(self.employee, self.year_start)["leave_allocation"]
+
+		# leave types without a snapshot are computed from the ledger
+		frappe.db.delete("Leave Balance Snapshot", {"leave_type": "_Test Leave Type Without Snapshot"})
+		self.assertEqual(get_leave_details(self.employee, self.year_start)["leave_allocation"], expected)
+
+		# snapshots are invalidated when the leave type's holidays change
+		leave_type = frappe.get_doc("Leave Type", "_Test Leave Type")
+		leave_type.include_holiday = int(not leave_type.include_holiday)
+		leave_type.save()
+		self.assertFalse(frappe.db.exists("Leave Balance Snapshot", allocation.name))
+		self.assertEqual(get_leave_details(self.employee, self.year_start)["leave_allocation"], expected)
@@ -6,6 +6,8 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import DATE_FORMAT, flt, formatdate, get_link_to_form, getdate, today
 
+from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import refresh_leave_balance_snapshots
+
 
 class InvalidLeaveLedgerEntry(frappe.ValidationError):
 	pass
@@ -25,6 +27,9 @@ class LeaveLedgerEntry(Document):
 				title=_("Invalid Leave Ledger Entry"),
 			)
 
+	def on_submit(self):
+		refresh_leave_balance_snapshots(self)
+
 	def on_cancel(self):
 		# allow cancellation of expiry leaves
 		if self.is_expired:
@@ -32,6 +37,8 @@ class LeaveLedgerEntry(Document):
 		else:
 			frappe.throw(_("Only expired allocation can be cancelled"))
 
+		refresh_leave_balance_snapshots(self)
+
 
 def validate_leave_allocation_against_leave_application(ledger):
 	"""Checks that leave allocation has no leave application against it"""
@@ -97,6 +104,7 @@ def delete_ledger_entry(ledger):
 			OR `name`=%s""",
 		(ledger.transaction_name, expired_entry),
 	)
+	refresh_leave_balance_snapshots(ledger)
 
 
 def get_previous_expiry_ledger_entry(ledger):
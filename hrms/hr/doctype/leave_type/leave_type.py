@@ -7,6 +7,8 @@ from frappe import _, bold
 from frappe.model.document import Document
 from frappe.utils import today
 
+from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import invalidate_leave_balance_snapshots
+
 
 class LeaveType(Document):
 	def validate(self):
@@ -71,6 +73,10 @@ class LeaveType(Document):
 					),
 				)
 
+	def on_update(self):
+		if not self.is_new() and self.has_value_changed("include_holiday"):
+			invalidate_leave_balance_snapshots(leave_types=[self.name])
+
 	def clear_cache(self):
 		from hrms.payroll.doctype.salary_slip.salary_slip import LEAVE_TYPE_MAP
 
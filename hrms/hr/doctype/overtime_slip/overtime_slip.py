@@ -16,6 +16,7 @@ from hrms.payroll.doctype.payroll_entry.payroll_entry import get_start_end_dates
 from hrms.payroll.doctype.salary_structure_assignment.salary_structure_assignment import (
 	get_assigned_salary_structure,
 )
+from hrms.utils.working_hours import get_payable_overtime_duration
 
 
 class OvertimeSlip(Document):
@@ -117,15 +118,9 @@ class OvertimeSlip(Document):
 					"Overtime Type", record.overtime_type, "maximum_overtime_hours_allowed"
 				)
 
-			maximum_overtime_hours_allowed = overtime_type_cache[record.overtime_type]
-			overtime_duration = record.actual_overtime_duration or 0.0
-
-			if maximum_overtime_hours_allowed > 0:
-				overtime_duration = (
-					overtime_duration
-					if maximum_overtime_hours_allowed > overtime_duration
-					else maximum_overtime_hours_allowed
-				)
+			overtime_duration = get_payable_overtime_duration(
+				record.actual_overtime_duration, overtime_type_cache[record.overtime_type]
+			)
 
 			if overtime_duration > 0:
 				self.append(
@@ -142,23 +137,13 @@ class OvertimeSlip(Document):
 	def get_attendance_records(self):
 		records = []
 		if self.start_date and self.end_date:
-			records = frappe.get_all(
-				"Attendance",
-				fields=[
-					"name",
-					"attendance_date",
-					"overtime_type",
-					"actual_overtime_duration",
-					"standard_working_hours",
-				],
-				filters={
-					"employee": self.employee,
-					"docstatus": 1,
-					"attendance_date": ("between", [getdate(self.start_date), getdate(self.end_date)]),
-					"status": "Present",
-					"overtime_type": ["!=", ""],
-				},
-			)
+			# attendance of all employees is fetched upfront when slips are created in bulk
+			if self.flags.attendance_records is not None:
+				records = self.flags.attendance_records
+			else:
+				records = get_overtime_attendance([self.employee], self.start_date, self.end_date).get(
+					self.employee, []
+				)
 			if not len(records):
 				frappe.throw(
 					_("No attendance records found for employee {0} between {1} and {2}").format(
@@ -392,6 +377,36 @@ class OvertimeSlip(Document):
 		return details
 
 
+def get_overtime_attendance(employees: list[str], start_date, end_date) -> dict[str, list[dict]]:
+	"""Returns attendance with overtime of the employees in the period by employee.
+	Overtime is computed when attendance is marked from check-ins, see `ShiftAttendanceCalculator`"""
+	attendance = frappe.get_all(
+		"Attendance",
+		fields=[
+			"name",
+			"employee",
+			"attendance_date",
+			"overtime_type",
+			"actual_overtime_duration",
+			"standard_working_hours",
+		],
+		filters={
+			"employee": ("in", employees),
+			"docstatus": 1,
+			"attendance_date": ("between", [getdate(start_date), getdate(end_date)]),
+			"status": "Present",
+			"overtime_type": ["!=", ""],
+		},
+		order_by="employee, attendance_date",
+	)
+
+	attendance_by_employee = {}
+	for record in attendance:
+		attendance_by_employee.setdefault(record.employee, []).append(record)
+
+	return attendance_by_employee
+
+
 @frappe.whitelist()
 def filter_employees_for_overtime_slip_creation(start_date, end_date, employees, limit=None):
 	if not employees:
@@ -446,10 +461,17 @@ def filter_employees_for_overtime_slip_creation(start_date, end_date, employees,
 def create_overtime_slips_for_employees(employees, args):
 	count = 0
 	errors = []
+	attendance = None
+	if args.get("start_date") and args.get("end_date"):
+		attendance = get_overtime_attendance(employees, args.get("start_date"), args.get("end_date"))
+
 	for emp in employees:
 		args.update({"doctype": "Overtime Slip", "employee": emp})
 		try:
-			frappe.get_doc(args).get_emp_and_overtime_details()
+			overtime_slip = frappe.get_doc(args)
+			if attendance is not None:
+				overtime_slip.flags.attendance_records = attendance.get(emp, [])
+			overtime_slip.get_emp_and_overtime_details()
 			count += 1
 		except Exception as e:
 			frappe.clear_last_message()
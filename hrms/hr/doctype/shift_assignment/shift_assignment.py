@@ -2,7 +2,9 @@
 # For license information, please see license.txt
 
 
-from datetime import datetime, timedelta
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from itertools import accumulate
 
 import frappe
 from frappe import _
@@ -10,7 +12,8 @@ from frappe.model.document import Document
 from frappe.query_builder import Criterion
 from frappe.utils import add_days, cint, cstr, get_link_to_form, get_time, getdate, now_datetime
 
-from hrms.hr.utils import validate_active_employee
+from hrms.hr.doctype.shift_attendance_checkpoint.shift_attendance_checkpoint import reset_absent_marked_till
+from hrms.hr.utils import has_event_handlers, reserve_series_names, validate_active_employee
 from hrms.utils import generate_date_range
 
 
@@ -29,15 +32,23 @@ class ShiftAssignment(Document):
 			self.validate_from_to_dates("start_date", "end_date")
 		self.validate_overlapping_shifts()
 
+	def on_submit(self):
+		reset_absent_marked_till(self.shift_type, self.employee, self.start_date)
+
 	def on_update_after_submit(self):
 		if self.end_date:
 			self.validate_from_to_dates("start_date", "end_date")
 		self.validate_overlapping_shifts()
+		reset_absent_marked_till(self.shift_type, self.employee, self.start_date)
 
 	def on_cancel(self):
 		self.validate_employee_checkin()
 		self.validate_attendance()
 
+		# the default shift applies again for the freed up dates
+		if default_shift := frappe.db.get_value("Employee", self.employee, "default_shift"):
+			reset_absent_marked_till(default_shift, self.employee, self.start_date)
+
 	def validate_employee_checkin(self):
 		checkins = frappe.get_all(
 			"Employee Checkin",
@@ -147,6 +158,11 @@ class ShiftAssignment(Document):
 			frappe.throw(msg, title=_("Overlapping Shifts"), exc=OverlappingShiftError)
 
 
+def on_doctype_update():
+	# for overlap checks of an employee's active assignments within a period
+	frappe.db.add_index("Shift Assignment", ["employee", "status", "docstatus", "start_date", "end_date"])
+
+
 def has_overlapping_timings(shift_1: str, shift_2: str) -> bool:
 	"""
 	Accepts two shift types and checks whether their timings are overlapping
@@ -155,11 +171,216 @@ def has_overlapping_timings(shift_1: str, shift_2: str) -> bool:
 	s1 = frappe.db.get_value("Shift Type", shift_1, ["start_time", "end_time"], as_dict=True)
 	s2 = frappe.db.get_value("Shift Type", shift_2, ["start_time", "end_time"], as_dict=True)
 
-	for d in [s1, s2]:
-		if d.end_time <= d.start_time:
-			d.end_time += timedelta(days=1)
+	return shift_timings_overlap(s1, s2)
+
+
+def shift_timings_overlap(s1: dict, s2: dict) -> bool:
+	"""Checks whether shift timings given as dicts of `start_time` and `end_time` timedeltas overlap"""
+	s1_end = s1.end_time + timedelta(days=1) if s1.end_time <= s1.start_time else s1.end_time
+	s2_end = s2.end_time + timedelta(days=1) if s2.end_time <= s2.start_time else s2.end_time
+
+	return s1_end > s2.start_time and s1.start_time < s2_end
+
+
+def validate_shift_assignments(assignments: list[dict]) -> list[str | None]:
+	"""Validates a list of proposed shift assignments against the existing ones and each other in a single pass.
+	Returns the error message for every assignment, None if it is valid"""
+	validator = ShiftOverlapValidator(assignments)
+	return [validator.validate(assignment) for assignment in assignments]
+
 
-	return s1.end_time > s2.start_time and s1.start_time < s2.end_time
+class ShiftOverlapValidator:
+	"""Validates new shift assignments like `ShiftAssignment.validate` against active assignments
+	of the employees fetched once, and against the new assignments validated before them"""
+
+	def __init__(self, assignments: list[dict]):
+		employees = list({d.employee for d in assignments})
+		from_date = min((getdate(d.start_date) for d in assignments), default=None)
+		# open ended assignments overlap with all later assignments
+		to_date = (
+			max(getdate(d.end_date) for d in assignments)
+			if assignments and all(d.end_date for d in assignments)
+			else None
+		)
+
+		self.inactive_employees = set(
+			frappe.get_all(
+				"Employee", filters={"name": ("in", employees), "status": "Inactive"}, pluck="name"
+			)
+		)
+		self.allow_multiple_shifts = cint(
+			frappe.db.get_single_value("HR Settings", "allow_multiple_shift_assignments")
+		)
+
+		self.assignments = {}
+		if employees:
+			ShiftAssignment = frappe.qb.DocType("Shift Assignment")
+			existing = (
+				frappe.qb.from_(ShiftAssignment)
+				.select(
+					ShiftAssignment.name,
+					ShiftAssignment.employee,
+					ShiftAssignment.shift_type,
+					ShiftAssignment.start_date,
+					ShiftAssignment.end_date,
+				)
+				.where(
+					(ShiftAssignment.employee.isin(employees))
+					& (ShiftAssignment.docstatus == 1)
+					& (ShiftAssignment.status == "Active")
+					& ((ShiftAssignment.end_date >= from_date) | (ShiftAssignment.end_date.isnull()))
+				)
+			)
+			if to_date:
+				existing = existing.where(ShiftAssignment.start_date <= to_date)
+
+			for d in existing.run(as_dict=True):
+				self.assignments.setdefault(d.employee, []).append(d)
+
+		shift_types = {d.shift_type for d in assignments} | {
+			d.shift_type for rows in self.assignments.values() for d in rows
+		}
+		self.shift_timings = {
+			d.name: d
+			for d in frappe.get_all(
+				"Shift Type",
+				filters={"name": ("in", list(shift_types))},
+				fields=["name", "start_time", "end_time"],
+			)
+		}
+
+	def validate(self, assignment: dict) -> str | None:
+		"""Returns the error message if the assignment is invalid, else adds it to the validated assignments"""
+		if assignment.employee in self.inactive_employees:
+			return _("Transactions cannot be created for an Inactive Employee {0}.").format(
+				frappe.bold(assignment.employee)
+			)
+
+		if assignment.end_date and getdate(assignment.end_date) < getdate(assignment.start_date):
+			return _("End Date cannot be before Start Date.")
+
+		if assignment.status == "Active":
+			for d in self.assignments.get(assignment.employee, []):
+				if not (
+					(d.end_date is None or getdate(d.end_date) >= getdate(assignment.start_date))
+					and (assignment.end_date is None or getdate(d.start_date) <= getdate(assignment.end_date))
+				):
+					continue
+
+				if not self.allow_multiple_shifts:
+					return _(
+						"{0} already has an active Shift Assignment {1} for some/all of these dates."
+					).format(frappe.bold(assignment.employee), self.get_link(d))
+
+				if shift_timings_overlap(
+					self.shift_timings[assignment.shift_type], self.shift_timings[d.shift_type]
+				):
+					return _(
+						"Employee {0} already has an active Shift {1}: {2} that overlaps within this period."
+					).format(frappe.bold(assignment.employee), frappe.bold(d.shift_type), self.get_link(d))
+
+			self.assignments.setdefault(assignment.employee, []).append(assignment)
+
+	@staticmethod
+	def get_link(assignment: dict) -> str:
+		# assignments validated in the same batch are not inserted yet
+		if not assignment.name:
+			return _("from {0} to {1}").format(assignment.start_date, assignment.end_date or _("onwards"))
+		return get_link_to_form("Shift Assignment", assignment.name)
+
+
+def bulk_insert_shift_assignments(assignments: list[dict]) -> None:
+	"""Inserts submitted Shift Assignments validated with `validate_shift_assignments` using multi-row inserts.
+	Sets the names of the inserted assignments"""
+	if not assignments:
+		return
+
+	if has_event_handlers("Shift Assignment"):
+		# handlers of insert and submit events run only for documents inserted one by one
+		for d in assignments:
+			doc = frappe.get_doc({"doctype": "Shift Assignment", **d})
+			doc.insert()
+			doc.submit()
+			d.name = doc.name
+		return
+
+	employees = {
+		d.name: d
+		for d in frappe.get_all(
+			"Employee",
+			filters={"name": ("in", list({d.employee for d in assignments}))},
+			fields=["name", "employee_name", "department"],
+		)
+	}
+	overtime_types = dict(
+		frappe.get_all(
+			"Shift Type",
+			filters={"name": ("in", list({d.shift_type for d in assignments}))},
+			fields=["name", "overtime_type"],
+			as_list=True,
+		)
+	)
+	names = reserve_series_names(frappe.get_meta("Shift Assignment").autoname, len(assignments))
+	now = now_datetime()
+	user = frappe.session.user
+
+	values = []
+	for name, d in zip(names, assignments, strict=True):
+		d.name = name
+		values.append(
+			(
+				name,
+				d.employee,
+				employees[d.employee].employee_name,
+				employees[d.employee].department,
+				d.company,
+				d.shift_type,
+				d.start_date,
+				d.end_date,
+				d.status,
+				d.shift_location,
+				d.shift_schedule_assignment,
+				overtime_types.get(d.shift_type),
+				1,
+				user,
+				user,
+				now,
+				now,
+			)
+		)
+
+	frappe.db.bulk_insert(
+		"Shift Assignment",
+		[
+			"name",
+			"employee",
+			"employee_name",
+			"department",
+			"company",
+			"shift_type",
+			"start_date",
+			"end_date",
+			"status",
+			"shift_location",
+			"shift_schedule_assignment",
+			"overtime_type",
+			"docstatus",
+			"owner",
+			"modified_by",
+			"creation",
+			"modified",
+		],
+		values,
+	)
+
+	# same as on submit, absentees are marked again from the start of the new assignments
+	absent_from = {}
+	for d in assignments:
+		key = (d.shift_type, d.employee)
+		absent_from[key] = min(absent_from.get(key, d.start_date), d.start_date)
+
+	for (shift_type, employee), from_date in absent_from.items():
+		reset_absent_marked_till(shift_type, employee, from_date)
 
 
 @frappe.whitelist()
@@ -442,6 +663,123 @@ def get_employee_shift(
 	return shift_details or {}
 
 
+class ShiftResolutionIndex:
+	"""Resolves shifts of employees from their active shift assignments and default shifts loaded once
+	for a period, eg: for processing check-ins and attendance in bulk. Lookups mirror `get_employee_shift`
+	and fall back to it for timestamps outside the period.
+
+	Assignments of an employee are sorted by start date along with the running maximum of their end dates,
+	so the assignments overlapping a date are found with a binary search.
+	"""
+
+	def __init__(self, employees: list[str], from_date, to_date):
+		self.from_date = getdate(from_date)
+		self.to_date = getdate(to_date)
+		self.default_shifts = dict(
+			frappe.get_all(
+				"Employee",
+				filters={"name": ("in", employees)},
+				fields=["name", "default_shift"],
+				as_list=True,
+			)
+		)
+
+		assignment = frappe.qb.DocType("Shift Assignment")
+		assignments = (
+			frappe.qb.from_(assignment)
+			.select(
+				assignment.name,
+				assignment.employee,
+				assignment.shift_type,
+				assignment.start_date,
+				assignment.end_date,
+				assignment.overtime_type,
+			)
+			.where(
+				(assignment.employee.isin(employees))
+				& (assignment.docstatus == 1)
+				& (assignment.status == "Active")
+				& (assignment.start_date <= self.to_date)
+				& (assignment.end_date.isnull() | (assignment.end_date >= self.from_date))
+			)
+			.orderby(assignment.start_date)
+		).run(as_dict=True)
+
+		self.assignments = {}
+		for d in assignments:
+			self.assignments.setdefault(d.employee, []).append(d)
+
+		self.start_dates = {}
+		self.max_end_dates = {}
+		for employee, employee_assignments in self.assignments.items():
+			self.start_dates[employee] = [d.start_date for d in employee_assignments]
+			self.max_end_dates[employee] = list(
+				accumulate((d.end_date or date.max for d in employee_assignments), max)
+			)
+
+	def covers(self, for_date) -> bool:
+		"""Checks whether all assignments that can apply on the date are loaded"""
+		return self.from_date <= add_days(for_date, -1) and add_days(for_date, 1) <= self.to_date
+
+	def get_assignments(self, employee: str, from_date, to_date) -> list[dict]:
+		"""Returns assignments of the employee overlapping the given period"""
+		assignments = self.assignments.get(employee, [])
+		max_end_dates = self.max_end_dates.get(employee, [])
+		i = bisect_right(self.start_dates.get(employee, []), to_date)
+
+		overlapping = []
+		# no earlier assignment can end on or after `from_date` once the running maximum is before it
+		while i > 0 and max_end_dates[i - 1] >= from_date:
+			i -= 1
+			if (assignments[i].end_date or date.max) >= from_date:
+				overlapping.append(assignments[i])
+
+		return overlapping
+
+	def get_shift_for_timestamp(self, employee: str, for_timestamp: datetime) -> dict:
+		for_date = for_timestamp.date()
+		if not self.covers(for_date):
+			return get_shift_for_timestamp(employee, for_timestamp)
+
+		shifts = self.get_assignments(employee, add_days(for_date, -1), add_days(for_date, 1))
+		if shifts:
+			return get_shift_for_time(shifts, for_timestamp)
+		return {}
+
+	def get_employee_shift(
+		self,
+		employee: str,
+		for_timestamp: datetime | None = None,
+		consider_default_shift: bool = False,
+		next_shift_direction: str | None = None,
+	) -> dict:
+		"""In-memory equivalent of `get_employee_shift`"""
+		if for_timestamp is None:
+			for_timestamp = now_datetime()
+
+		shift_details = self.get_shift_for_timestamp(employee, for_timestamp)
+
+		# if shift assignment is not found, consider default shift
+		default_shift = self.default_shifts.get(employee)
+		if not shift_details and consider_default_shift:
+			shift_details = get_shift_details(default_shift, for_timestamp)
+
+		# if no shift is found, find next or prev shift assignment based on direction
+		if not shift_details and next_shift_direction:
+			if consider_default_shift and default_shift:
+				direction = -1 if next_shift_direction == "reverse" else 1
+				shift_details = self.get_employee_shift(
+					employee, for_timestamp + timedelta(days=direction), consider_default_shift
+				)
+			else:
+				# assignments outside the period are needed to look for the next or prev assignment
+				shift_details = get_prev_or_next_shift(
+					employee, for_timestamp, consider_default_shift, default_shift, next_shift_direction
+				)
+
+		return shift_details or {}
+
+
 def get_prev_or_next_shift(
 	employee: str,
 	for_timestamp: datetime,
@@ -497,23 +835,28 @@ def get_prev_or_next_shift(
 
 
 def get_employee_shift_timings(
-	employee: str, for_timestamp: datetime | None = None, consider_default_shift: bool = False
+	employee: str,
+	for_timestamp: datetime | None = None,
+	consider_default_shift: bool = False,
+	shift_index: ShiftResolutionIndex | None = None,
 ) -> list[dict]:
 	"""Returns previous shift, current/upcoming shift, next_shift for the given timestamp and employee"""
 	if for_timestamp is None:
 		for_timestamp = now_datetime()
 
+	get_shift = shift_index.get_employee_shift if shift_index else get_employee_shift
+
 	# write and verify a test case for midnight shift.
 	prev_shift = curr_shift = next_shift = None
-	curr_shift = get_employee_shift(employee, for_timestamp, consider_default_shift, "forward")
+	curr_shift = get_shift(employee, for_timestamp, consider_default_shift, "forward")
 	if curr_shift:
-		next_shift = get_employee_shift(
+		next_shift = get_shift(
 			employee,
 			curr_shift.start_datetime + timedelta(days=1),
 			consider_default_shift,
 			"forward",
 		)
-	prev_shift = get_employee_shift(
+	prev_shift = get_shift(
 		employee,
 		(curr_shift.end_datetime if curr_shift else for_timestamp) + timedelta(days=-1),
 		consider_default_shift,
@@ -549,7 +892,10 @@ def get_employee_shift_timings(
 
 
 def get_actual_start_end_datetime_of_shift(
-	employee: str, for_timestamp: datetime, consider_default_shift: bool = False
+	employee: str,
+	for_timestamp: datetime,
+	consider_default_shift: bool = False,
+	shift_index: ShiftResolutionIndex | None = None,
 ) -> dict:
 	"""Returns a Dict containing shift details with actual_start and actual_end datetime values
 	Here 'actual' means taking into account the "begin_check_in_before_shift_start_time" and "allow_check_out_after_shift_end_time".
@@ -559,9 +905,10 @@ def get_actual_start_end_datetime_of_shift(
 	:param for_timestamp (datetime, optional): Datetime value of checkin, if not provided considers current datetime
 	:param consider_default_shift (bool, optional): Flag (defaults to False) to specify whether to consider
 	default shift in employee master if no shift assignment is found
+	:param shift_index (ShiftResolutionIndex, optional): Index to resolve shifts from instead of querying assignments
 	"""
 	shift_timings_as_per_timestamp = get_employee_shift_timings(
-		employee, for_timestamp, consider_default_shift
+		employee, for_timestamp, consider_default_shift, shift_index
 	)
 	return get_exact_shift(shift_timings_as_per_timestamp, for_timestamp)
 
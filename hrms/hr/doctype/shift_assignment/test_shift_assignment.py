@@ -9,8 +9,11 @@ from erpnext.setup.doctype.employee.test_employee import make_employee
 from hrms.hr.doctype.shift_assignment.shift_assignment import (
 	MultipleShiftError,
 	OverlappingShiftError,
+	ShiftResolutionIndex,
 	get_actual_start_end_datetime_of_shift,
+	get_employee_shift,
 	get_events,
+	validate_shift_assignments,
 )
 from hrms.hr.doctype.shift_type.test_shift_type import make_shift_assignment, setup_shift_type
 from hrms.tests.utils import HRMSTestSuite
@@ -251,3 +254,74 @@ class TestShiftAssignment(HRMSTestSuite):
 		self.assertTrue(checkin.shift_type.name == checkout.shift_type.name == "Morning")
 		self.assertEqual(checkin.actual_start, get_datetime(f"{yesterday} 06:00:00"))
 		self.assertEqual(checkout.actual_end, get_datetime(f"{yesterday} 13:00:00"))
+
+	def test_shift_resolution_index(self):
+		employee = make_employee("test_shift_resolution_index@example.com", company="_Test Company")
+		today = getdate()
+
+		default_shift = setup_shift_type(
+			shift_type="Test Index Day", start_time="07:00:00", end_time="19:00:00"
+		)
+		frappe.db.set_value("Employee", employee, "default_shift", default_shift.name)
+		night_shift = setup_shift_type(
+			shift_type="Test Index Night", start_time="19:00:00", end_time="07:00:00"
+		)
+		morning_shift = setup_shift_type(
+			shift_type="Test Index Morning", start_time="06:00:00", end_time="10:00:00"
+		)
+		# long running assignment overlapping a later, shorter one
+		make_shift_assignment(night_shift.name, employee, add_days(today, -10), add_days(today, 10))
+		make_shift_assignment(morning_shift.name, employee, add_days(today, -2), add_days(today, -1))
+
+		shift_index = ShiftResolutionIndex([employee], add_days(today, -5), add_days(today, 5))
+		for days in range(-8, 8):
+			for time in ("06:30:00", "12:00:00", "20:00:00"):
+				timestamp = get_datetime(f"{add_days(today, days)} {time}")
+				for direction in (None, "forward", "reverse"):
+					self.assertEqual(
+						shift_index.get_employee_shift(employee, timestamp, True, direction),
+						get_employee_shift(employee, timestamp, True, direction),
+					)
+
+	def test_validate_shift_assignments(self):
+		employee = make_employee("test_shift_assignment@example.com", company="_Test Company")
+		date = getdate()
+		frappe.db.set_single_value("HR Settings", "allow_multiple_shift_assignments", 1)
+
+		setup_shift_type(shift_type="Shift 1", start_time="08:00:00", end_time="12:00:00")
+		setup_shift_type(shift_type="Shift 2", start_time="11:00:00", end_time="15:00:00")
+		setup_shift_type(shift_type="Shift 3", start_time="12:00:00", end_time="16:00:00")
+		existing = make_shift_assignment("Shift 1", employee, date, add_days(date, 5))
+
+		def assignment(shift_type, start_date, end_date=None):
+			return frappe._dict(
+				employee=employee,
+				company="_Test Company",
+				shift_type=shift_type,
+				start_date=start_date,
+				end_date=end_date,
+				status="Active",
+			)
+
+		errors = validate_shift_assignments(
+			[
+				# overlaps with the existing assignment
+				assignment("Shift 2", add_days(date, 5), add_days(date, 6)),
+				assignment("Shift 2", add_days(date, 6), add_days(date, 10)),
+				# overlaps with the previous proposed assignment
+				assignment("Shift 2", add_days(date, 10)),
+				assignment("Shift 3", date, add_days(date, 5)),
+			]
+		)
+		self.assertIn(existing.name, errors[0])
+		self.assertIsNone(errors[1])
+		self.assertIsNotNone(errors[2])
+		self.assertIsNone(errors[3])
+
+		frappe.db.set_single_value("HR Settings", "allow_multiple_shift_assignments", 0)
+		errors = validate_shift_assignments(
+			[assignment("Shift 3", date), assignment("Shift 3", add_days(date, 6))]
+		)
+		self.assertIn(existing.name, errors[0])
+		self.assertIsNone(errors[1])
+		frappe.db.set_single_value("HR Settings", "allow_multiple_shift_assignments", 1)
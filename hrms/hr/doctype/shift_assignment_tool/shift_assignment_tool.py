@@ -8,9 +8,17 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.query_builder import Case, Interval
 from frappe.query_builder.terms import SubQuery
-from frappe.utils import get_link_to_form
+from frappe.utils import get_link_to_form, getdate
 
-from hrms.hr.utils import validate_bulk_tool_fields
+from hrms.hr.doctype.shift_assignment.shift_assignment import (
+	bulk_insert_shift_assignments,
+	validate_shift_assignments,
+)
+from hrms.hr.doctype.shift_schedule_assignment.shift_schedule_assignment import (
+	get_scheduled_shift_assignments,
+	get_shift_schedules,
+)
+from hrms.hr.utils import has_event_handlers, validate_bulk_tool_fields
 
 
 class ShiftAssignmentTool(Document):
@@ -197,48 +205,85 @@ class ShiftAssignmentTool(Document):
 		)
 
 	def _bulk_assign(self, employees: list):
-		success, failure = [], []
-		count = 0
-		savepoint = "before_assignment"
 		if self.action == "Assign Shift":
 			doctype = "Shift Assignment"
 			event = "completed_bulk_shift_assignment"
+			assignments = {
+				employee: [
+					frappe._dict(
+						employee=employee,
+						company=self.company,
+						shift_type=self.shift_type,
+						start_date=getdate(self.start_date),
+						end_date=getdate(self.end_date) if self.end_date else None,
+						status=self.status,
+						shift_location=self.shift_location,
+					)
+				]
+				for employee in employees
+			}
 		else:
 			doctype = "Shift Schedule Assignment"
 			event = "completed_bulk_shift_schedule_assignment"
+			assignments = self.get_scheduled_shift_assignments(employees)
+
+		# assignments of all employees are validated against the existing ones in a single pass,
+		# an employee's assignments are created only if all of them are valid
+		errors = iter(validate_shift_assignments([d for rows in assignments.values() for d in rows]))
+		# with event handlers, assignments are inserted one by one and may fail for an employee
+		insert_per_employee = has_event_handlers("Shift Assignment")
+		failure, valid_assignments, created = [], [], {}
+		savepoint = "before_assignment"
 
-		for d in employees:
-			try:
-				frappe.db.savepoint(savepoint)
-				assignment = (
-					self.create_shift_schedule_assignment(d)
-					if self.action == "Assign Shift Schedule"
-					else create_shift_assignment(
-						d,
-						self.company,
-						self.shift_type,
-						self.start_date,
-						self.end_date,
-						self.status,
-						self.shift_location,
-					)
-				)
-				if self.action == "Assign Shift Schedule":
-					assignment.create_shifts(self.start_date, self.end_date)
-
-			except Exception:
-				frappe.db.rollback(save_point=savepoint)
+		for count, (employee, rows) in enumerate(assignments.items(), start=1):
+			row_errors = [next(errors) for _row in rows]
+			if error := next(filter(None, row_errors), None):
 				frappe.log_error(
-					f"Bulk Assignment - {doctype} failed for employee {d}.",
+					f"Bulk Assignment - {doctype} failed for employee {employee}.",
+					message=error,
 					reference_doctype=doctype,
 				)
-				failure.append(d)
+				failure.append(employee)
 			else:
-				success.append({"doc": get_link_to_form(doctype, assignment.name), "employee": d})
+				try:
+					frappe.db.savepoint(savepoint)
+					if self.action == "Assign Shift Schedule":
+						created[employee] = self.create_shift_schedule_assignment(employee).name
+						for d in rows:
+							d.shift_schedule_assignment = created[employee]
+					if insert_per_employee:
+						bulk_insert_shift_assignments(rows)
+				except Exception:
+					frappe.db.rollback(save_point=savepoint)
+					frappe.log_error(
+						f"Bulk Assignment - {doctype} failed for employee {employee}.",
+						reference_doctype=doctype,
+					)
+					failure.append(employee)
+					created.pop(employee, None)
+				else:
+					valid_assignments.extend(rows)
 
-			count += 1
 			frappe.publish_progress(count * 100 / len(employees), title=_("Creating {0}...").format(doctype))
 
+		if not insert_per_employee:
+			bulk_insert_shift_assignments(valid_assignments)
+
+		if self.action == "Assign Shift":
+			created = {d.employee: d.name for d in valid_assignments}
+		else:
+			# shifts after the last created assignment are created by the scheduled job
+			frappe.db.bulk_update(
+				"Shift Schedule Assignment",
+				{d.shift_schedule_assignment: {"create_shifts_after": d.end_date} for d in valid_assignments},
+				update_modified=False,
+			)
+
+		success = [
+			{"doc": get_link_to_form(doctype, name), "employee": employee}
+			for employee, name in created.items()
+		]
+
 		frappe.clear_messages()
 		frappe.publish_realtime(
 			event,
@@ -247,6 +292,23 @@ class ShiftAssignmentTool(Document):
 			after_commit=True,
 		)
 
+	def get_scheduled_shift_assignments(self, employees: list) -> dict[str, list[dict]]:
+		shift_schedule = get_shift_schedules({self.shift_schedule})[self.shift_schedule]
+		return {
+			employee: get_scheduled_shift_assignments(
+				frappe._dict(
+					employee=employee,
+					company=self.company,
+					shift_status=self.status,
+					shift_location=self.shift_location,
+				),
+				shift_schedule,
+				self.start_date,
+				self.end_date,
+			)
+			for employee in employees
+		}
+
 	@frappe.whitelist()
 	def bulk_process_shift_requests(self, shift_requests: list, status: str):
 		if not shift_requests:
@@ -312,27 +374,3 @@ class ShiftAssignmentTool(Document):
 		assignment.flags.ingore_validate = True
 		assignment.save()
 		return assignment
-
-
-def create_shift_assignment(
-	employee: str,
-	company: str,
-	shift_type: str,
-	start_date: str,
-	end_date: str,
-	status: str,
-	shift_location: str | None = None,
-	shift_schedule_assignment: str | None = None,
-) -> str:
-	assignment = frappe.new_doc("Shift Assignment")
-	assignment.employee = employee
-	assignment.company = company
-	assignment.shift_type = shift_type
-	assignment.start_date = start_date
-	assignment.end_date = end_date
-	assignment.status = status
-	assignment.shift_location = shift_location
-	assignment.shift_schedule_assignment = shift_schedule_assignment
-	assignment.save()
-	assignment.submit()
-	return assignment
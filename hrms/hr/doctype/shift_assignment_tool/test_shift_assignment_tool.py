@@ -1,12 +1,15 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests import IntegrationTestCase, change_settings
 from frappe.utils import add_days, getdate
 
 from erpnext.setup.doctype.employee.test_employee import make_employee
 
+from hrms.hr.doctype.shift_assignment.shift_assignment import bulk_insert_shift_assignments
 from hrms.hr.doctype.shift_assignment_tool.shift_assignment_tool import ShiftAssignmentTool
 from hrms.hr.doctype.shift_request.test_shift_request import make_shift_request
 from hrms.hr.doctype.shift_schedule.shift_schedule import get_or_insert_shift_schedule
@@ -200,7 +203,15 @@ class TestShiftAssignmentTool(IntegrationTestCase):
 		shift_assignment_tool = ShiftAssignmentTool(args)
 
 		employees = [self.emp1, self.emp2, self.emp3]
-		shift_assignment_tool.bulk_assign(employees)
+		with patch(
+			"hrms.hr.doctype.shift_assignment_tool.shift_assignment_tool.bulk_insert_shift_assignments",
+			wraps=bulk_insert_shift_assignments,
+		) as bulk_insert:
+			shift_assignment_tool.bulk_assign(employees)
+
+		# without Shift Assignment event handlers, assignments of all employees are inserted together
+		bulk_insert.assert_called_once()
+		self.assertEqual(len(bulk_insert.call_args.args[0]), 3)
 		shift_assignment_employees = frappe.get_list(
 			"Shift Assignment",
 			filters={
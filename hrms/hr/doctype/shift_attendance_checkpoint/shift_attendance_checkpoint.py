@@ -0,0 +1,96 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, get_datetime, getdate
+
+
+class ShiftAttendanceCheckpoint(Document):
+	pass
+
+
+def on_doctype_update():
+	# checkpoints are read and updated by shift type and employee on every auto attendance run
+	frappe.db.add_index("Shift Attendance Checkpoint", ["shift_type", "employee"])
+
+
+def get_checkins_processed_till(shift_type: str, process_attendance_after) -> str | None:
+	"""Returns the `last_sync_of_checkin` till which check-ins of the shift have been processed"""
+	return frappe.db.get_value(
+		"Shift Attendance Checkpoint",
+		{
+			"shift_type": shift_type,
+			"employee": ("is", "not set"),
+			"process_attendance_after": process_attendance_after,
+		},
+		"checkins_processed_till",
+	)
+
+
+def get_absent_marked_till(shift_type: str, process_attendance_after) -> dict:
+	"""Returns a map of employee to the date till which absentees have been marked for the shift"""
+	return dict(
+		frappe.get_all(
+			"Shift Attendance Checkpoint",
+			filters={
+				"shift_type": shift_type,
+				"employee": ("is", "set"),
+				"process_attendance_after": process_attendance_after,
+				"absent_marked_till": ("is", "set"),
+			},
+			fields=["employee", "absent_marked_till"],
+			as_list=True,
+		)
+	)
+
+
+def update_checkpoint(shift_type: str, process_attendance_after, employee: str | None = None, **values):
+	filters = {"shift_type": shift_type, "employee": employee or ("is", "not set")}
+	values["process_attendance_after"] = process_attendance_after
+
+	if name := frappe.db.get_value("Shift Attendance Checkpoint", filters):
+		frappe.db.set_value("Shift Attendance Checkpoint", name, values, update_modified=False)
+	else:
+		frappe.get_doc(
+			{
+				"doctype": "Shift Attendance Checkpoint",
+				"shift_type": shift_type,
+				"employee": employee,
+				**values,
+			}
+		).db_insert()
+
+
+def reset_checkins_processed_till(shift_type: str, till) -> None:
+	"""Moves the check-in checkpoint back so that check-ins of a shift ending at `till` are picked up again"""
+	Checkpoint = frappe.qb.DocType("Shift Attendance Checkpoint")
+	(
+		frappe.qb.update(Checkpoint)
+		.set(Checkpoint.checkins_processed_till, get_datetime(till))
+		.where(
+			(Checkpoint.shift_type == shift_type)
+			& (Checkpoint.employee.isnull() | (Checkpoint.employee == ""))
+			& (Checkpoint.checkins_processed_till > get_datetime(till))
+		)
+	).run()
+
+
+def reset_absent_marked_till(shift_type: str | None, employee: str, from_date) -> None:
+	"""Moves the absent marking checkpoint back so that absentees are marked again from `from_date`.
+	Checkpoints of all shift types of the employee are moved back if `shift_type` is not passed"""
+	till = add_days(getdate(from_date), -1)
+	Checkpoint = frappe.qb.DocType("Shift Attendance Checkpoint")
+	query = (
+		frappe.qb.update(Checkpoint)
+		.set(Checkpoint.absent_marked_till, till)
+		.where((Checkpoint.employee == employee) & (Checkpoint.absent_marked_till > till))
+	)
+	if shift_type:
+		query = query.where(Checkpoint.shift_type == shift_type)
+
+	query.run()
+
+
+def delete_checkpoints(shift_type: str) -> None:
+	frappe.db.delete("Shift Attendance Checkpoint", {"shift_type": shift_type})
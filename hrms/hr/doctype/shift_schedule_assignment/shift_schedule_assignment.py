@@ -1,12 +1,23 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
+from datetime import date
+from itertools import groupby
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import add_days, format_date, get_link_to_form, get_weekday, getdate, nowdate
+from frappe.utils import add_days, create_batch, format_date, get_link_to_form, get_weekday, getdate, nowdate
+
+from hrms.hr.doctype.shift_assignment.shift_assignment import (
+	ShiftOverlapValidator,
+	bulk_insert_shift_assignments,
+	validate_shift_assignments,
+)
+from hrms.hr.utils import bulk_insert_comments, has_event_handlers
 
-from hrms.hr.doctype.shift_assignment_tool.shift_assignment_tool import create_shift_assignment
+# schedule assignments processed together in a job
+SHIFT_SCHEDULE_BATCH_SIZE = 500
 
 
 class ShiftScheduleAssignment(Document):
@@ -62,82 +73,219 @@ class ShiftScheduleAssignment(Document):
 		return existing_shift_assignments, last_shift_end_date
 
 	def create_shifts(self, start_date: str, end_date: str | None = None) -> None:
-		shift_schedule = frappe.get_doc("Shift Schedule", self.shift_schedule)
-		gap = {
-			"Every Week": 0,
-			"Every 2 Weeks": 1,
-			"Every 3 Weeks": 2,
-			"Every 4 Weeks": 3,
-		}[shift_schedule.frequency]
-
-		date = start_date
-		individual_assignment_start = None
-		week_end_day = get_weekday(getdate(add_days(start_date, -1)))
-		repeat_on_days = [day.day for day in shift_schedule.repeat_on_days]
-
-		if not end_date:
-			end_date = add_days(start_date, 90)
-
-		while date <= end_date:
-			weekday = get_weekday(getdate(date))
-			if weekday in repeat_on_days:
-				if not individual_assignment_start:
-					individual_assignment_start = date
-				if date == end_date:
-					self.create_individual_assignment(
-						shift_schedule.shift_type, individual_assignment_start, date
-					)
-
-			elif individual_assignment_start:
-				self.create_individual_assignment(
-					shift_schedule.shift_type, individual_assignment_start, add_days(date, -1)
-				)
-				individual_assignment_start = None
-
-			if weekday == week_end_day and gap:
-				if individual_assignment_start:
-					self.create_individual_assignment(
-						shift_schedule.shift_type, individual_assignment_start, date
-					)
-					individual_assignment_start = None
-				date = add_days(date, 7 * gap)
-
-			date = add_days(date, 1)
-
-	def create_individual_assignment(self, shift_type, start_date, end_date):
-		create_shift_assignment(
-			self.employee,
-			self.company,
-			shift_type,
-			start_date,
-			end_date,
-			self.shift_status,
-			self.shift_location,
-			self.name,
-		)
-		self.db_set("create_shifts_after", end_date, update_modified=False)
+		shift_schedule = get_shift_schedules({self.shift_schedule})[self.shift_schedule]
+		assignments = get_scheduled_shift_assignments(self, shift_schedule, start_date, end_date)
+
+		for error in validate_shift_assignments(assignments):
+			if error:
+				frappe.throw(error, title=_("Overlapping Shifts"))
+
+		bulk_insert_shift_assignments(assignments)
+		if assignments:
+			self.db_set("create_shifts_after", assignments[-1].end_date, update_modified=False)
+
+
+def get_shift_schedule_date_ranges(
+	frequency: str, repeat_on_days: list[str], start_date, end_date=None
+) -> list[tuple[date, date]]:
+	"""Returns the date ranges of consecutive `repeat_on_days` between the dates (90 days from start date by default).
+	For schedules repeating every few weeks, the weeks in between are skipped"""
+	gap = {
+		"Every Week": 0,
+		"Every 2 Weeks": 1,
+		"Every 3 Weeks": 2,
+		"Every 4 Weeks": 3,
+	}[frequency]
+
+	start_date = getdate(start_date)
+	end_date = getdate(end_date) if end_date else add_days(start_date, 90)
+	week_end_day = get_weekday(add_days(start_date, -1))
+
+	ranges = []
+	range_start = None
+	current_date = start_date
+
+	while current_date <= end_date:
+		weekday = get_weekday(current_date)
+		if weekday in repeat_on_days:
+			if not range_start:
+				range_start = current_date
+			if current_date == end_date:
+				ranges.append((range_start, current_date))
+				range_start = None
+
+		elif range_start:
+			ranges.append((range_start, add_days(current_date, -1)))
+			range_start = None
+
+		if weekday == week_end_day and gap:
+			if range_start:
+				ranges.append((range_start, current_date))
+				range_start = None
+			current_date = add_days(current_date, 7 * gap)
+
+		current_date = add_days(current_date, 1)
+
+	return ranges
 
 
 def process_auto_shift_creation():
+	"""Called from hooks. Enqueues jobs creating shift assignments for batches of due schedule assignments"""
 	shift_schedule_assignments = frappe.get_all(
 		"Shift Schedule Assignment",
 		filters={"enabled": 1, "create_shifts_after": ["<=", nowdate()]},
 		pluck="name",
+		order_by="name",
 	)
-	for d in shift_schedule_assignments:
-		try:
-			doc = frappe.get_doc("Shift Schedule Assignment", d)
+	for batch in create_batch(shift_schedule_assignments, SHIFT_SCHEDULE_BATCH_SIZE):
+		frappe.enqueue(
+			create_shifts_for_schedule_assignments,
+			queue="long",
+			timeout=3000,
+			job_id=f"process_auto_shift_creation::{batch[0]}",
+			deduplicate=True,
+			shift_schedule_assignments=batch,
+		)
+
+
+def create_shifts_for_schedule_assignments(shift_schedule_assignments: list[str]) -> None:
+	"""Creates shift assignments for the next 90 days of the schedule assignments.
+	Date ranges of all schedules are computed in memory and validated for overlaps against the existing
+	assignments fetched upfront, valid assignments are then inserted together"""
+	schedule_assignments = frappe.get_all(
+		"Shift Schedule Assignment",
+		filters={
+			"name": ("in", shift_schedule_assignments),
+			"enabled": 1,
+			# skip schedules already processed by an overlapping run
+			"create_shifts_after": ["<=", nowdate()],
+		},
+		fields=[
+			"name",
+			"employee",
+			"company",
+			"shift_status",
+			"shift_schedule",
+			"shift_location",
+			"create_shifts_after",
+		],
+	)
+	if not schedule_assignments:
+		return
 
-			start_date = doc.create_shifts_after
+	shift_schedules = get_shift_schedules({d.shift_schedule for d in schedule_assignments})
+	proposed = {
+		d.name: get_scheduled_shift_assignments(
+			d, shift_schedules[d.shift_schedule], add_days(d.create_shifts_after, 1)
+		)
+		for d in schedule_assignments
+	}
+
+	validator = ShiftOverlapValidator([assignment for ranges in proposed.values() for assignment in ranges])
+	assignments = []
+	for d in schedule_assignments:
+		# like the schedule's assignments created one by one, creation stops at the first invalid one
+		for assignment in proposed[d.name]:
+			if error := validator.validate(assignment):
+				frappe.log_error(
+					title=_("Auto Shift Creation failed for {0}").format(d.name),
+					message=error,
+					reference_doctype="Shift Schedule Assignment",
+					reference_name=d.name,
+				)
+				break
+			assignments.append(assignment)
 
-			doc.create_shifts(add_days(doc.create_shifts_after, 1))
+	if has_event_handlers("Shift Assignment"):
+		# assignments are inserted one by one to run the handlers, a failing schedule is logged and skipped
+		assignments = insert_shift_assignments_per_schedule(assignments)
+	else:
+		bulk_insert_shift_assignments(assignments)
 
-			text = _(
-				"Shift Assignments created for the schedule between {0} and {1} via background job"
-			).format(frappe.bold(format_date(start_date)), frappe.bold(format_date(doc.create_shifts_after)))
+	created_till = {}
+	for assignment in assignments:
+		created_till[assignment.shift_schedule_assignment] = assignment.end_date
 
-			doc.add_comment(comment_type="Info", text=text)
-		except Exception as e:
-			frappe.log_error(e)
+	frappe.db.bulk_update(
+		"Shift Schedule Assignment",
+		{name: {"create_shifts_after": end_date} for name, end_date in created_till.items()},
+		update_modified=False,
+	)
+	bulk_insert_comments(
+		"Shift Schedule Assignment",
+		[
+			(
+				d.name,
+				_("Shift Assignments created for the schedule between {0} and {1} via background job").format(
+					frappe.bold(format_date(d.create_shifts_after)),
+					frappe.bold(format_date(created_till[d.name])),
+				),
+			)
+			for d in schedule_assignments
+			if d.name in created_till
+		],
+	)
+
+
+def get_scheduled_shift_assignments(
+	schedule_assignment: dict, shift_schedule: dict, start_date, end_date=None
+) -> list[dict]:
+	"""Returns the shift assignments to be created for a schedule assignment between the dates"""
+	return [
+		frappe._dict(
+			employee=schedule_assignment.employee,
+			company=schedule_assignment.company,
+			shift_type=shift_schedule.shift_type,
+			start_date=from_date,
+			end_date=to_date,
+			status=schedule_assignment.shift_status,
+			shift_location=schedule_assignment.shift_location,
+			shift_schedule_assignment=schedule_assignment.name,
+		)
+		for from_date, to_date in get_shift_schedule_date_ranges(
+			shift_schedule.frequency, shift_schedule.repeat_on_days, start_date, end_date
+		)
+	]
+
+
+def get_shift_schedules(shift_schedules: set[str]) -> dict[str, dict]:
+	schedules = {
+		d.name: d
+		for d in frappe.get_all(
+			"Shift Schedule",
+			filters={"name": ("in", list(shift_schedules))},
+			fields=["name", "frequency", "shift_type"],
+		)
+	}
+	for schedule in schedules.values():
+		schedule.repeat_on_days = []
+
+	for day in frappe.get_all(
+		"Assignment Rule Day",
+		filters={"parenttype": "Shift Schedule", "parent": ("in", list(shift_schedules))},
+		fields=["parent", "day"],
+	):
+		schedules[day.parent].repeat_on_days.append(day.day)
+
+	return schedules
+
+
+def insert_shift_assignments_per_schedule(assignments: list[dict]) -> list[dict]:
+	"""Inserts assignments of every schedule assignment in a savepoint and returns the inserted ones"""
+	inserted = []
+	for schedule_assignment, rows in groupby(assignments, key=lambda d: d.shift_schedule_assignment):
+		rows = list(rows)
+		try:
+			frappe.db.savepoint("before_schedule_shifts")
+			bulk_insert_shift_assignments(rows)
+		except Exception:
+			frappe.db.rollback(save_point="before_schedule_shifts")
+			frappe.log_error(
+				title=_("Auto Shift Creation failed for {0}").format(schedule_assignment),
+				reference_doctype="Shift Schedule Assignment",
+				reference_name=schedule_assignment,
+			)
+		else:
+			inserted.extend(rows)
 
-			continue
+	return inserted
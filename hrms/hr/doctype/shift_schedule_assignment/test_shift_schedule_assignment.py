@@ -1,6 +1,8 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests import IntegrationTestCase
 from frappe.utils import add_days, getdate
@@ -8,7 +10,12 @@ from frappe.utils import add_days, getdate
 from erpnext.setup.doctype.employee.test_employee import make_employee
 
 from hrms.hr.doctype.shift_schedule.shift_schedule import get_or_insert_shift_schedule
+from hrms.hr.doctype.shift_schedule_assignment.shift_schedule_assignment import (
+	create_shifts_for_schedule_assignments,
+	get_shift_schedule_date_ranges,
+)
 from hrms.hr.doctype.shift_type.test_shift_type import setup_shift_type
+from hrms.hr.utils import reserve_series_names
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record depdendencies are recursively loaded
@@ -57,3 +64,64 @@ class TestShiftScheduleAssignment(IntegrationTestCase):
 
 		shift_schedule_assignment.save()
 		self.assertEqual(shift_schedule_assignment.create_shifts_after, add_days(getdate(), 6))
+
+	def test_create_shifts_for_schedule_assignments(self):
+		shift_schedule_assignment = frappe.get_doc(
+			{
+				"doctype": "Shift Schedule Assignment",
+				"employee": self.employee,
+				"company": "_Test Company",
+				"shift_schedule": self.shift_schedule,
+				"shift_status": "Active",
+				"create_shifts_after": add_days(getdate(), -1),
+			}
+		).insert()
+
+		# without Shift Assignment event handlers the assignments are inserted in bulk
+		with (
+			patch(
+				"hrms.hr.doctype.shift_schedule_assignment.shift_schedule_assignment.insert_shift_assignments_per_schedule"
+			) as insert_per_schedule,
+			patch(
+				"hrms.hr.doctype.shift_assignment.shift_assignment.reserve_series_names",
+				wraps=reserve_series_names,
+			) as reserve_names,
+		):
+			create_shifts_for_schedule_assignments([shift_schedule_assignment.name])
+
+		insert_per_schedule.assert_not_called()
+		reserve_names.assert_called_once()
+
+		expected = get_shift_schedule_date_ranges("Every Week", ["Monday", "Tuesday", "Wednesday"], getdate())
+		shift_assignments = frappe.get_all(
+			"Shift Assignment",
+			filters={"shift_schedule_assignment": shift_schedule_assignment.name, "docstatus": 1},
+			fields=["start_date", "end_date", "employee_name"],
+			order_by="start_date",
+		)
+		self.assertEqual([(d.start_date, d.end_date) for d in shift_assignments], expected)
+		self.assertEqual(
+			shift_assignments[0].employee_name,
+			frappe.db.get_value("Employee", self.employee, "employee_name"),
+		)
+
+		shift_schedule_assignment.reload()
+		self.assertEqual(shift_schedule_assignment.create_shifts_after, expected[-1][1])
+		self.assertTrue(
+			frappe.db.exists(
+				"Comment",
+				{
+					"reference_doctype": "Shift Schedule Assignment",
+					"reference_name": shift_schedule_assignment.name,
+				},
+			)
+		)
+
+		# already processed schedules are skipped
+		create_shifts_for_schedule_assignments([shift_schedule_assignment.name])
+		self.assertEqual(
+			frappe.db.count(
+				"Shift Assignment", {"shift_schedule_assignment": shift_schedule_assignment.name}
+			),
+			len(expected),
+		)
@@ -2,27 +2,53 @@
 # For license information, please see license.txt
 
 
+import time
+from collections.abc import Iterator
 from datetime import datetime, timedelta
-from itertools import groupby
 
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import add_days, cint, create_batch, get_datetime, get_time, getdate, time_diff
+from frappe.utils import (
+	add_days,
+	cint,
+	create_batch,
+	flt,
+	get_datetime,
+	get_time,
+	getdate,
+	now_datetime,
+	time_diff,
+)
 
 from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
-from erpnext.setup.doctype.holiday_list.holiday_list import is_holiday
 
-from hrms.hr.doctype.attendance.attendance import mark_attendance
-from hrms.hr.doctype.employee_checkin.employee_checkin import (
-	calculate_working_hours,
-	mark_attendance_and_link_log,
+from hrms.hr.doctype.attendance.attendance import bulk_insert_attendance, mark_attendance
+from hrms.hr.doctype.employee_checkin.employee_checkin import BulkAttendanceWriter
+from hrms.hr.doctype.shift_assignment.shift_assignment import (
+	ShiftResolutionIndex,
+	get_employee_shift,
+	get_shift_details,
+)
+from hrms.hr.doctype.shift_attendance_checkpoint.shift_attendance_checkpoint import (
+	delete_checkpoints,
+	get_absent_marked_till,
+	get_checkins_processed_till,
+	update_checkpoint,
 )
-from hrms.hr.doctype.shift_assignment.shift_assignment import get_employee_shift, get_shift_details
+from hrms.hr.utils import has_event_handlers
 from hrms.utils import get_date_range
-from hrms.utils.holiday_list import get_holiday_dates_between
+from hrms.utils.holiday_list import get_holiday_calendar
+from hrms.utils.working_hours import ShiftAttendanceCalculator
 
 EMPLOYEE_CHUNK_SIZE = 50
+# employees whose unlinked check-ins are loaded and marked at a time
+CHECKIN_EMPLOYEE_PAGE_SIZE = 100
+AUTO_ATTENDANCE_TIMEOUT = 2 * 60 * 60
+
+
+class AutoAttendanceInProgressError(frappe.ValidationError):
+	pass
 
 
 class ShiftType(Document):
@@ -33,6 +59,13 @@ class ShiftType(Document):
 		self.validate_circular_shift(start, end)
 		self.validate_unlinked_logs()
 
+	def after_insert(self):
+		# a shift type re-created with the same name should not resume from stale checkpoints
+		delete_checkpoints(self.name)
+
+	def on_trash(self):
+		delete_checkpoints(self.name)
+
 	def validate_same_start_and_end(self, start_time: datetime.time, end_time: datetime.time):
 		if start_time == end_time:
 			frappe.throw(
@@ -106,53 +139,106 @@ class ShiftType(Document):
 		):
 			return
 
-		logs = self.get_employee_checkins()
-		group_key = lambda x: (x["employee"], x["shift_start"])  # noqa
-		for key, group in groupby(sorted(logs, key=group_key), key=group_key):
-			single_shift_logs = list(group)
-			attendance_date = key[1].date()
-			employee = key[0]
-
-			if not self.should_mark_attendance(employee, attendance_date):
-				continue
-
-			overtime_type = single_shift_logs[0].get("overtime_type")
-			(
-				attendance_status,
-				working_hours,
-				late_entry,
-				early_exit,
-				in_time,
-				out_time,
-			) = self.get_attendance(single_shift_logs)
-
-			mark_attendance_and_link_log(
-				single_shift_logs,
-				attendance_status,
-				attendance_date,
-				working_hours,
-				late_entry,
-				early_exit,
-				in_time,
-				out_time,
-				self.name,
-				overtime_type,
-			)
+		acquire_auto_attendance_lock(self.name)
+		try:
+			return self.mark_auto_attendance()
+		finally:
+			release_auto_attendance_lock(self.name)
+
+	def mark_auto_attendance(self) -> dict:
+		"""Marks attendance from check-ins and absentees for the shift and returns a summary of the run"""
+		started_at = time.monotonic()
+		summary = frappe._dict(checkins_processed=0, attendance_marked=0, absent_marked=0)
+
+		# only check-ins of shifts that ended after the previous run are picked up
+		checkins_processed_till = get_checkins_processed_till(self.name, self.process_attendance_after)
+		attendance_writer = BulkAttendanceWriter()
+		for logs in self.get_employee_checkins_in_pages(checkins_processed_till):
+			self.mark_attendance_for_logs(logs, summary, attendance_writer)
+			# commit after every page of employees to avoid losing progress, logs linked to attendance
+			# are not picked up again if the run fails midway
+			frappe.db.commit()  # nosemgrep
 
+		update_checkpoint(
+			self.name, self.process_attendance_after, checkins_processed_till=self.last_sync_of_checkin
+		)
 		# commit after processing checkin logs to avoid losing progress
 		frappe.db.commit()  # nosemgrep
 
+		self._absent_marked_till = get_absent_marked_till(self.name, self.process_attendance_after)
 		assigned_employees = self.get_assigned_employees(self.process_attendance_after, True)
 		# mark absent in batches & commit to avoid losing progress since this tries to process remaining attendance
 		# right from "Process Attendance After" to "Last Sync of Checkin"
 		for batch in create_batch(assigned_employees, EMPLOYEE_CHUNK_SIZE):
+			summary.absent_marked += self.mark_absent_for_employees(batch)
 			for employee in batch:
-				self.mark_absent_for_dates_with_no_attendance(employee)
 				self.mark_absent_for_half_day_dates(employee)
 
 			frappe.db.commit()  # nosemgrep
 
-	def get_employee_checkins(self) -> list[dict]:
+		summary.last_run_on = now_datetime()
+		summary.last_run_duration = flt(time.monotonic() - started_at, 3)
+		update_checkpoint(self.name, self.process_attendance_after, **summary)
+		frappe.db.commit()  # nosemgrep
+
+		return summary
+
+	def mark_attendance_for_logs(
+		self, logs: list[dict], summary: dict, attendance_writer: BulkAttendanceWriter
+	) -> None:
+		"""Marks attendance for logs ordered by employee and shift start"""
+		calculator = ShiftAttendanceCalculator(self)
+		for single_shift_logs, attendance in calculator.calculate_for_shifts(logs):
+			employee = single_shift_logs[0].employee
+			attendance_date = single_shift_logs[0].shift_start.date()
+
+			if not self.should_mark_attendance(employee, attendance_date):
+				continue
+
+			summary.checkins_processed += len(single_shift_logs)
+			attendance_writer.add(
+				single_shift_logs,
+				attendance.status,
+				attendance_date,
+				attendance.working_hours,
+				attendance.late_entry,
+				attendance.early_exit,
+				attendance.in_time,
+				attendance.out_time,
+				self.name,
+				single_shift_logs[0].get("overtime_type"),
+				overtime=attendance.overtime,
+			)
+
+		summary.attendance_marked += attendance_writer.flush()
+
+	def get_employee_checkins_in_pages(self, processed_till: datetime | None = None) -> Iterator[list[dict]]:
+		"""Yields unlinked check-ins of `CHECKIN_EMPLOYEE_PAGE_SIZE` employees at a time.
+		Pages are fetched with a keyset on the employee, so only one page of check-ins is held in memory
+		and check-ins of an employee are never split across pages"""
+		last_employee = ""
+		while True:
+			employees = frappe.get_all(
+				"Employee Checkin",
+				filters=[*self.get_checkin_filters(processed_till), ["employee", ">", last_employee]],
+				pluck="employee",
+				distinct=True,
+				order_by="employee",
+				limit=CHECKIN_EMPLOYEE_PAGE_SIZE,
+			)
+			if not employees:
+				return
+
+			yield self.get_employee_checkins(processed_till, employees)
+			last_employee = employees[-1]
+
+	def get_employee_checkins(
+		self, processed_till: datetime | None = None, employees: list[str] | None = None
+	) -> list[dict]:
+		filters = self.get_checkin_filters(processed_till)
+		if employees:
+			filters.append(["employee", "in", employees])
+
 		return frappe.get_all(
 			"Employee Checkin",
 			fields=[
@@ -168,17 +254,24 @@ class ShiftType(Document):
 				"device_id",
 				"overtime_type",
 			],
-			filters={
-				"skip_auto_attendance": 0,
-				"attendance": ("is", "not set"),
-				"time": (">=", self.process_attendance_after),
-				"shift_actual_end": ("<", self.last_sync_of_checkin),
-				"shift": self.name,
-				"offshift": 0,
-			},
-			order_by="employee,time",
+			filters=filters,
+			order_by="employee,shift_start,time",
 		)
 
+	def get_checkin_filters(self, processed_till: datetime | None = None) -> list[list]:
+		filters = [
+			["skip_auto_attendance", "=", 0],
+			["attendance", "is", "not set"],
+			["time", ">=", self.process_attendance_after],
+			["shift_actual_end", "<", self.last_sync_of_checkin],
+			["shift", "=", self.name],
+			["offshift", "=", 0],
+		]
+		if processed_till:
+			filters.append(["shift_actual_end", ">=", processed_till])
+
+		return filters
+
 	def get_attendance(self, logs):
 		"""Return attendance_status, working_hours, late_entry, early_exit, in_time, out_time
 		for a set of logs belonging to a single shift.
@@ -186,95 +279,199 @@ class ShiftType(Document):
 		1. These logs belongs to a single shift, single employee and it's not in a holiday date.
 		2. Logs are in chronological order
 		"""
-		late_entry = early_exit = False
-		total_working_hours, in_time, out_time = calculate_working_hours(
-			logs, self.determine_check_in_and_check_out, self.working_hours_calculation_based_on
+		attendance = ShiftAttendanceCalculator(self).calculate(logs)
+		return (
+			attendance.status,
+			attendance.working_hours,
+			attendance.late_entry,
+			attendance.early_exit,
+			attendance.in_time,
+			attendance.out_time,
 		)
-		if (
-			cint(self.enable_late_entry_marking)
-			and in_time
-			and in_time > logs[0].shift_start + timedelta(minutes=cint(self.late_entry_grace_period))
-		):
-			late_entry = True
 
-		if (
-			cint(self.enable_early_exit_marking)
-			and out_time
-			and out_time < logs[0].shift_end - timedelta(minutes=cint(self.early_exit_grace_period))
-		):
-			early_exit = True
+	def mark_absent_for_dates_with_no_attendance(self, employee: str):
+		"""Marks Absents for the given employee on working days in this shift that have no attendance marked.
+		The Absent status is marked starting from 'process_attendance_after' or employee creation date,
+		or from the day after the dates covered by the previous run.
+		"""
+		self.mark_absent_for_employees([employee])
 
-		if (
-			self.working_hours_threshold_for_absent
-			and total_working_hours < self.working_hours_threshold_for_absent
-		):
-			return "Absent", total_working_hours, late_entry, early_exit, in_time, out_time
+	def mark_absent_for_employees(self, employees: list[str]) -> int:
+		"""Set-based version of `mark_absent_for_dates_with_no_attendance` for a batch of employees.
+		Shifts, holidays, leaves and existing attendance of the batch are fetched upfront
+		and the Absent records are inserted together. Returns the number of Absent records marked.
+		"""
+		# shifts are resolved in memory from the assignments between the earliest date to be processed
+		# in the batch and the last sync of checkins
+		start_dates = {employee: self.get_start_date(employee) for employee in employees}
+		shift_index = ShiftResolutionIndex(
+			employees,
+			add_days(min(start_dates.values()), -1),
+			add_days(get_datetime(self.last_sync_of_checkin).date(), 2),
+		)
 
-		if (
-			self.working_hours_threshold_for_half_day
-			and total_working_hours < self.working_hours_threshold_for_half_day
-		):
-			return "Half Day", total_working_hours, late_entry, early_exit, in_time, out_time
+		date_ranges = {}
+		for employee in employees:
+			start_date, end_date = self.get_start_and_end_dates(employee, shift_index, start_dates[employee])
 
-		return "Present", total_working_hours, late_entry, early_exit, in_time, out_time
+			# no shift assignment found, no need to process absent attendance records
+			if start_date is not None and getdate(start_date) <= getdate(end_date):
+				date_ranges[employee] = (getdate(start_date), getdate(end_date))
+
+		if not date_ranges:
+			return 0
+
+		employees = list(date_ranges)
+		from_date = min(start_date for start_date, _end_date in date_ranges.values())
+		to_date = max(end_date for _start_date, end_date in date_ranges.values())
+
+		employee_details = {
+			d.name: d
+			for d in frappe.get_all(
+				"Employee",
+				filters={"name": ("in", employees)},
+				fields=["name", "employee_name", "company", "department", "default_shift"],
+			)
+		}
+		holidays = self.get_holidays_for_employees(employees, from_date, to_date)
+		attendance_shifts = self.get_attendance_shifts_for_employees(employees, from_date, to_date)
+		leave_dates = self.get_leave_dates_for_employees(employees, from_date, to_date)
 
-	def mark_absent_for_dates_with_no_attendance(self, employee: str):
-		"""Marks Absents for the given employee on working days in this shift that have no attendance marked.
-		The Absent status is marked starting from 'process_attendance_after' or employee creation date.
-		"""
 		start_time = get_time(self.start_time)
-		dates = self.get_dates_for_attendance(employee)
+		# Attendance handlers like app hooks, server scripts, webhooks or notifications run only for
+		# attendance marked one by one
+		bulk_insert_allowed = not has_event_handlers("Attendance")
+		records = []
+		marked = 0
+
+		for employee, (start_date, end_date) in date_ranges.items():
+			details = employee_details[employee]
+
+			for date in get_date_range(start_date, end_date):
+				date = getdate(date)
+				# skip marking absent on holidays and dates with attendance
+				if date in holidays[employee]:
+					continue
 
-		for date in dates:
-			timestamp = datetime.combine(date, start_time)
-			shift_details = get_employee_shift(employee, timestamp, True)
+				marked_shifts = attendance_shifts.get((employee, date), set())
+				if None in marked_shifts or self.name in marked_shifts:
+					continue
 
-			if shift_details and shift_details.shift_type.name == self.name:
-				attendance = mark_attendance(employee, date, "Absent", self.name)
+				shift_details = shift_index.get_employee_shift(
+					employee, datetime.combine(date, start_time), True
+				)
+				if not (shift_details and shift_details.shift_type.name == self.name):
+					continue
 
-				if not attendance:
+				if not bulk_insert_allowed or marked_shifts or (employee, date) in leave_dates:
+					# attendance for another shift or a leave needs the complete validations
+					if self.mark_absent(employee, date):
+						marked += 1
 					continue
 
-				frappe.get_doc(
+				records.append(
 					{
-						"doctype": "Comment",
-						"comment_type": "Comment",
-						"reference_doctype": "Attendance",
-						"reference_name": attendance,
-						"content": frappe._("Employee was marked Absent due to missing Employee Checkins."),
+						"employee": employee,
+						"employee_name": details.employee_name,
+						"company": details.company,
+						"department": details.department,
+						"attendance_date": date,
+						"status": "Absent",
+						"shift": self.name,
 					}
-				).insert(ignore_permissions=True)
+				)
+
+		bulk_insert_attendance(
+			records, comment=_("Employee was marked Absent due to missing Employee Checkins.")
+		)
+
+		for employee, (_start_date, end_date) in date_ranges.items():
+			update_checkpoint(
+				self.name, self.process_attendance_after, employee=employee, absent_marked_till=end_date
+			)
+
+		return marked + len(records)
+
+	def mark_absent(self, employee: str, date) -> str | None:
+		attendance = mark_attendance(employee, date, "Absent", self.name)
+
+		if not attendance:
+			return
 
-	def get_dates_for_attendance(self, employee: str) -> list[str]:
-		start_date, end_date = self.get_start_and_end_dates(employee)
+		frappe.get_doc(
+			{
+				"doctype": "Comment",
+				"comment_type": "Comment",
+				"reference_doctype": "Attendance",
+				"reference_name": attendance,
+				"content": frappe._("Employee was marked Absent due to missing Employee Checkins."),
+			}
+		).insert(ignore_permissions=True)
+
+		return attendance
+
+	def get_holidays_for_employees(self, employees: list[str], from_date, to_date) -> dict[str, set]:
+		holidays_by_list = {}
+		holidays = {}
+		for employee in employees:
+			holiday_list = self.get_holiday_list(employee)
+			if holiday_list not in holidays_by_list:
+				calendar = get_holiday_calendar(holiday_list)
+				holidays_by_list[holiday_list] = (
+					set(calendar.get_dates(from_date, to_date)) if calendar else set()
+				)
+			holidays[employee] = holidays_by_list[holiday_list]
 
-		# no shift assignment found, no need to process absent attendance records
-		if start_date is None:
-			return []
+		return holidays
 
-		date_range = get_date_range(start_date, end_date)
+	def get_attendance_shifts_for_employees(self, employees: list[str], from_date, to_date) -> dict:
+		"""Returns the shifts of existing attendance per (employee, date). None is used for attendance without a shift"""
+		Attendance = frappe.qb.DocType("Attendance")
+		attendance = (
+			frappe.qb.from_(Attendance)
+			.select(Attendance.employee, Attendance.attendance_date, Attendance.shift)
+			.where(
+				(Attendance.employee.isin(employees))
+				& (Attendance.docstatus < 2)
+				& (Attendance.attendance_date.between(from_date, to_date))
+			)
+		).run()
 
-		# skip marking absent on holidays
-		holiday_list = self.get_holiday_list(employee)
-		holiday_dates = get_holiday_dates_between(holiday_list, start_date, end_date)
-		# skip dates with attendance
-		marked_attendance_dates = self.get_marked_attendance_dates_between(employee, start_date, end_date)
+		attendance_shifts = {}
+		for employee, attendance_date, shift in attendance:
+			attendance_shifts.setdefault((employee, getdate(attendance_date)), set()).add(shift or None)
 
-		return sorted(set(date_range) - set(holiday_dates) - set(marked_attendance_dates))
+		return attendance_shifts
 
-	def get_start_and_end_dates(self, employee):
+	def get_leave_dates_for_employees(self, employees: list[str], from_date, to_date) -> set[tuple]:
+		LeaveApplication = frappe.qb.DocType("Leave Application")
+		leaves = (
+			frappe.qb.from_(LeaveApplication)
+			.select(LeaveApplication.employee, LeaveApplication.from_date, LeaveApplication.to_date)
+			.where(
+				(LeaveApplication.employee.isin(employees))
+				& (LeaveApplication.status == "Approved")
+				& (LeaveApplication.docstatus == 1)
+				& (LeaveApplication.from_date <= to_date)
+				& (LeaveApplication.to_date >= from_date)
+			)
+		).run()
+
+		return {
+			(employee, getdate(date))
+			for employee, leave_from, leave_to in leaves
+			for date in get_date_range(max(getdate(leave_from), from_date), min(getdate(leave_to), to_date))
+		}
+
+	def get_start_and_end_dates(
+		self, employee, shift_index: ShiftResolutionIndex | None = None, start_date=None
+	):
 		"""Returns start and end dates for checking attendance and marking absent
-		return: start date = max of `process_attendance_after` and DOJ
+		return: start date = max of `process_attendance_after`, DOJ and the day after the last processed date
 		return: end date = min of shift before `last_sync_of_checkin` and Relieving Date
 		"""
-		date_of_joining, relieving_date, employee_creation = frappe.get_cached_value(
-			"Employee", employee, ["date_of_joining", "relieving_date", "creation"]
-		)
-
-		if not date_of_joining:
-			date_of_joining = employee_creation.date()
-
-		start_date = max(getdate(self.process_attendance_after), date_of_joining)
+		relieving_date = frappe.get_cached_value("Employee", employee, "relieving_date")
+		start_date = start_date or self.get_start_date(employee)
 		end_date = None
 
 		shift_details = get_shift_details(self.name, get_datetime(self.last_sync_of_checkin))
@@ -282,9 +479,14 @@ class ShiftType(Document):
 			shift_details.actual_end if shift_details else get_datetime(self.last_sync_of_checkin)
 		)
 
+		# nothing new to process since the previous run
+		if start_date > (last_shift_time - timedelta(days=1)).date():
+			return None, None
+
 		# check if shift is found for 1 day before the last sync of checkin
 		# absentees are auto-marked 1 day after the shift to wait for any manual attendance records
-		prev_shift = get_employee_shift(employee, last_shift_time - timedelta(days=1), True, "reverse")
+		get_shift = shift_index.get_employee_shift if shift_index else get_employee_shift
+		prev_shift = get_shift(employee, last_shift_time - timedelta(days=1), True, "reverse")
 		if prev_shift and prev_shift.shift_type.name == self.name:
 			end_date = (
 				min(prev_shift.start_datetime.date(), relieving_date)
@@ -296,18 +498,25 @@ class ShiftType(Document):
 			return None, None
 		return start_date, end_date
 
-	def get_marked_attendance_dates_between(self, employee: str, start_date: str, end_date: str) -> list[str]:
-		Attendance = frappe.qb.DocType("Attendance")
-		return (
-			frappe.qb.from_(Attendance)
-			.select(Attendance.attendance_date)
-			.where(
-				(Attendance.employee == employee)
-				& (Attendance.docstatus < 2)
-				& (Attendance.attendance_date.between(start_date, end_date))
-				& ((Attendance.shift.isnull()) | (Attendance.shift == self.name))
-			)
-		).run(pluck=True)
+	def get_start_date(self, employee: str) -> datetime.date:
+		date_of_joining, employee_creation = frappe.get_cached_value(
+			"Employee", employee, ["date_of_joining", "creation"]
+		)
+
+		if not date_of_joining:
+			date_of_joining = employee_creation.date()
+
+		start_date = max(getdate(self.process_attendance_after), getdate(date_of_joining))
+		if absent_marked_till := self.get_absent_marked_till(employee):
+			start_date = max(start_date, add_days(getdate(absent_marked_till), 1))
+
+		return start_date
+
+	def get_absent_marked_till(self, employee: str) -> str | None:
+		if not hasattr(self, "_absent_marked_till"):
+			self._absent_marked_till = get_absent_marked_till(self.name, self.process_attendance_after)
+
+		return self._absent_marked_till.get(employee)
 
 	def get_assigned_employees(self, from_date: datetime.date, consider_default_shift=False) -> list[str]:
 		"""Get all such employees who either have this shift assigned that hasn't ended or have this shift as default shift.
@@ -343,8 +552,8 @@ class ShiftType(Document):
 			# since attendance should be marked on all days
 			return True
 
-		holiday_list = self.get_holiday_list(employee)
-		if is_holiday(holiday_list, attendance_date):
+		calendar = get_holiday_calendar(self.get_holiday_list(employee))
+		if calendar and calendar.is_holiday(attendance_date):
 			return False
 		return True
 
@@ -412,8 +621,42 @@ def get_actual_shift_end(shift, current_datetime):
 
 
 def process_auto_attendance_for_all_shifts():
-	"""Called from hooks"""
+	"""Called from hooks. Enqueues a separate job for every shift so that shifts are processed in parallel"""
 	shift_list = frappe.get_all("Shift Type", filters={"enable_auto_attendance": "1"}, pluck="name")
 	for shift in shift_list:
-		doc = frappe.get_cached_doc("Shift Type", shift)
-		doc.process_auto_attendance()
+		frappe.enqueue(
+			process_auto_attendance_for_shift,
+			queue="long",
+			timeout=AUTO_ATTENDANCE_TIMEOUT,
+			job_id=f"process_auto_attendance::{shift}",
+			deduplicate=True,
+			shift_type=shift,
+		)
+
+
+def process_auto_attendance_for_shift(shift_type: str):
+	doc = frappe.get_doc("Shift Type", shift_type)
+
+	try:
+		summary = doc.process_auto_attendance()
+	except AutoAttendanceInProgressError:
+		# the previous run of this shift is still going on, it will pick up the new check-ins next time
+		return
+
+	if summary:
+		frappe.logger("auto_attendance").info({"shift_type": shift_type, **summary})
+
+
+def acquire_auto_attendance_lock(shift_type: str):
+	"""Prevents overlapping runs of auto attendance for the same shift across workers"""
+	key = frappe.cache().make_key(f"auto_attendance_lock::{shift_type}")
+	if not frappe.cache().set(key, 1, ex=AUTO_ATTENDANCE_TIMEOUT, nx=True):
+		frappe.throw(
+			_("Auto attendance is already being processed for shift {0}").format(frappe.bold(shift_type)),
+			exc=AutoAttendanceInProgressError,
+			title=_("Auto Attendance In Progress"),
+		)
+
+
+def release_auto_attendance_lock(shift_type: str):
+	frappe.cache().delete(frappe.cache().make_key(f"auto_attendance_lock::{shift_type}"))
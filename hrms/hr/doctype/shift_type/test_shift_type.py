@@ -1,6 +1,7 @@
 # Copyright (c) 2018, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 import frappe
 from frappe.tests import IntegrationTestCase
@@ -18,6 +19,7 @@ from erpnext.setup.doctype.employee.test_employee import make_employee
 from erpnext.setup.doctype.holiday_list.test_holiday_list import set_holiday_list
 
 from hrms.hr.doctype.leave_application.test_leave_application import get_first_sunday
+from hrms.hr.doctype.shift_assignment.shift_assignment import ShiftResolutionIndex
 from hrms.hr.doctype.shift_type.shift_type import update_last_sync_of_checkin
 from hrms.payroll.doctype.salary_slip.test_salary_slip import make_holiday_list
 from hrms.tests.test_utils import add_date_to_holiday_list
@@ -148,6 +150,33 @@ class TestShiftType(IntegrationTestCase):
 		)
 		self.assertEqual(attendance, "Present")
 
+	def test_mark_attendance_for_checkins_in_pages(self):
+		from hrms.hr.doctype.employee_checkin.test_employee_checkin import make_checkin
+
+		shift_type = setup_shift_type()
+		date = getdate()
+		employees = [
+			make_employee(f"test_checkin_page_{i}@example.com", company="_Test Company") for i in range(3)
+		]
+		for employee in employees:
+			make_shift_assignment(shift_type.name, employee, date)
+			make_checkin(employee, datetime.combine(date, get_time("08:00:00")))
+			make_checkin(employee, datetime.combine(date, get_time("12:00:00")))
+
+		with patch("hrms.hr.doctype.shift_type.shift_type.CHECKIN_EMPLOYEE_PAGE_SIZE", 2):
+			pages = list(shift_type.get_employee_checkins_in_pages())
+			self.assertEqual([len(page) for page in pages], [4, 2])
+
+			summary = shift_type.process_auto_attendance()
+
+		self.assertEqual(summary.checkins_processed, 6)
+		self.assertEqual(summary.attendance_marked, 3)
+		for employee in employees:
+			self.assertEqual(
+				frappe.db.get_value("Attendance", {"employee": employee, "shift": shift_type.name}, "status"),
+				"Present",
+			)
+
 	def test_mark_attendance_with_different_shift_start_time(self):
 		"""Tests whether attendance is marked correctly if shift configuration is changed midway"""
 		from hrms.hr.doctype.employee_checkin.test_employee_checkin import make_checkin
@@ -439,6 +468,159 @@ class TestShiftType(IntegrationTestCase):
 		)
 		self.assertIsNone(todays_attendance)
 
+	def test_mark_absent_for_multiple_employees(self):
+		from hrms.hr.doctype.attendance.attendance import mark_attendance
+
+		employee1 = make_employee("test_absent_batch1@example.com", company="_Test Company")
+		employee2 = make_employee("test_absent_batch2@example.com", company="_Test Company")
+		today = getdate()
+		shift_type = setup_shift_type(
+			shift_type="Test Absent with no Attendance",
+			process_attendance_after=add_days(today, -4),
+			last_sync_of_checkin=f"{today} 15:00:00",
+		)
+		date = add_days(today, -3)
+		make_shift_assignment(shift_type.name, employee1, date)
+		make_shift_assignment(shift_type.name, employee2, date)
+		mark_attendance(employee2, date, "Present", shift_type.name)
+
+		shift_type.mark_absent_for_employees([employee1, employee2])
+
+		absent_records = frappe.get_all(
+			"Attendance",
+			filters={"employee": employee1, "status": "Absent", "docstatus": 1, "shift": shift_type.name},
+			pluck="name",
+		)
+		self.assertEqual(len(absent_records), 3)
+		self.assertEqual(
+			frappe.db.count(
+				"Comment", {"reference_doctype": "Attendance", "reference_name": absent_records[0]}
+			),
+			1,
+		)
+
+		# dates with attendance are skipped
+		self.assertEqual(
+			frappe.db.count("Attendance", {"employee": employee2, "attendance_date": date, "docstatus": 1}), 1
+		)
+		self.assertEqual(frappe.db.count("Attendance", {"employee": employee2, "status": "Absent"}), 2)
+
+	def test_mark_absent_one_by_one_with_attendance_event_handlers(self):
+		employee = make_employee("test_absent_batch1@example.com", company="_Test Company")
+		today = getdate()
+		shift_type = setup_shift_type(
+			shift_type="Test Absent with no Attendance",
+			process_attendance_after=add_days(today, -4),
+			last_sync_of_checkin=f"{today} 15:00:00",
+		)
+		make_shift_assignment(shift_type.name, employee, add_days(today, -3))
+
+		with (
+			patch("hrms.hr.doctype.shift_type.shift_type.has_event_handlers", return_value=True),
+			patch("hrms.hr.doctype.shift_type.shift_type.bulk_insert_attendance") as bulk_insert_attendance,
+		):
+			self.assertEqual(shift_type.mark_absent_for_employees([employee]), 3)
+
+		# handlers of Attendance events only run for attendance marked one by one
+		self.assertEqual(bulk_insert_attendance.call_args.args[0], [])
+		self.assertEqual(
+			frappe.db.count("Attendance", {"employee": employee, "status": "Absent", "docstatus": 1}), 3
+		)
+
+	def test_auto_attendance_summary_and_lock(self):
+		from hrms.hr.doctype.shift_type.shift_type import (
+			AutoAttendanceInProgressError,
+			acquire_auto_attendance_lock,
+			release_auto_attendance_lock,
+		)
+
+		employee = make_employee("test_employee_checkin@example.com", company="_Test Company")
+		today = getdate()
+		shift_type = setup_shift_type(
+			shift_type="Test Absent with no Attendance",
+			process_attendance_after=add_days(today, -3),
+			last_sync_of_checkin=f"{today} 15:00:00",
+		)
+		make_shift_assignment(shift_type.name, employee, add_days(today, -2))
+
+		# overlapping runs of the same shift are not allowed
+		acquire_auto_attendance_lock(shift_type.name)
+		self.assertRaises(AutoAttendanceInProgressError, shift_type.process_auto_attendance)
+		release_auto_attendance_lock(shift_type.name)
+
+		summary = shift_type.process_auto_attendance()
+		self.assertEqual(summary.absent_marked, 2)
+		self.assertEqual(summary.checkins_processed, 0)
+		self.assertEqual(
+			frappe.db.get_value(
+				"Shift Attendance Checkpoint",
+				{"shift_type": shift_type.name, "employee": ("is", "not set")},
+				"absent_marked",
+			),
+			2,
+		)
+
+	def test_incremental_absent_marking_with_checkpoint(self):
+		employee = make_employee("test_employee_checkin@example.com", company="_Test Company")
+		today = getdate()
+		shift_type = setup_shift_type(
+			shift_type="Test Absent with no Attendance",
+			process_attendance_after=add_days(today, -6),
+			last_sync_of_checkin=f"{today} 15:00:00",
+		)
+		date = add_days(today, -5)
+		make_shift_assignment(shift_type.name, employee, date)
+
+		shift_type.process_auto_attendance()
+		self.assertEqual(
+			frappe.db.get_value(
+				"Shift Attendance Checkpoint",
+				{"shift_type": shift_type.name, "employee": employee},
+				"absent_marked_till",
+			),
+			add_days(today, -1),
+		)
+
+		# dates covered by the previous run are not processed again
+		frappe.db.delete("Attendance", {"employee": employee, "attendance_date": date})
+		with patch(
+			"hrms.hr.doctype.shift_type.shift_type.ShiftResolutionIndex", wraps=ShiftResolutionIndex
+		) as shift_index:
+			shift_type.process_auto_attendance()
+		# assignments are loaded from the day before the earliest date to be processed
+		self.assertEqual(shift_index.call_args.args[1], add_days(today, -1))
+		self.assertIsNone(frappe.db.get_value("Attendance", {"employee": employee, "attendance_date": date}))
+
+		# changing process attendance after discards the checkpoint
+		shift_type.reload()
+		shift_type.process_attendance_after = add_days(today, -7)
+		shift_type.save()
+		shift_type.process_auto_attendance()
+		self.assertEqual(
+			frappe.db.get_value("Attendance", {"employee": employee, "attendance_date": date}, "status"),
+			"Absent",
+		)
+
+		# cancelled attendance moves the checkpoint back, the date is evaluated for absence again
+		yesterday = add_days(today, -1)
+		attendance = frappe.get_doc("Attendance", {"employee": employee, "attendance_date": yesterday})
+		attendance.cancel()
+		self.assertEqual(
+			frappe.db.get_value(
+				"Shift Attendance Checkpoint",
+				{"shift_type": shift_type.name, "employee": employee},
+				"absent_marked_till",
+			),
+			add_days(today, -2),
+		)
+		shift_type.process_auto_attendance()
+		self.assertTrue(
+			frappe.db.exists(
+				"Attendance",
+				{"employee": employee, "attendance_date": yesterday, "status": "Absent", "docstatus": 1},
+			)
+		)
+
 	def test_mark_absent_for_dates_with_no_attendance_for_midnight_shift(self):
 		employee = make_employee("test_employee_checkin@example.com", company="_Test Company")
 		today = getdate()
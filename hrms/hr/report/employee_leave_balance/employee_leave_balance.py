@@ -2,18 +2,19 @@
 # For license information, please see license.txt
 
 
+from bisect import bisect_left, bisect_right
 from itertools import groupby
 
 import frappe
 from frappe import _
-from frappe.query_builder.functions import Abs, Sum
-from frappe.utils import add_days, cint, flt, getdate
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Abs, Max, Sum
+from frappe.utils import add_days, cint, date_diff, flt, getdate
 
-from hrms.hr.doctype.leave_allocation.leave_allocation import get_previous_allocation
-from hrms.hr.doctype.leave_application.leave_application import (
-	get_leave_balance_on,
-	get_leaves_for_period,
-)
+from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
+
+from hrms.hr.doctype.leave_application.leave_application import get_leave_allocation_details
+from hrms.utils.holiday_list import get_holiday_dates_between
 
 Filters = frappe._dict
 
@@ -93,6 +94,10 @@ def get_data(filters: Filters) -> list:
 	row = None
 
 	data = []
+	if not active_employees:
+		return data
+
+	ledger = LeaveLedger([employee.name for employee in active_employees], leave_types, filters)
 
 	for leave_type in leave_types:
 		if consolidate_leave_types:
@@ -110,16 +115,16 @@ def get_data(filters: Filters) -> list:
 			row.employee_name = employee.employee_name
 
 			leaves_taken = (
-				get_leaves_for_period(employee.name, leave_type, filters.from_date, filters.to_date) * -1
+				ledger.get_leaves_for_period(employee.name, leave_type, filters.from_date, filters.to_date)
+				* -1
 			)
 
-			new_allocation, expired_leaves, carry_forwarded_leaves = get_allocated_and_expired_leaves(
-				filters.from_date, filters.to_date, employee.name, leave_type
-			)
-			opening = get_opening_balance(employee.name, leave_type, filters, carry_forwarded_leaves)
+			allocated = ledger.allocated_leaves.get((employee.name, leave_type), frappe._dict())
+			new_allocation = flt(allocated.new_leaves)
+			opening = ledger.get_opening_balance(employee.name, leave_type, flt(allocated.cf_leaves))
 
 			row.leaves_allocated = flt(new_allocation, precision)
-			row.leaves_expired = flt(expired_leaves, precision)
+			row.leaves_expired = flt(allocated.expired_leaves, precision)
 			row.opening_balance = flt(opening, precision)
 			row.leaves_taken = flt(leaves_taken, precision)
 
@@ -157,93 +162,291 @@ def get_employees(filters: Filters) -> list[dict]:
 	return query.run(as_dict=True)
 
 
-def get_opening_balance(
-	employee: str, leave_type: str, filters: Filters, carry_forwarded_leaves: float
-) -> float:
-	# allocation boundary condition
-	# opening balance is the closing leave balance 1 day before the filter start date
-	opening_balance_date = add_days(filters.from_date, -1)
-	allocation = get_previous_allocation(filters.from_date, leave_type, employee)
-
-	if (
-		allocation
-		and allocation.get("to_date")
-		and opening_balance_date
-		and getdate(allocation.get("to_date")) == getdate(opening_balance_date)
-	):
-		# if opening balance date is same as the previous allocation's expiry
-		# then opening balance should only consider carry forwarded leaves
-		opening_balance = carry_forwarded_leaves
-	else:
-		# else directly get leave balance on the previous day
-		opening_balance = get_leave_balance_on(employee, leave_type, opening_balance_date)
+class LeaveLedger:
+	"""Computes leave balances for all employees and leave types of the report from Leave Ledger Entries
+	fetched with a fixed number of queries, mirroring `get_leave_balance_on` and `get_leaves_for_period`"""
+
+	def __init__(self, employees: list[str], leave_types: list[str], filters: Filters):
+		self.employees = employees
+		self.leave_types = leave_types
+		self.from_date = getdate(filters.from_date)
+		self.to_date = getdate(filters.to_date)
+		# opening balance is the closing leave balance 1 day before the filter start date
+		self.opening_balance_date = add_days(self.from_date, -1)
+
+		self.allocated_leaves = self.get_allocated_leaves()
+		self.previous_allocation_end = self.get_previous_allocation_end()
+		self.opening_allocations = {
+			(d.employee, d.leave_type): d
+			for d in get_leave_allocation_details(self.employees, self.opening_balance_date)
+		}
+
+		period_start = min(
+			[self.from_date, *(getdate(d.from_date) for d in self.opening_allocations.values())]
+		)
+		self.cf_expiry = self.get_cf_expiry(period_start)
+
+		# leaves taken are also computed till the end of the opening allocation and its cf expiry
+		period_end = max(
+			[
+				self.to_date,
+				*(getdate(d.to_date) for d in self.opening_allocations.values()),
+				*(getdate(expiry) for expiry in self.cf_expiry.values()),
+			]
+		)
+		self.leave_entries = self.get_leave_entries(period_start, period_end)
+
+		self.include_holiday = dict(
+			frappe.get_all("Leave Type", fields=["name", "include_holiday"], as_list=True)
+		)
+		self.half_day_dates = self.get_half_day_dates()
+		self.holidays = self.get_holidays(period_start, period_end)
+
+	def get_allocated_leaves(self) -> dict:
+		"""Returns new, expired and carry forwarded leaves allocated in the report period"""
+		Ledger = frappe.qb.DocType("Leave Ledger Entry")
+
+		def sum_leaves(condition):
+			return Sum(Case().when(condition, Ledger.leaves).else_(0))
+
+		rows = (
+			frappe.qb.from_(Ledger)
+			.select(
+				Ledger.employee,
+				Ledger.leave_type,
+				sum_leaves((Ledger.is_expired == 0) & (Ledger.is_carry_forward == 0)).as_("new_leaves"),
+				Abs(sum_leaves(Ledger.is_expired == 1)).as_("expired_leaves"),
+				sum_leaves((Ledger.is_expired == 0) & (Ledger.is_carry_forward == 1)).as_("cf_leaves"),
+			)
+			.where(
+				(Ledger.docstatus == 1)
+				& (Ledger.transaction_type == "Leave Allocation")
+				& (Ledger.employee.isin(self.employees))
+				& (
+					(Ledger.from_date[self.from_date : self.to_date])
+					| (Ledger.to_date[self.from_date : self.to_date])
+				)
+			)
+			.groupby(Ledger.employee, Ledger.leave_type)
+		).run(as_dict=True)
+
+		return {(d.employee, d.leave_type): d for d in rows}
+
+	def get_previous_allocation_end(self) -> dict:
+		"""Returns the end date of the last allocation before the report period"""
+		Allocation = frappe.qb.DocType("Leave Allocation")
+		rows = (
+			frappe.qb.from_(Allocation)
+			.select(Allocation.employee, Allocation.leave_type, Max(Allocation.to_date))
+			.where(
+				(Allocation.employee.isin(self.employees))
+				& (Allocation.to_date < self.from_date)
+				& (Allocation.docstatus == 1)
+			)
+			.groupby(Allocation.employee, Allocation.leave_type)
+		).run()
+
+		return {(employee, leave_type): to_date for employee, leave_type, to_date in rows}
+
+	def get_leave_entries(self, from_date, to_date) -> dict:
+		"""Returns leave applications, encashments and expired allocations overlapping the period"""
+		Ledger = frappe.qb.DocType("Leave Ledger Entry")
+		rows = (
+			frappe.qb.from_(Ledger)
+			.select(
+				Ledger.employee,
+				Ledger.leave_type,
+				Ledger.from_date,
+				Ledger.to_date,
+				Ledger.leaves,
+				Ledger.transaction_name,
+				Ledger.transaction_type,
+				Ledger.holiday_list,
+				Ledger.is_carry_forward,
+				Ledger.is_expired,
+			)
+			.where(
+				(Ledger.docstatus == 1)
+				& (Ledger.employee.isin(self.employees))
+				& ((Ledger.leaves < 0) | (Ledger.is_expired == 1))
+				& (Ledger.from_date <= to_date)
+				& (Ledger.to_date >= from_date)
+			)
+			.orderby(Ledger.creation)
+		).run(as_dict=True)
+
+		leave_entries = {}
+		for d in rows:
+			leave_entries.setdefault((d.employee, d.leave_type), []).append(d)
+
+		return leave_entries
+
+	def get_cf_expiry(self, from_date) -> dict:
+		"""Returns expiry of carry forwarded leaves of the allocation active on the opening balance date"""
+		Ledger = frappe.qb.DocType("Leave Ledger Entry")
+		rows = (
+			frappe.qb.from_(Ledger)
+			.select(Ledger.employee, Ledger.leave_type, Ledger.to_date)
+			.where(
+				(Ledger.employee.isin(self.employees))
+				& (Ledger.is_carry_forward == 1)
+				& (Ledger.transaction_type == "Leave Allocation")
+				& (Ledger.to_date.between(from_date, getdate()))
+				& (Ledger.docstatus == 1)
+			)
+			.orderby(Ledger.to_date)
+		).run(as_dict=True)
+
+		cf_expiry = {}
+		for d in rows:
+			key = (d.employee, d.leave_type)
+			allocation = self.opening_allocations.get(key)
+			if key not in cf_expiry and allocation and getdate(d.to_date) >= getdate(allocation.from_date):
+				cf_expiry[key] = d.to_date
+
+		return cf_expiry
+
+	def get_half_day_dates(self) -> dict:
+		applications = [
+			entry.transaction_name
+			for entries in self.leave_entries.values()
+			for entry in entries
+			if entry.transaction_type == "Leave Application" and entry.leaves % 1
+		]
+		if not applications:
+			return {}
+
+		return dict(
+			frappe.get_all(
+				"Leave Application",
+				filters={"name": ("in", applications)},
+				fields=["name", "half_day_date"],
+				as_list=True,
+			)
+		)
+
+	def get_holidays(self, from_date, to_date) -> dict:
+		"""Returns sorted holiday dates of every holiday list used by the leave applications"""
+		self.employee_holiday_list = {}
+		holiday_lists = set()
+
+		for (employee, _leave_type), entries in self.leave_entries.items():
+			for entry in entries:
+				if entry.transaction_type != "Leave Application":
+					continue
+
+				if not entry.holiday_list:
+					if employee not in self.employee_holiday_list:
+						self.employee_holiday_list[employee] = get_holiday_list_for_employee(employee)
+					entry.holiday_list = self.employee_holiday_list[employee]
+
+				holiday_lists.add(entry.holiday_list)
 
-	return opening_balance
+		return {
+			holiday_list: get_holiday_dates_between(holiday_list, from_date, to_date)
+			for holiday_list in holiday_lists
+		}
 
+	def get_opening_balance(self, employee: str, leave_type: str, carry_forwarded_leaves: float) -> float:
+		# allocation boundary condition
+		previous_allocation_end = self.previous_allocation_end.get((employee, leave_type))
+		if previous_allocation_end and getdate(previous_allocation_end) == self.opening_balance_date:
+			# if opening balance date is same as the previous allocation's expiry
+			# then opening balance should only consider carry forwarded leaves
+			return carry_forwarded_leaves
 
-def get_allocated_and_expired_leaves(
-	from_date: str, to_date: str, employee: str, leave_type: str
-) -> tuple[float, float, float]:
-	new_allocation = 0
-	expired_leaves = 0
-	carry_forwarded_leaves = 0
+		# else directly get leave balance on the previous day
+		return self.get_leave_balance_on(employee, leave_type, self.opening_balance_date)
 
-	new_allocation = get_allocated_leaves(from_date, to_date, employee, leave_type)
-	expired_leaves = get_expired_leaves(from_date, to_date, employee, leave_type)
-	carry_forwarded_leaves = get_cf_leaves(from_date, to_date, employee, leave_type)
+	def get_leave_balance_on(self, employee: str, leave_type: str, date) -> float:
+		allocation = self.opening_allocations.get((employee, leave_type))
+		if not allocation:
+			return 0.0
 
-	return new_allocation, expired_leaves, carry_forwarded_leaves
+		leaves_taken = self.get_leaves_for_period(employee, leave_type, allocation.from_date, date)
+		manually_expired_leaves = self.get_manually_expired_leaves(
+			employee, leave_type, allocation.from_date, date
+		)
+		cf_expiry = self.cf_expiry.get((employee, leave_type))
 
+		if not (cf_expiry and allocation.unused_leaves):
+			# allocation only contains newly allocated leaves
+			return flt(allocation.total_leaves_allocated) + flt(leaves_taken) + flt(manually_expired_leaves)
 
-def get_allocated_leaves(from_date, to_date, employee, leave_type):
-	ledger = frappe.qb.DocType("Leave Ledger Entry")
-	allocated_leaves = (
-		frappe.qb.from_(ledger)
-		.select(Sum(ledger.leaves))
-		.where(
-			(ledger.docstatus == 1)
-			& (ledger.transaction_type == "Leave Allocation")
-			& (ledger.employee == employee)
-			& (ledger.leave_type == leave_type)
-			& ((ledger.from_date[from_date:to_date]) | (ledger.to_date[from_date:to_date]))
-			& ((ledger.is_expired == 0) & (ledger.is_carry_forward == 0))
+		# allocation contains both carry forwarded and new leaves
+		cf_leaves_taken = self.get_leaves_for_period(employee, leave_type, allocation.from_date, cf_expiry)
+		new_leaves_taken = self.get_leaves_for_period(
+			employee, leave_type, add_days(cf_expiry, 1), allocation.to_date
 		)
-	).run()[0][0]
-	return allocated_leaves if allocated_leaves else 0.0
-
-
-def get_expired_leaves(from_date, to_date, employee, leave_type):
-	ledger = frappe.qb.DocType("Leave Ledger Entry")
-	expired_leaves = (
-		frappe.qb.from_(ledger)
-		.select(Abs(Sum(ledger.leaves)))
-		.where(
-			(ledger.docstatus == 1)
-			& (ledger.transaction_type == "Leave Allocation")
-			& (ledger.employee == employee)
-			& (ledger.leave_type == leave_type)
-			& ((ledger.from_date[from_date:to_date]) | (ledger.to_date[from_date:to_date]))
-			& (ledger.is_expired == 1)
+
+		# using abs because leaves taken is a -ve number in the ledger
+		if abs(cf_leaves_taken) > allocation.unused_leaves:
+			# adjust the excess leaves in new_leaves_taken
+			new_leaves_taken += -(abs(cf_leaves_taken) - allocation.unused_leaves)
+			cf_leaves_taken = -allocation.unused_leaves
+
+		# carry forwarded leaves have expired
+		cf_leaves = (
+			0 if getdate(date) > getdate(cf_expiry) else flt(allocation.unused_leaves) + flt(cf_leaves_taken)
 		)
-	).run()[0][0]
-	return expired_leaves if expired_leaves else 0.0
-
-
-def get_cf_leaves(from_date, to_date, employee, leave_type):
-	ledger = frappe.qb.DocType("Leave Ledger Entry")
-	cf_leaves = (
-		frappe.qb.from_(ledger)
-		.select(Sum(ledger.leaves))
-		.where(
-			(ledger.docstatus == 1)
-			& (ledger.transaction_type == "Leave Allocation")
-			& (ledger.employee == employee)
-			& (ledger.leave_type == leave_type)
-			& ((ledger.from_date[from_date:to_date]) | (ledger.to_date[from_date:to_date]))
-			& ((ledger.is_expired == 0) & (ledger.is_carry_forward == 1))
+
+		return (
+			(flt(allocation.new_leaves_allocated) + flt(new_leaves_taken))
+			+ flt(cf_leaves)
+			+ flt(manually_expired_leaves)
 		)
-	).run()[0][0]
-	return cf_leaves if cf_leaves else 0.0
+
+	def get_manually_expired_leaves(self, employee: str, leave_type: str, from_date, to_date) -> float:
+		from_date, to_date = getdate(from_date), getdate(to_date)
+		for entry in self.leave_entries.get((employee, leave_type), []):
+			if (
+				entry.transaction_type == "Leave Allocation"
+				and entry.is_expired
+				and not entry.is_carry_forward
+				and entry.from_date >= from_date
+				and entry.to_date <= to_date
+			):
+				return entry.leaves
+
+		return 0.0
+
+	def get_leaves_for_period(self, employee: str, leave_type: str, from_date, to_date) -> float:
+		from_date, to_date = getdate(from_date), getdate(to_date)
+		leave_days = 0
+
+		for entry in self.leave_entries.get((employee, leave_type), []):
+			if entry.from_date > to_date or entry.to_date < from_date:
+				continue
+
+			inclusive_period = entry.from_date >= from_date and entry.to_date <= to_date
+
+			if inclusive_period and entry.transaction_type == "Leave Encashment":
+				leave_days += entry.leaves
+
+			elif entry.transaction_type == "Leave Application":
+				leave_days -= self.get_number_of_leave_days(
+					entry, max(entry.from_date, from_date), min(entry.to_date, to_date)
+				)
+
+		return leave_days
+
+	def get_number_of_leave_days(self, entry: dict, from_date, to_date) -> float:
+		"""Returns number of leave days of the leave application entry between 2 dates
+		after considering half day and holidays (Based on the include_holiday setting in Leave Type)"""
+		number_of_days = date_diff(to_date, from_date) + 1
+		# fetch half day date for leaves with half days
+		if entry.leaves % 1:
+			half_day_date = self.half_day_dates.get(entry.transaction_name)
+			if from_date == to_date:
+				number_of_days = 0.5
+			elif half_day_date and from_date <= getdate(half_day_date) <= to_date:
+				number_of_days = date_diff(to_date, from_date) + 0.5
+
+		if not self.include_holiday.get(entry.leave_type):
+			holidays = self.holidays.get(entry.holiday_list, [])
+			number_of_days -= bisect_right(holidays, to_date) - bisect_left(holidays, from_date)
+
+		return number_of_days
 
 
 def get_chart_data(data: list, filters: Filters) -> dict:
@@ -282,3 +282,30 @@ class TestEmployeeLeaveBalance(IntegrationTestCase):
 
 		self.assertEqual(report[1][0].closing_balance, 0)
 		self.assertEqual(report[1][0].leaves_expired, 5)
+
+	@set_holiday_list("_Test Emp Balance Holiday List", "_Test Company")
+	def test_leave_balance_for_multiple_employees(self):
+		frappe.get_doc(test_records[0]).insert()
+		employee2 = make_employee("test_emp_leave_balance2@example.com", company="_Test Company")
+
+		first_sunday = get_first_sunday(self.holiday_list, for_date=self.year_start)
+		for employee, leaves in [(self.employee_id, 30), (employee2, 10)]:
+			make_allocation_record(
+				employee=employee, from_date=self.year_start, to_date=self.year_end, leaves=leaves
+			)
+		make_leave_application(
+			self.employee_id, add_days(first_sunday, 1), add_days(first_sunday, 4), "_Test Leave Type"
+		)
+		make_leave_application(
+			employee2, add_days(first_sunday, 1), add_days(first_sunday, 2), "_Test Leave Type"
+		)
+
+		filters = frappe._dict(
+			{"from_date": add_days(first_sunday, 3), "to_date": self.year_end, "company": "_Test Company"}
+		)
+		report = {row.employee: row for row in execute(filters)[1]}
+
+		# balances computed for all employees together match the balances computed for each employee
+		for employee in [self.employee_id, employee2]:
+			expected = execute(frappe._dict(filters, employee=employee))[1][0]
+			self.assertEqual(report[employee], expected)
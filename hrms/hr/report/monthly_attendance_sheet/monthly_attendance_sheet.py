@@ -3,15 +3,18 @@
 
 
 from calendar import monthrange
+from datetime import date
 from itertools import groupby
 
 import frappe
 from frappe import _
 from frappe.query_builder import Case
 from frappe.query_builder.functions import Count, Extract, Sum
-from frappe.utils import cint, cstr, getdate
+from frappe.utils import cint, cstr, flt, getdate
 from frappe.utils.nestedset import get_descendants_of
 
+from hrms.utils.holiday_list import get_holiday_dates_between
+
 Filters = frappe._dict
 
 status_map = {
@@ -42,6 +45,10 @@ def execute(filters: Filters | None = None) -> tuple:
 		if filters.include_company_descendants:
 			filters.companies.extend(get_descendants_of("Company", filters.company))
 
+	# date range predicates instead of extracting the month and year so that indexes can be used
+	filters.from_date = date(cint(filters.year), cint(filters.month), 1)
+	filters.to_date = date(cint(filters.year), cint(filters.month), get_total_days_in_month(filters))
+
 	attendance_map = get_attendance_map(filters)
 	if not attendance_map:
 		frappe.msgprint(_("No attendance records found."), alert=True, indicator="orange")
@@ -200,7 +207,15 @@ def get_total_days_in_month(filters: Filters) -> int:
 
 def get_data(filters: Filters, attendance_map: dict) -> list[dict]:
 	employee_details, group_by_param_values = get_employee_related_details(filters)
-	holiday_map = get_holiday_map(filters)
+	employees = (
+		[details for group in employee_details.values() for details in group.values()]
+		if filters.group_by
+		else employee_details.values()
+	)
+	default_holiday_list = frappe.get_cached_value("Company", filters.company, "default_holiday_list")
+	holiday_map = get_holiday_map(
+		filters, {details.holiday_list or default_holiday_list for details in employees} - {None}
+	)
 	data = []
 
 	if filters.group_by:
@@ -291,8 +306,7 @@ def get_attendance_records(filters: Filters) -> list[dict]:
 		.where(
 			(Attendance.docstatus == 1)
 			& (Attendance.company.isin(filters.companies))
-			& (Extract("month", Attendance.attendance_date) == filters.month)
-			& (Extract("year", Attendance.attendance_date) == filters.year)
+			& (Attendance.attendance_date[filters.from_date : filters.to_date])
 		)
 	)
 
@@ -322,11 +336,7 @@ def get_employee_related_details(filters: Filters) -> tuple[dict, list]:
 			Employee.holiday_list,
 			Extract("day", Employee.date_of_joining).as_("joined_date"),
 			Case()
-			.when(
-				(Extract("month", Employee.date_of_joining) == filters.month)
-				& (Extract("year", Employee.date_of_joining) == filters.year),
-				1,
-			)
+			.when(Employee.date_of_joining[filters.from_date : filters.to_date], 1)
 			.else_(0)
 			.as_("joined_in_current_period"),
 		)
@@ -361,9 +371,9 @@ def get_employee_related_details(filters: Filters) -> tuple[dict, list]:
 	return emp_map, group_by_param_values
 
 
-def get_holiday_map(filters: Filters) -> dict[str, list[dict]]:
+def get_holiday_map(filters: Filters, holiday_lists: set[str]) -> dict[str, list[dict]]:
 	"""
-	Returns a dict of holidays falling in the filter month and year
+	Returns a dict of holidays of the holiday lists falling in the filter month and year
 	with list name as key and list of holidays as values like
 	{
 	        'Holiday List 1': [
@@ -376,29 +386,16 @@ def get_holiday_map(filters: Filters) -> dict[str, list[dict]]:
 	        ]
 	}
 	"""
-	# add default holiday list too
-	holiday_lists = frappe.db.get_all("Holiday List", pluck="name")
-	default_holiday_list = frappe.get_cached_value("Company", filters.company, "default_holiday_list")
-	holiday_lists.append(default_holiday_list)
-
 	holiday_map = frappe._dict()
-	Holiday = frappe.qb.DocType("Holiday")
-
-	for d in holiday_lists:
-		if not d:
-			continue
-
-		holidays = (
-			frappe.qb.from_(Holiday)
-			.select(Extract("day", Holiday.holiday_date).as_("day_of_month"), Holiday.weekly_off)
-			.where(
-				(Holiday.parent == d)
-				& (Extract("month", Holiday.holiday_date) == filters.month)
-				& (Extract("year", Holiday.holiday_date) == filters.year)
-			)
-		).run(as_dict=True)
-
-		holiday_map.setdefault(d, holidays)
+	for holiday_list in holiday_lists:
+		holidays = get_holiday_dates_between(
+			holiday_list, filters.from_date, filters.to_date, as_dict=True, select_weekly_off=True
+		)
+		if holidays:
+			holiday_map[holiday_list] = [
+				frappe._dict(day_of_month=holiday.holiday_date.day, weekly_off=holiday.weekly_off)
+				for holiday in holidays
+			]
 
 	return holiday_map
 
@@ -407,19 +404,38 @@ def get_rows(employee_details: dict, filters: Filters, holiday_map: dict, attend
 	records = []
 	default_holiday_list = frappe.get_cached_value("Company", filters.company, "default_holiday_list")
 
+	if filters.summarized_view:
+		# summaries of all employees in the period are fetched with grouped queries upfront
+		employees = list(employee_details)
+		attendance_summaries = get_attendance_summaries(employees, filters)
+		leave_summaries = get_leave_summaries(employees, filters)
+		entry_exits_summaries = get_entry_exits_summaries(employees, filters)
+
 	for employee, details in employee_details.items():
 		emp_holiday_list = details.holiday_list or default_holiday_list
 		holidays = holiday_map.get(emp_holiday_list)
 
 		if filters.summarized_view:
+			if employee not in attendance_summaries:
+				continue
+
+			summary, attendance_days = attendance_summaries[employee]
 			attendance = get_attendance_status_for_summarized_view(
-				employee, filters, holidays, details.joined_in_current_period, details.joined_date
+				employee,
+				filters,
+				holidays,
+				details.joined_in_current_period,
+				details.joined_date,
+				summary,
+				attendance_days,
 			)
 			if not attendance:
 				continue
 
-			leave_summary = get_leave_summary(employee, filters)
-			entry_exits_summary = get_entry_exits_summary(employee, filters)
+			leave_summary = leave_summaries.get(employee, {})
+			entry_exits_summary = entry_exits_summaries.get(
+				employee, {"total_late_entries": 0, "total_early_exits": 0}
+			)
 
 			row = {"employee": employee, "employee_name": details.employee_name}
 			set_defaults_for_summarized_view(filters, row)
@@ -452,12 +468,19 @@ def set_defaults_for_summarized_view(filters, row):
 
 
 def get_attendance_status_for_summarized_view(
-	employee: str, filters: Filters, holidays: list, joined_in_current_period: int, joined_date: int
+	employee: str,
+	filters: Filters,
+	holidays: list,
+	joined_in_current_period: int,
+	joined_date: int,
+	summary: dict | None = None,
+	attendance_days: list | set | None = None,
 ) -> dict:
 	"""Returns dict of attendance status for employee like
 	{'total_present': 1.5, 'total_leaves': 0.5, 'total_absent': 13.5, 'total_holidays': 8, 'unmarked_days': 5}
 	"""
-	summary, attendance_days = get_attendance_summary_and_days(employee, filters)
+	if summary is None:
+		summary, attendance_days = get_attendance_summary_and_days(employee, filters)
 	if not any(summary.values()):
 		return {}
 
@@ -484,6 +507,17 @@ def get_attendance_status_for_summarized_view(
 
 
 def get_attendance_summary_and_days(employee: str, filters: Filters) -> tuple[dict, list]:
+	summary, days = get_attendance_summaries([employee], filters).get(
+		employee, (frappe._dict(total_present=0, total_absent=0, total_leaves=0, total_half_days=0), set())
+	)
+	return summary, days
+
+
+def get_attendance_summaries(employees: list[str], filters: Filters) -> dict[str, tuple[dict, set]]:
+	"""Returns attendance summary and the days with attendance by employee"""
+	if not employees:
+		return {}
+
 	Attendance = frappe.qb.DocType("Attendance")
 
 	present_case = (
@@ -491,48 +525,40 @@ def get_attendance_summary_and_days(employee: str, filters: Filters) -> tuple[di
 		.when(((Attendance.status == "Present") | (Attendance.status == "Work From Home")), 1)
 		.else_(0)
 	)
-	sum_present = Sum(present_case).as_("total_present")
-
 	absent_case = frappe.qb.terms.Case().when(Attendance.status == "Absent", 1).else_(0)
-	sum_absent = Sum(absent_case).as_("total_absent")
-
 	leave_case = frappe.qb.terms.Case().when(Attendance.status == "On Leave", 1).else_(0)
-	sum_leave = Sum(leave_case).as_("total_leaves")
-
 	half_day_case = frappe.qb.terms.Case().when(Attendance.status == "Half Day", 0.5).else_(0)
-	sum_half_day = Sum(half_day_case).as_("total_half_days")
 
-	summary = (
+	records = (
 		frappe.qb.from_(Attendance)
 		.select(
-			sum_present,
-			sum_absent,
-			sum_leave,
-			sum_half_day,
+			Attendance.employee,
+			Extract("day", Attendance.attendance_date).as_("day_of_month"),
+			Sum(present_case).as_("total_present"),
+			Sum(absent_case).as_("total_absent"),
+			Sum(leave_case).as_("total_leaves"),
+			Sum(half_day_case).as_("total_half_days"),
 		)
 		.where(
 			(Attendance.docstatus == 1)
-			& (Attendance.employee == employee)
+			& (Attendance.employee.isin(employees))
 			& (Attendance.company.isin(filters.companies))
-			& (Extract("month", Attendance.attendance_date) == filters.month)
-			& (Extract("year", Attendance.attendance_date) == filters.year)
+			& (Attendance.attendance_date[filters.from_date : filters.to_date])
 		)
+		.groupby(Attendance.employee, Attendance.attendance_date)
 	).run(as_dict=True)
 
-	days = (
-		frappe.qb.from_(Attendance)
-		.select(Extract("day", Attendance.attendance_date).as_("day_of_month"))
-		.distinct()
-		.where(
-			(Attendance.docstatus == 1)
-			& (Attendance.employee == employee)
-			& (Attendance.company.isin(filters.companies))
-			& (Extract("month", Attendance.attendance_date) == filters.month)
-			& (Extract("year", Attendance.attendance_date) == filters.year)
+	summaries = {}
+	for d in records:
+		summary, days = summaries.setdefault(
+			d.employee,
+			(frappe._dict(total_present=0, total_absent=0, total_leaves=0, total_half_days=0), set()),
 		)
-	).run(pluck=True)
+		for key in summary:
+			summary[key] += flt(d[key])
+		days.add(d.day_of_month)
 
-	return summary[0], days
+	return summaries
 
 
 def get_attendance_status_for_detailed_view(
@@ -580,28 +606,34 @@ def get_leave_summary(employee: str, filters: Filters) -> dict[str, float]:
 	"""Returns a dict of leave type and corresponding leaves taken by employee like:
 	{'leave_without_pay': 1.0, 'sick_leave': 2.0}
 	"""
+	return get_leave_summaries([employee], filters).get(employee, {})
+
+
+def get_leave_summaries(employees: list[str], filters: Filters) -> dict[str, dict[str, float]]:
+	"""Returns leave summaries of employees like {'employee1': {'sick_leave': 2.0}}"""
+	if not employees:
+		return {}
+
 	Attendance = frappe.qb.DocType("Attendance")
 	day_case = frappe.qb.terms.Case().when(Attendance.status == "Half Day", 0.5).else_(1)
 	sum_leave_days = Sum(day_case).as_("leave_days")
 
 	leave_details = (
 		frappe.qb.from_(Attendance)
-		.select(Attendance.leave_type, sum_leave_days)
+		.select(Attendance.employee, Attendance.leave_type, sum_leave_days)
 		.where(
-			(Attendance.employee == employee)
+			(Attendance.employee.isin(employees))
 			& (Attendance.docstatus == 1)
 			& (Attendance.company.isin(filters.companies))
 			& ((Attendance.leave_type.isnotnull()) | (Attendance.leave_type != ""))
-			& (Extract("month", Attendance.attendance_date) == filters.month)
-			& (Extract("year", Attendance.attendance_date) == filters.year)
+			& (Attendance.attendance_date[filters.from_date : filters.to_date])
 		)
-		.groupby(Attendance.leave_type)
+		.groupby(Attendance.employee, Attendance.leave_type)
 	).run(as_dict=True)
 
 	leaves = {}
 	for d in leave_details:
-		leave_type = frappe.scrub(d.leave_type)
-		leaves[leave_type] = d.leave_days
+		leaves.setdefault(d.employee, {})[frappe.scrub(d.leave_type)] = d.leave_days
 
 	return leaves
 
@@ -610,6 +642,16 @@ def get_entry_exits_summary(employee: str, filters: Filters) -> dict[str, float]
 	"""Returns total late entries and total early exits for employee like:
 	{'total_late_entries': 5, 'total_early_exits': 2}
 	"""
+	return get_entry_exits_summaries([employee], filters).get(
+		employee, frappe._dict(total_late_entries=0, total_early_exits=0)
+	)
+
+
+def get_entry_exits_summaries(employees: list[str], filters: Filters) -> dict[str, dict[str, float]]:
+	"""Returns total late entries and early exits by employee"""
+	if not employees:
+		return {}
+
 	Attendance = frappe.qb.DocType("Attendance")
 
 	late_entry_case = frappe.qb.terms.Case().when(Attendance.late_entry == "1", "1")
@@ -620,17 +662,17 @@ def get_entry_exits_summary(employee: str, filters: Filters) -> dict[str, float]
 
 	entry_exits = (
 		frappe.qb.from_(Attendance)
-		.select(count_late_entries, count_early_exits)
+		.select(Attendance.employee, count_late_entries, count_early_exits)
 		.where(
 			(Attendance.docstatus == 1)
-			& (Attendance.employee == employee)
+			& (Attendance.employee.isin(employees))
 			& (Attendance.company.isin(filters.companies))
-			& (Extract("month", Attendance.attendance_date) == filters.month)
-			& (Extract("year", Attendance.attendance_date) == filters.year)
+			& (Attendance.attendance_date[filters.from_date : filters.to_date])
 		)
+		.groupby(Attendance.employee)
 	).run(as_dict=True)
 
-	return entry_exits[0]
+	return {d.pop("employee"): d for d in entry_exits}
 
 
 @frappe.whitelist()
@@ -8,16 +8,20 @@ from frappe import _, qb
 from frappe.model.document import Document
 from frappe.query_builder import Criterion
 from frappe.query_builder.custom import ConstantColumn
+from frappe.query_builder.functions import Coalesce, NullIf, Sum
 from frappe.utils import (
 	add_days,
 	add_months,
+	cint,
 	comma_and,
+	create_batch,
 	cstr,
 	flt,
 	format_datetime,
 	formatdate,
 	get_datetime,
 	get_first_day,
+	get_fullname,
 	get_last_day,
 	get_link_to_form,
 	get_number_format_info,
@@ -26,6 +30,7 @@ from frappe.utils import (
 	get_year_ending,
 	get_year_start,
 	getdate,
+	now_datetime,
 	nowdate,
 )
 
@@ -49,12 +54,15 @@ def get_holiday_list_for_employee(employee, raise_exception=True):
 	"""Simple replacement for ERPNext function"""
 	return None
 
+from hrms.hr.doctype.leave_balance_snapshot.leave_balance_snapshot import add_leaves_to_snapshots
 from hrms.hr.doctype.leave_policy_assignment.leave_policy_assignment import (
 	calculate_pro_rated_leaves,
 )
 
 DateTimeLikeObject = str | datetime.date | datetime.datetime
 
+EARNED_LEAVE_BATCH_SIZE = 500
+
 
 class DuplicateDeclarationError(frappe.ValidationError):
 	pass
@@ -363,67 +371,68 @@ def allocate_earned_leaves():
 
 	for e_leave_type in e_leave_types:
 		leave_allocations = get_leave_allocations(today, e_leave_type.name)
+		due_allocations = []
+
 		for allocation in leave_allocations:
-			if not allocation.leave_policy_assignment and not allocation.leave_policy:
+			if not allocation.leave_policy:
 				continue
 
-			leave_policy = (
-				allocation.leave_policy
-				if allocation.leave_policy
-				else frappe.db.get_value(
-					"Leave Policy Assignment", allocation.leave_policy_assignment, ["leave_policy"]
-				)
-			)
-
-			annual_allocation = frappe.db.get_value(
-				"Leave Policy Detail",
-				filters={"parent": leave_policy, "leave_type": e_leave_type.name},
-				fieldname=["annual_allocation"],
-			)
-			date_of_joining = frappe.db.get_value("Employee", allocation.employee, "date_of_joining")
-
 			from_date = allocation.from_date
 
 			if e_leave_type.allocate_on_day == "Date of Joining":
-				from_date = date_of_joining
+				from_date = allocation.date_of_joining
 
 			if check_effective_date(
 				from_date, today, e_leave_type.earned_leave_frequency, e_leave_type.allocate_on_day
 			):
-				update_previous_leave_allocation(allocation, annual_allocation, e_leave_type, date_of_joining)
-
+				due_allocations.append(allocation)
 
-def update_previous_leave_allocation(allocation, annual_allocation, e_leave_type, date_of_joining):
-	allocation = frappe.get_doc("Leave Allocation", allocation.name)
-	annual_allocation = flt(annual_allocation, allocation.precision("total_leaves_allocated"))
+		for batch in create_batch(due_allocations, EARNED_LEAVE_BATCH_SIZE):
+			update_previous_leave_allocations(batch, e_leave_type)
+			# commit after every batch to avoid losing progress
+			frappe.db.commit()  # nosemgrep
 
-	earned_leaves = get_monthly_earned_leave(
-		date_of_joining,
-		annual_allocation,
-		e_leave_type.earned_leave_frequency,
-		e_leave_type.rounding,
-	)
 
-	new_allocation = flt(allocation.total_leaves_allocated) + flt(earned_leaves)
-	new_allocation_without_cf = flt(
-		flt(allocation.get_existing_leave_count()) + flt(earned_leaves),
-		allocation.precision("total_leaves_allocated"),
-	)
+def update_previous_leave_allocations(allocations, e_leave_type):
+	"""Allocates earned leaves for a batch of allocations of the same leave type.
 
-	if new_allocation > e_leave_type.max_leaves_allowed and e_leave_type.max_leaves_allowed > 0:
-		new_allocation = e_leave_type.max_leaves_allowed
+	Allocation totals, leave ledger entries and comments are written with multi-row queries
+	instead of loading and saving every Leave Allocation.
+	"""
+	today_date = frappe.flags.current_date or getdate()
+	precision = frappe.get_precision("Leave Allocation", "total_leaves_allocated")
+	existing_leave_count = get_existing_leave_count([allocation.name for allocation in allocations])
+
+	allocation_updates = {}
+	ledger_entries = []
+	comments = []
+
+	for allocation in allocations:
+		annual_allocation = flt(allocation.annual_allocation, precision)
+		earned_leaves = get_monthly_earned_leave(
+			allocation.date_of_joining,
+			annual_allocation,
+			e_leave_type.earned_leave_frequency,
+			e_leave_type.rounding,
+		)
 
-	if (
-		new_allocation != allocation.total_leaves_allocated
-		# annual allocation as per policy should not be exceeded except for yearly leaves
-		and (
-			new_allocation_without_cf <= annual_allocation or e_leave_type.earned_leave_frequency == "Yearly"
+		new_allocation = flt(allocation.total_leaves_allocated) + flt(earned_leaves)
+		new_allocation_without_cf = flt(
+			flt(existing_leave_count.get(allocation.name)) + flt(earned_leaves),
+			precision,
 		)
-	):
-		today_date = frappe.flags.current_date or getdate()
 
-		allocation.db_set("total_leaves_allocated", new_allocation, update_modified=False)
-		create_additional_leave_ledger_entry(allocation, earned_leaves, today_date)
+		if new_allocation > e_leave_type.max_leaves_allowed and e_leave_type.max_leaves_allowed > 0:
+			new_allocation = e_leave_type.max_leaves_allowed
+
+		if new_allocation == allocation.total_leaves_allocated or (
+			# annual allocation as per policy should not be exceeded except for yearly leaves
+			new_allocation_without_cf > annual_allocation and e_leave_type.earned_leave_frequency != "Yearly"
+		):
+			continue
+
+		allocation_updates[allocation.name] = {"total_leaves_allocated": new_allocation}
+		ledger_entries.append((allocation, earned_leaves))
 
 		if e_leave_type.allocate_on_day:
 			text = _(
@@ -431,8 +440,134 @@ def update_previous_leave_allocation(allocation, annual_allocation, e_leave_type
 			).format(
 				frappe.bold(earned_leaves), frappe.bold(formatdate(today_date)), e_leave_type.allocate_on_day
 			)
+			comments.append((allocation.name, text))
+
+	if not allocation_updates:
+		return
+
+	frappe.db.bulk_update("Leave Allocation", allocation_updates, update_modified=False)
+	bulk_insert_leave_ledger_entries(ledger_entries, today_date)
+	add_leaves_to_snapshots({allocation.name: leaves for allocation, leaves in ledger_entries}, today_date)
+	bulk_insert_comments("Leave Allocation", comments)
+
+
+def get_existing_leave_count(allocations: list[str]) -> dict:
+	"""Returns a map of Leave Allocation to the new (non carry forwarded) leaves allocated in the ledger"""
+	LeaveLedger = frappe.qb.DocType("Leave Ledger Entry")
+	return frappe._dict(
+		(
+			frappe.qb.from_(LeaveLedger)
+			.select(LeaveLedger.transaction_name, Sum(LeaveLedger.leaves))
+			.where(
+				(LeaveLedger.transaction_type == "Leave Allocation")
+				& (LeaveLedger.transaction_name.isin(allocations))
+				& (LeaveLedger.is_carry_forward == 0)
+				& (LeaveLedger.docstatus == 1)
+			)
+			.groupby(LeaveLedger.transaction_name)
+		).run()
+	)
+
+
+def bulk_insert_leave_ledger_entries(entries: list[tuple], from_date) -> None:
+	"""Inserts submitted Leave Ledger Entries for earned leaves allocated against Leave Allocations"""
+	now = now_datetime()
+	user = frappe.session.user
+
+	frappe.db.bulk_insert(
+		"Leave Ledger Entry",
+		[
+			"name",
+			"employee",
+			"employee_name",
+			"leave_type",
+			"company",
+			"transaction_type",
+			"transaction_name",
+			"leaves",
+			"from_date",
+			"to_date",
+			"is_carry_forward",
+			"is_expired",
+			"is_lwp",
+			"docstatus",
+			"owner",
+			"modified_by",
+			"creation",
+			"modified",
+		],
+		[
+			(
+				frappe.generate_hash(length=10),
+				allocation.employee,
+				allocation.employee_name,
+				allocation.leave_type,
+				allocation.company,
+				"Leave Allocation",
+				allocation.name,
+				leaves,
+				from_date,
+				allocation.to_date,
+				0,
+				0,
+				0,
+				1,
+				user,
+				user,
+				now,
+				now,
+			)
+			for allocation, leaves in entries
+		],
+	)
+
+
+def bulk_insert_comments(
+	reference_doctype: str, comments: list[tuple], comment_type: str = "Info"
+) -> list[str]:
+	"""Inserts comments given as (reference name, text) with a multi-row insert and returns their names"""
+	if not comments:
+		return []
+
+	now = now_datetime()
+	user = frappe.session.user
+	comment_by = get_fullname(user)
+	names = [frappe.generate_hash(length=10) for _comment in comments]
+
+	frappe.db.bulk_insert(
+		"Comment",
+		[
+			"name",
+			"comment_type",
+			"reference_doctype",
+			"reference_name",
+			"content",
+			"comment_email",
+			"comment_by",
+			"owner",
+			"modified_by",
+			"creation",
+			"modified",
+		],
+		[
+			(
+				name,
+				comment_type,
+				reference_doctype,
+				reference_name,
+				text,
+				user,
+				comment_by,
+				user,
+				user,
+				now,
+				now,
+			)
+			for name, (reference_name, text) in zip(names, comments, strict=True)
+		],
+	)
 
-		allocation.add_comment(comment_type="Info", text=text)
+	return names
 
 
 @frappe.whitelist()
@@ -485,19 +620,35 @@ def round_earned_leaves(earned_leaves, rounding):
 
 
 def get_leave_allocations(date, leave_type):
+	"""Returns active allocations of an earned leave type along with the annual allocation
+	as per the allocation's leave policy and the employee's date of joining"""
 	employee = frappe.qb.DocType("Employee")
 	leave_allocation = frappe.qb.DocType("Leave Allocation")
+	leave_policy_assignment = frappe.qb.DocType("Leave Policy Assignment")
+	leave_policy_detail = frappe.qb.DocType("Leave Policy Detail")
+
+	leave_policy = Coalesce(NullIf(leave_allocation.leave_policy, ""), leave_policy_assignment.leave_policy)
 	query = (
 		frappe.qb.from_(leave_allocation)
 		.join(employee)
 		.on(leave_allocation.employee == employee.name)
+		.left_join(leave_policy_assignment)
+		.on(leave_allocation.leave_policy_assignment == leave_policy_assignment.name)
+		.left_join(leave_policy_detail)
+		.on((leave_policy_detail.parent == leave_policy) & (leave_policy_detail.leave_type == leave_type))
 		.select(
 			leave_allocation.name,
 			leave_allocation.employee,
+			leave_allocation.employee_name,
+			leave_allocation.company,
+			leave_allocation.leave_type,
 			leave_allocation.from_date,
 			leave_allocation.to_date,
+			leave_allocation.total_leaves_allocated,
 			leave_allocation.leave_policy_assignment,
-			leave_allocation.leave_policy,
+			leave_policy.as_("leave_policy"),
+			leave_policy_detail.annual_allocation,
+			employee.date_of_joining,
 		)
 		.where(
 			(date >= leave_allocation.from_date)
@@ -905,6 +1056,53 @@ def notify_bulk_action_status(doctype: str, failure: list, success: list) -> Non
 	)
 
 
+def reserve_series_names(series: str, count: int) -> list[str]:
+	"""Reserves `count` consecutive names from a naming series like `HR-ATT-.YYYY.-.#####` with a single update
+	of its counter, for records inserted in bulk. Series without a hash part get 5 digits like `make_autoname`"""
+	from frappe.model.naming import parse_naming_series
+
+	if "#" not in series:
+		series = f"{series}.#####"
+
+	# parts before and after the hash part are parsed separately,
+	# parsing the hash part would advance the counter by one
+	parts = series.split(".")
+	hash_part = next(idx for idx, part in enumerate(parts) if part.startswith("#"))
+	digits = len(parts[hash_part])
+	prefix = parse_naming_series(".".join(parts[:hash_part])) if hash_part else ""
+	suffix = parse_naming_series(".".join(parts[hash_part + 1 :])) if parts[hash_part + 1 :] else ""
+
+	Series = frappe.qb.DocType("Series")
+	current = frappe.qb.from_(Series).select(Series.current).where(Series.name == prefix).for_update().run()
+
+	if current:
+		current = cint(current[0][0])
+		frappe.qb.update(Series).set(Series.current, current + count).where(Series.name == prefix).run()
+	else:
+		current = 0
+		frappe.qb.into(Series).insert(prefix, count).run()
+
+	return [f"{prefix}{cstr(i).zfill(digits)}{suffix}" for i in range(current + 1, current + count + 1)]
+
+
+def has_event_handlers(doctype: str) -> bool:
+	"""Checks for handlers of document events that are not run for records inserted in bulk:
+	doc_events of installed apps for the doctype, Server Scripts, Webhooks and Notifications.
+
+	Handlers registered for all doctypes ("*") are not considered, frappe and erpnext always register
+	them for generic bookkeeping that doesn't apply to records inserted in bulk"""
+	if frappe.get_hooks("doc_events").get(doctype):
+		return True
+
+	return bool(
+		frappe.db.exists(
+			"Server Script", {"reference_doctype": doctype, "script_type": "DocType Event", "disabled": 0}
+		)
+		or frappe.db.exists("Webhook", {"webhook_doctype": doctype, "enabled": 1})
+		or frappe.db.exists("Notification", {"document_type": doctype, "enabled": 1})
+	)
+
+
 @frappe.whitelist()
 def set_geolocation_from_coordinates(doc):
 	if not frappe.db.get_single_value("HR Settings", "allow_geolocation_tracking"):
@@ -0,0 +1,5 @@
+from hrms.hr.doctype.attendance.attendance import on_doctype_update
+
+
+def execute():
+	on_doctype_update()
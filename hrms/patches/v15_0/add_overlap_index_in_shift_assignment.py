@@ -0,0 +1,5 @@
+from hrms.hr.doctype.shift_assignment.shift_assignment import on_doctype_update
+
+
+def execute():
+	on_doctype_update()
@@ -0,0 +1,5 @@
+from hrms.payroll.doctype.payroll_running_total.payroll_running_total import rebuild_payroll_running_totals
+
+
+def execute():
+	rebuild_payroll_running_totals()
@@ -216,15 +216,44 @@ class AdditionalSalary(Document):
 
 
 def get_additional_salaries(employee, start_date, end_date, component_type):
-	from frappe.query_builder import Criterion
-
 	comp_type = "Earning" if component_type == "earnings" else "Deduction"
 
+	additional_sal = frappe.qb.DocType("Additional Salary")
+	additional_salary_list = (
+		get_additional_salary_query(start_date, end_date)
+		.where((additional_sal.employee == employee) & (additional_sal.type == comp_type))
+		.run(as_dict=True)
+	)
+
+	return validate_overwritten_components(additional_salary_list, start_date, end_date)
+
+
+def get_additional_salaries_for_employees(employees: list[str], start_date, end_date) -> dict:
+	"""Returns additional salaries for multiple employees keyed by (employee, component type)"""
+	additional_sal = frappe.qb.DocType("Additional Salary")
+	additional_salary_list = (
+		get_additional_salary_query(start_date, end_date)
+		.select(additional_sal.employee)
+		.where(additional_sal.employee.isin(employees))
+		.run(as_dict=True)
+	)
+
+	additional_salaries = {}
+	for d in additional_salary_list:
+		component_type = "earnings" if d.type == "Earning" else "deductions"
+		additional_salaries.setdefault((d.employee, component_type), []).append(d)
+
+	return additional_salaries
+
+
+def get_additional_salary_query(start_date, end_date):
+	from frappe.query_builder import Criterion
+
 	additional_sal = frappe.qb.DocType("Additional Salary")
 	component_field = additional_sal.salary_component.as_("component")
 	overwrite_field = additional_sal.overwrite_salary_structure_amount.as_("overwrite")
 
-	additional_salary_list = (
+	return (
 		frappe.qb.from_(additional_sal)
 		.select(
 			additional_sal.name,
@@ -235,12 +264,7 @@ def get_additional_salaries(employee, start_date, end_date, component_type):
 			overwrite_field,
 			additional_sal.deduct_full_tax_on_selected_payroll_date,
 		)
-		.where(
-			(additional_sal.employee == employee)
-			& (additional_sal.docstatus == 1)
-			& (additional_sal.type == comp_type)
-			& (additional_sal.disabled == 0)
-		)
+		.where((additional_sal.docstatus == 1) & (additional_sal.disabled == 0))
 		.where(
 			Criterion.any(
 				[
@@ -260,9 +284,10 @@ def get_additional_salaries(employee, start_date, end_date, component_type):
 				]
 			)
 		)
-		.run(as_dict=True)
 	)
 
+
+def validate_overwritten_components(additional_salary_list: list[dict], start_date, end_date) -> list[dict]:
 	additional_salaries = []
 	components_to_overwrite = []
 
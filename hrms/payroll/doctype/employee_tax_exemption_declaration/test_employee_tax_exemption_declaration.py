@@ -9,6 +9,7 @@ import erpnext
 from erpnext.setup.doctype.employee.test_employee import make_employee
 
 from hrms.hr.utils import DuplicateDeclarationError
+from hrms.payroll.doctype.payroll_running_total.payroll_running_total import clear_running_totals
 
 PAYROLL_PERIOD_NAME = "_Test Exemption Period"
 PAYROLL_PERIOD_START = "2022-01-01"
@@ -20,6 +21,7 @@ class TestEmployeeTaxExemptionDeclaration(IntegrationTestCase):
 		frappe.db.delete("Employee Tax Exemption Declaration")
 		frappe.db.delete("Salary Structure Assignment")
 		frappe.db.delete("Salary Slip")
+		clear_running_totals()
 
 		make_employee("employee@taxexemption.com", company="_Test Company")
 		make_employee("employee1@taxexemption.com", company="_Test Company")
@@ -98,7 +98,10 @@ frappe.ui.form.on("Payroll Entry", {
 						frm.call("create_salary_slips");
 					}).addClass("btn-primary");
 				}
-			} else if (frm.doc.docstatus == 1 && frm.doc.status == "Failed") {
+			} else if (
+				frm.doc.docstatus == 1 &&
+				(frm.doc.status == "Failed" || frm.doc.__onload?.creation_interrupted)
+			) {
 				frm.add_custom_button(__("Create Salary Slips"), function () {
 					frm.call("create_salary_slips");
 				}).addClass("btn-primary");
@@ -169,11 +172,17 @@ frappe.ui.form.on("Payroll Entry", {
 			(frm.doc.__onload && frm.doc.__onload.submitted_ss)
 		) {
 			frm.events.add_bank_entry_button(frm);
-		} else if (frm.doc.salary_slips_created && frm.doc.status !== "Queued") {
+		} else if (
+			frm.doc.salary_slips_created &&
+			(frm.doc.status !== "Queued" || frm.doc.__onload?.submission_interrupted)
+		) {
 			frm.add_custom_button(__("Submit Salary Slip"), function () {
 				submit_salary_slip(frm);
 			}).addClass("btn-primary");
-		} else if (!frm.doc.salary_slips_created && frm.doc.status === "Failed") {
+		} else if (
+			!frm.doc.salary_slips_created &&
+			(frm.doc.status === "Failed" || frm.doc.__onload?.creation_interrupted)
+		) {
 			frm.add_custom_button(__("Create Salary Slips"), function () {
 				frm.trigger("create_salary_slips");
 			}).addClass("btn-primary");
@@ -9,18 +9,20 @@ import frappe
 from frappe import _
 from frappe.desk.reportview import get_match_cond
 from frappe.model.document import Document
-from frappe.query_builder.functions import Coalesce, Count
+from frappe.query_builder.functions import Coalesce, Count, Sum
 from frappe.utils import (
 	DATE_FORMAT,
 	add_days,
 	add_to_date,
 	cint,
 	comma_and,
+	create_batch,
 	date_diff,
 	flt,
 	get_link_to_form,
 	getdate,
 )
+from frappe.utils.background_jobs import is_job_enqueued
 
 import erpnext
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
@@ -30,6 +32,8 @@ from erpnext.accounts.utils import get_fiscal_year
 
 from hrms.payroll.doctype.salary_slip.salary_slip_loan_utils import if_lending_app_installed
 from hrms.payroll.doctype.salary_withholding.salary_withholding import link_bank_entry_in_salary_withholdings
+from hrms.payroll.utils import get_payroll_processing_batch_size
+from hrms.utils.holiday_list import get_holiday_calendar
 
 
 class PayrollEntry(Document):
@@ -47,6 +51,18 @@ class PayrollEntry(Document):
 		if not self.docstatus == 1 or self.salary_slips_submitted:
 			return
 
+		# shard jobs died without updating the status, allow creating the remaining salary slips
+		if self.status == "Queued" and not self.salary_slips_created and self.is_creation_interrupted():
+			self.set_onload("creation_interrupted", True)
+
+		# submission job died without updating the status, allow resuming it
+		if (
+			self.status == "Queued"
+			and self.salary_slips_created
+			and not is_job_enqueued(self.get_submission_job_id())
+		):
+			self.set_onload("submission_interrupted", True)
+
 		# check if salary slips were manually submitted
 		entries = frappe.db.count("Salary Slip", {"payroll_entry": self.name, "docstatus": 1}, ["name"])
 		if cint(entries) == len(self.employees):
@@ -250,13 +266,7 @@ class PayrollEntry(Document):
 			)
 			if len(employees) > 30 or frappe.flags.enqueue_payroll_entry:
 				self.db_set("status", "Queued")
-				frappe.enqueue(
-					create_salary_slips_for_employees,
-					timeout=3000,
-					employees=employees,
-					args=args,
-					publish_progress=False,
-				)
+				self.enqueue_salary_slip_creation(employees, args)
 				frappe.msgprint(
 					_("Salary Slip creation is queued. It may take a few minutes"),
 					alert=True,
@@ -267,6 +277,40 @@ class PayrollEntry(Document):
 				# since this method is called via frm.call this doc needs to be updated manually
 				self.reload()
 
+	def enqueue_salary_slip_creation(self, employees: list[str], args: dict) -> None:
+		"""Splits employees into shards and enqueues a salary slip creation job for each shard"""
+		frappe.db.delete("Payroll Entry Shard", {"parent": self.name, "parenttype": self.doctype})
+		self.set("shards", [])
+
+		for idx, batch in enumerate(create_batch(employees, get_payroll_processing_batch_size()), start=1):
+			shard = self.append(
+				"shards",
+				{
+					"shard_index": idx,
+					"status": "Queued",
+					"employee_count": len(batch),
+					"employees": json.dumps(batch),
+				},
+			)
+			shard.db_insert()
+
+		for shard in self.shards:
+			frappe.enqueue(
+				create_salary_slips_for_shard,
+				queue="long",
+				timeout=3000,
+				job_id=get_shard_job_id(shard.name),
+				deduplicate=True,
+				enqueue_after_commit=True,
+				shard=shard.name,
+				args=args,
+			)
+
+	def is_creation_interrupted(self) -> bool:
+		"""Returns True if shards are left unfinished and none of them has a queued or running job"""
+		unfinished = [shard.name for shard in self.shards if shard.status in ("Queued", "In Progress")]
+		return bool(unfinished) and not any(is_job_enqueued(get_shard_job_id(shard)) for shard in unfinished)
+
 	def get_sal_slip_list(self, ss_status, as_dict=False):
 		"""
 		Returns list of salary slips based on selected criteria
@@ -275,19 +319,23 @@ class PayrollEntry(Document):
 		ss = frappe.qb.DocType("Salary Slip")
 		ss_list = (
 			frappe.qb.from_(ss)
-			.select(ss.name, ss.salary_structure)
-			.where(
-				(ss.docstatus == ss_status)
-				& (ss.start_date >= self.start_date)
-				& (ss.end_date <= self.end_date)
-				& (ss.payroll_entry == self.name)
-				& ((ss.journal_entry.isnull()) | (ss.journal_entry == ""))
-				& (Coalesce(ss.salary_slip_based_on_timesheet, 0) == self.salary_slip_based_on_timesheet)
-			)
+			.select(ss.name, ss.salary_structure, ss.employee)
+			.where(self.get_salary_slip_conditions(ss, ss_status))
 		).run(as_dict=as_dict)
 
 		return ss_list
 
+	def get_salary_slip_conditions(self, ss, ss_status: int):
+		"""Returns conditions on Salary Slip `ss` for the slips of this payroll entry yet to be accrued"""
+		return (
+			(ss.docstatus == ss_status)
+			& (ss.start_date >= self.start_date)
+			& (ss.end_date <= self.end_date)
+			& (ss.payroll_entry == self.name)
+			& ((ss.journal_entry.isnull()) | (ss.journal_entry == ""))
+			& (Coalesce(ss.salary_slip_based_on_timesheet, 0) == self.salary_slip_based_on_timesheet)
+		)
+
 	@frappe.whitelist()
 	def submit_salary_slips(self):
 		self.check_permission("write")
@@ -297,10 +345,14 @@ class PayrollEntry(Document):
 			self.db_set("status", "Queued")
 			frappe.enqueue(
 				submit_salary_slips_for_employees,
+				queue="long",
 				timeout=3000,
+				job_id=self.get_submission_job_id(),
+				deduplicate=True,
 				payroll_entry=self,
 				salary_slips=salary_slips,
 				publish_progress=False,
+				commit=True,
 			)
 			frappe.msgprint(
 				_("Salary Slip submission is queued. It may take a few minutes"),
@@ -310,10 +362,14 @@ class PayrollEntry(Document):
 		else:
 			submit_salary_slips_for_employees(self, salary_slips, publish_progress=False)
 
+	def get_submission_job_id(self) -> str:
+		return f"payroll_entry_submission::{self.name}"
+
 	def email_salary_slip(self, submitted_ss):
 		if frappe.db.get_single_value("Payroll Settings", "email_salary_slip_to_employee"):
-			for ss in submitted_ss:
-				ss.email_salary_slip()
+			from hrms.payroll.doctype.salary_slip.salary_slip import email_salary_slips
+
+			email_salary_slips([ss.name for ss in submitted_ss])
 
 	def get_salary_component_account(self, salary_component):
 		account = frappe.db.get_value(
@@ -333,34 +389,60 @@ class PayrollEntry(Document):
 		return account
 
 	def get_salary_components(self, component_type):
-		salary_slips = self.get_sal_slip_list(ss_status=1, as_dict=True)
-
-		if salary_slips:
-			ss = frappe.qb.DocType("Salary Slip")
-			ssd = frappe.qb.DocType("Salary Detail")
-			salary_components = (
-				frappe.qb.from_(ss)
-				.join(ssd)
-				.on(ss.name == ssd.parent)
-				.select(
-					ssd.salary_component,
-					ssd.amount,
-					ssd.parentfield,
-					ssd.additional_salary,
-					ss.salary_structure,
-					ss.employee,
+		"""Returns component totals by employee of the submitted slips yet to be accrued,
+		along with the Employee Advance recovered by a deduction, if any"""
+		ss = frappe.qb.DocType("Salary Slip")
+		ssd = frappe.qb.DocType("Salary Detail")
+		query = (
+			frappe.qb.from_(ss)
+			.join(ssd)
+			.on(ss.name == ssd.parent)
+			.select(
+				ssd.salary_component,
+				Sum(ssd.amount).as_("amount"),
+				ssd.parentfield,
+				ssd.additional_salary,
+				ss.salary_structure,
+				ss.employee,
+			)
+			.where(
+				(ssd.parentfield == component_type)
+				& self.get_salary_slip_conditions(ss, 1)
+				& (
+					(ssd.do_not_include_in_total == 0)
+					| ((ssd.do_not_include_in_total == 1) & (ssd.do_not_include_in_accounts == 0))
 				)
-				.where(
-					(ssd.parentfield == component_type)
-					& (ss.name.isin([d.name for d in salary_slips]))
-					& (
-						(ssd.do_not_include_in_total == 0)
-						| ((ssd.do_not_include_in_total == 1) & (ssd.do_not_include_in_accounts == 0))
-					)
+			)
+			.groupby(
+				ss.employee,
+				ss.salary_structure,
+				ssd.salary_component,
+				ssd.parentfield,
+				ssd.additional_salary,
+			)
+		)
+
+		if component_type == "earnings":
+			# flexible benefits only impacting tax are not paid via payroll
+			SalaryComponent = frappe.qb.DocType("Salary Component")
+			query = (
+				query.join(SalaryComponent)
+				.on(SalaryComponent.name == ssd.salary_component)
+				.where((SalaryComponent.is_flexible_benefit == 0) | (SalaryComponent.only_tax_impact == 0))
+			)
+		elif component_type == "deductions":
+			AdditionalSalary = frappe.qb.DocType("Additional Salary")
+			query = (
+				query.left_join(AdditionalSalary)
+				.on(
+					(AdditionalSalary.name == ssd.additional_salary)
+					& (AdditionalSalary.ref_doctype == "Employee Advance")
 				)
-			).run(as_dict=True)
+				.select(AdditionalSalary.ref_docname.as_("employee_advance"))
+				.groupby(AdditionalSalary.ref_docname)
+			)
 
-			return salary_components
+		return query.run(as_dict=True)
 
 	def get_salary_component_total(
 		self,
@@ -372,20 +454,16 @@ class PayrollEntry(Document):
 			component_dict = {}
 
 			for item in salary_components:
-				if not self.should_add_component_to_accrual_jv(component_type, item):
-					continue
-
 				employee_cost_centers = self.get_payroll_cost_centers_for_employee(
 					item.employee, item.salary_structure
 				)
-				employee_advance = self.get_advance_deduction(component_type, item)
 
 				for cost_center, percentage in employee_cost_centers.items():
 					amount_against_cost_center = flt(item.amount) * percentage / 100
 
-					if employee_advance:
+					if item.employee_advance:
 						self.add_advance_deduction_entry(
-							item, amount_against_cost_center, cost_center, employee_advance
+							item, amount_against_cost_center, cost_center, item.employee_advance
 						)
 					else:
 						key = (item.salary_component, cost_center)
@@ -400,29 +478,6 @@ class PayrollEntry(Document):
 
 			return account_details
 
-	def should_add_component_to_accrual_jv(self, component_type: str, item: dict) -> bool:
-		add_component_to_accrual_jv = True
-		if component_type == "earnings":
-			is_flexible_benefit, only_tax_impact = frappe.get_cached_value(
-				"Salary Component", item["salary_component"], ["is_flexible_benefit", "only_tax_impact"]
-			)
-			if cint(is_flexible_benefit) and cint(only_tax_impact):
-				add_component_to_accrual_jv = False
-
-		return add_component_to_accrual_jv
-
-	def get_advance_deduction(self, component_type: str, item: dict) -> str | None:
-		if component_type == "deductions" and item.additional_salary:
-			ref_doctype, ref_docname = frappe.db.get_value(
-				"Additional Salary",
-				item.additional_salary,
-				["ref_doctype", "ref_docname"],
-			)
-
-			if ref_doctype == "Employee Advance":
-				return ref_docname
-		return
-
 	def add_advance_deduction_entry(
 		self,
 		item: dict,
@@ -481,6 +536,77 @@ class PayrollEntry(Document):
 		if salary_structure and "salary_structure" not in employee_details:
 			employee_details["salary_structure"] = salary_structure
 
+	def set_payroll_cost_centers_for_employees(self):
+		"""Fetches cost center splits of all employees with submitted slips in this payroll entry
+		the same way as `get_payroll_cost_centers_for_employee`"""
+		if not hasattr(self, "employee_cost_centers"):
+			self.employee_cost_centers = {}
+
+		SalarySlip = frappe.qb.DocType("Salary Slip")
+		SalaryStructureAssignment = frappe.qb.DocType("Salary Structure Assignment")
+		EmployeeCostCenter = frappe.qb.DocType("Employee Cost Center")
+		Employee = frappe.qb.DocType("Employee")
+		Department = frappe.qb.DocType("Department")
+		slip_conditions = (SalarySlip.payroll_entry == self.name) & (SalarySlip.docstatus == 1)
+
+		splits = (
+			frappe.qb.from_(SalaryStructureAssignment)
+			.join(SalarySlip)
+			.on(
+				(SalarySlip.employee == SalaryStructureAssignment.employee)
+				& (SalarySlip.salary_structure == SalaryStructureAssignment.salary_structure)
+			)
+			.left_join(EmployeeCostCenter)
+			.on(
+				(EmployeeCostCenter.parent == SalaryStructureAssignment.name)
+				& (EmployeeCostCenter.parenttype == "Salary Structure Assignment")
+			)
+			.select(
+				SalaryStructureAssignment.name,
+				SalaryStructureAssignment.employee,
+				SalaryStructureAssignment.from_date,
+				EmployeeCostCenter.cost_center,
+				EmployeeCostCenter.percentage,
+			)
+			.distinct()
+			.where(
+				slip_conditions
+				& (SalaryStructureAssignment.docstatus == 1)
+				& (SalaryStructureAssignment.from_date <= self.end_date)
+			)
+			.orderby(SalaryStructureAssignment.from_date, order=frappe.qb.desc)
+			.orderby(SalaryStructureAssignment.name, order=frappe.qb.desc)
+		).run(as_dict=True)
+
+		# splits of the latest assignment of each employee
+		latest_assignment = {}
+		cost_centers_by_employee = {}
+		for d in splits:
+			if latest_assignment.setdefault(d.employee, d.name) == d.name and d.cost_center:
+				cost_centers_by_employee.setdefault(d.employee, {})[d.cost_center] = d.percentage
+
+		employees = (
+			frappe.qb.from_(Employee)
+			.left_join(Department)
+			.on(Department.name == Employee.department)
+			.select(
+				Employee.name,
+				Employee.payroll_cost_center,
+				Department.payroll_cost_center.as_("department_cost_center"),
+			)
+			.where(
+				Employee.name.isin(
+					frappe.qb.from_(SalarySlip).select(SalarySlip.employee).where(slip_conditions)
+				)
+			)
+		).run(as_dict=True)
+
+		for d in employees:
+			default_cost_center = d.payroll_cost_center or d.department_cost_center or self.cost_center
+			self.employee_cost_centers.setdefault(
+				d.name, cost_centers_by_employee.get(d.name) or {default_cost_center: 100}
+			)
+
 	def get_payroll_cost_centers_for_employee(self, employee, salary_structure):
 		if not hasattr(self, "employee_cost_centers"):
 			self.employee_cost_centers = {}
@@ -545,6 +671,7 @@ class PayrollEntry(Document):
 		)
 		self.employee_based_payroll_payable_entries = {}
 		self._advance_deduction_entries = []
+		self.set_payroll_cost_centers_for_employees()
 
 		earnings = (
 			self.get_salary_component_total(
@@ -970,7 +1097,7 @@ class PayrollEntry(Document):
 				SalarySlip.salary_structure,
 				SalarySlip.salary_withholding_cycle,
 				SalaryDetail.salary_component,
-				SalaryDetail.amount,
+				Sum(SalaryDetail.amount).as_("amount"),
 				SalaryDetail.parentfield,
 			)
 			.where(
@@ -989,7 +1116,16 @@ class PayrollEntry(Document):
 		)
 
 		if "lending" in frappe.get_installed_apps():
-			query = query.select(SalarySlip.total_loan_repayment)
+			query = query.select(SalarySlip.total_loan_repayment).groupby(SalarySlip.total_loan_repayment)
+
+		query = query.groupby(
+			SalarySlip.name,
+			SalarySlip.employee,
+			SalarySlip.salary_structure,
+			SalarySlip.salary_withholding_cycle,
+			SalaryDetail.salary_component,
+			SalaryDetail.parentfield,
+		)
 
 		if for_withheld_salaries:
 			query = query.where(SalarySlip.status == "Withheld")
@@ -1040,6 +1176,7 @@ class PayrollEntry(Document):
 		)
 
 		if self.employee_based_payroll_payable_entries:
+			self.set_payroll_cost_centers_for_employees()
 			for employee, employee_details in self.employee_based_payroll_payable_entries.items():
 				je_payment_amount = (
 					(employee_details.get("earnings", 0) or 0)
@@ -1198,23 +1335,8 @@ class PayrollEntry(Document):
 
 	def get_holidays_count(self, holiday_list: str, start_date: str, end_date: str) -> float:
 		"""Returns number of holidays between start and end dates in the holiday list"""
-		if not hasattr(self, "_holidays_between_dates"):
-			self._holidays_between_dates = {}
-
-		key = f"{start_date}-{end_date}-{holiday_list}"
-		if key in self._holidays_between_dates:
-			return self._holidays_between_dates[key]
-
-		holidays = frappe.db.get_all(
-			"Holiday",
-			filters={"parent": holiday_list, "holiday_date": ("between", [start_date, end_date])},
-			fields=["COUNT(*) as holidays_count"],
-		)[0]
-
-		if holidays:
-			self._holidays_between_dates[key] = holidays.holidays_count
-
-		return self._holidays_between_dates.get(key) or 0
+		calendar = get_holiday_calendar(holiday_list)
+		return calendar.count(start_date, end_date) if calendar else 0
 
 	@frappe.whitelist()
 	def create_overtime_slips(self):
@@ -1523,8 +1645,14 @@ def get_month_details(year, month):
 
 
 def log_payroll_failure(process, payroll_entry, error):
+	error_message = get_payroll_failure_message(process, payroll_entry.name, error)
+	payroll_entry.db_set({"error_message": error_message, "status": "Failed"})
+
+
+def get_payroll_failure_message(process: str, payroll_entry: str, error: Exception) -> str:
+	"""Logs the error and returns a user facing message linking to the Error Log"""
 	error_log = frappe.log_error(
-		title=_("Salary Slip {0} failed for Payroll Entry {1}").format(process, payroll_entry.name)
+		title=_("Salary Slip {0} failed for Payroll Entry {1}").format(process, payroll_entry)
 	)
 	message_log = frappe.message_log.pop() if frappe.message_log else str(error)
 
@@ -1540,27 +1668,44 @@ def log_payroll_failure(process, payroll_entry, error):
 		get_link_to_form("Error Log", error_log.name)
 	)
 
-	payroll_entry.db_set({"error_message": error_message, "status": "Failed"})
+	return error_message
+
+
+def insert_salary_slips(employees: list[str], args: dict, publish_progress: bool = False) -> list[str]:
+	"""Creates salary slips for employees and returns the employees for whom salary slips already exist"""
+	from hrms.payroll.doctype.salary_slip.salary_slip_batch import SalarySlipBatch
+
+	salary_slips_exist_for = get_existing_salary_slips(employees, args)
+	count = 0
+
+	employees = list(set(employees) - set(salary_slips_exist_for))
+	if not employees:
+		return salary_slips_exist_for
+
+	# prefetch inputs for all slips in a few set based queries instead of querying per slip
+	batch = SalarySlipBatch(employees, args.start_date, args.end_date, args.company)
+
+	for emp in employees:
+		args.update({"doctype": "Salary Slip", "employee": emp})
+		salary_slip = frappe.get_doc(args)
+		salary_slip._batch = batch
+		salary_slip.insert()
+
+		count += 1
+		if publish_progress:
+			frappe.publish_progress(
+				count * 100 / len(employees),
+				title=_("Creating Salary Slips..."),
+			)
+
+	return salary_slips_exist_for
 
 
 def create_salary_slips_for_employees(employees, args, publish_progress=True):
 	payroll_entry = frappe.get_cached_doc("Payroll Entry", args.payroll_entry)
 
 	try:
-		salary_slips_exist_for = get_existing_salary_slips(employees, args)
-		count = 0
-
-		employees = list(set(employees) - set(salary_slips_exist_for))
-		for emp in employees:
-			args.update({"doctype": "Salary Slip", "employee": emp})
-			frappe.get_doc(args).insert()
-
-			count += 1
-			if publish_progress:
-				frappe.publish_progress(
-					count * 100 / len(employees),
-					title=_("Creating Salary Slips..."),
-				)
+		salary_slips_exist_for = insert_salary_slips(employees, args, publish_progress)
 
 		payroll_entry.db_set({"status": "Submitted", "salary_slips_created": 1, "error_message": ""})
 
@@ -1582,6 +1727,81 @@ def create_salary_slips_for_employees(employees, args, publish_progress=True):
 		frappe.publish_realtime("completed_salary_slip_creation", user=frappe.session.user)
 
 
+def create_salary_slips_for_shard(shard: str, args: dict) -> None:
+	"""Creates salary slips for the employees in a Payroll Entry Shard.
+
+	Each shard is committed independently so that a failure only rolls back the slips of that shard.
+	The last shard to finish updates the Payroll Entry status.
+	"""
+	employees = json.loads(frappe.db.get_value("Payroll Entry Shard", shard, "employees") or "[]")
+	frappe.db.set_value("Payroll Entry Shard", shard, "status", "In Progress", update_modified=False)
+	frappe.db.commit()  # nosemgrep
+
+	try:
+		insert_salary_slips(employees, args)
+		frappe.db.set_value(
+			"Payroll Entry Shard", shard, {"status": "Completed", "error_message": ""}, update_modified=False
+		)
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.db.set_value(
+			"Payroll Entry Shard",
+			shard,
+			{
+				"status": "Failed",
+				"error_message": get_payroll_failure_message("creation", args.payroll_entry, e),
+			},
+			update_modified=False,
+		)
+
+	frappe.db.commit()  # nosemgrep
+	update_salary_slip_creation_status(args.payroll_entry)
+
+
+def get_shard_job_id(shard: str) -> str:
+	return f"payroll_entry_shard::{shard}"
+
+
+def update_salary_slip_creation_status(payroll_entry: str) -> None:
+	"""Marks salary slips as created once every shard of the payroll entry has finished"""
+	# lock the payroll entry so that shards finishing together don't race to update it
+	frappe.db.get_value("Payroll Entry", payroll_entry, "name", for_update=True)
+	shards = frappe.get_all(
+		"Payroll Entry Shard",
+		filters={"parent": payroll_entry, "parenttype": "Payroll Entry"},
+		fields=["shard_index", "status", "error_message"],
+		order_by="idx",
+	)
+
+	finished = [shard for shard in shards if shard.status in ("Completed", "Failed")]
+	frappe.publish_progress(
+		len(finished) * 100 / (len(shards) or 1),
+		title=_("Creating Salary Slips..."),
+	)
+
+	if len(finished) < len(shards):
+		frappe.db.commit()  # nosemgrep
+		return
+
+	failed = [shard for shard in shards if shard.status == "Failed"]
+	if failed:
+		error_message = "\n\n".join(
+			_("Shard {0}: {1}").format(shard.shard_index, shard.error_message) for shard in failed
+		)
+		frappe.db.set_value(
+			"Payroll Entry", payroll_entry, {"error_message": error_message, "status": "Failed"}
+		)
+	else:
+		frappe.db.set_value(
+			"Payroll Entry",
+			payroll_entry,
+			{"status": "Submitted", "salary_slips_created": 1, "error_message": ""},
+		)
+
+	frappe.db.commit()  # nosemgrep
+	frappe.publish_realtime("completed_salary_slip_creation", user=frappe.session.user)
+
+
 def show_payroll_submission_status(submitted, unsubmitted, payroll_entry):
 	if not submitted and not unsubmitted:
 		frappe.msgprint(
@@ -1625,30 +1845,29 @@ def get_existing_salary_slips(employees, args):
 	).run(pluck=True)
 
 
-def submit_salary_slips_for_employees(payroll_entry, salary_slips, publish_progress=True):
+def submit_salary_slips_for_employees(payroll_entry, salary_slips, publish_progress=True, commit=False):
+	"""Submits salary slips in chunks and books a single accrual entry for all of them.
+
+	In background jobs (`commit`) every chunk is committed, so a re-run after a failure only picks up
+	the remaining draft slips along with the submitted ones that are not linked to an accrual Journal Entry yet.
+	"""
 	try:
-		submitted = []
 		unsubmitted = []
 		frappe.flags.via_payroll_entry = True
 		count = 0
 
-		for entry in salary_slips:
-			salary_slip = frappe.get_doc("Salary Slip", entry[0])
-			if salary_slip.net_pay < 0:
-				unsubmitted.append(entry[0])
-			else:
-				try:
-					salary_slip.submit()
-					submitted.append(salary_slip)
-				except frappe.ValidationError:
-					unsubmitted.append(entry[0])
+		for batch in create_batch(salary_slips, get_payroll_processing_batch_size()):
+			unsubmitted.extend(submit_salary_slip_batch(payroll_entry, batch))
+			if commit:
+				frappe.db.commit()  # nosemgrep
 
-			count += 1
+			count += len(batch)
 			if publish_progress:
 				frappe.publish_progress(
 					count * 100 / len(salary_slips), title=_("Submitting Salary Slips...")
 				)
 
+		submitted = payroll_entry.get_sal_slip_list(ss_status=1, as_dict=True)
 		if submitted:
 			payroll_entry.make_accrual_jv_entry(submitted)
 			payroll_entry.email_salary_slip(submitted)
@@ -1661,12 +1880,40 @@ def submit_salary_slips_for_employees(payroll_entry, salary_slips, publish_progr
 		log_payroll_failure("submission", payroll_entry, e)
 
 	finally:
-		frappe.db.commit()  # nosemgrep
+		if commit:
+			frappe.db.commit()  # nosemgrep
 		frappe.publish_realtime("completed_salary_slip_submission", user=frappe.session.user)
 
 	frappe.flags.via_payroll_entry = False
 
 
+def submit_salary_slip_batch(payroll_entry, salary_slips: list) -> list[str]:
+	"""Submits a chunk of salary slips and returns the ones that could not be submitted"""
+	from hrms.payroll.doctype.salary_slip.salary_slip_batch import SalarySlipBatch
+
+	unsubmitted = []
+	batch = SalarySlipBatch(
+		[entry[2] for entry in salary_slips],
+		payroll_entry.start_date,
+		payroll_entry.end_date,
+		payroll_entry.company,
+	)
+
+	for entry in salary_slips:
+		salary_slip = frappe.get_doc("Salary Slip", entry[0])
+		if salary_slip.net_pay < 0:
+			unsubmitted.append(entry[0])
+			continue
+
+		salary_slip._batch = batch
+		try:
+			salary_slip.submit()
+		except frappe.ValidationError:
+			unsubmitted.append(entry[0])
+
+	return unsubmitted
+
+
 @frappe.whitelist()
 @frappe.validate_and_sanitize_search_inputs
 def get_payroll_entries_for_jv(doctype, txt, searchfield, start, page_len, filters):
@@ -54,6 +54,7 @@ class TestPayrollEntry(FrappeTestCase):
 			"Salary Structure Assignment",
 			"Employee Cost Center",
 			"Payroll Employee Detail",
+			"Payroll Entry Shard",
 			"Additional Salary",
 		]:
 			frappe.db.delete(dt)
@@ -234,6 +235,11 @@ class TestPayrollEntry(FrappeTestCase):
 		cost_centers = pe.get_payroll_cost_centers_for_employee(employee, "_Test Salary Structure 2")
 		self.assertEqual(cost_centers, COST_CENTERS)
 
+		# same breakup when fetched for all employees of the payroll entry
+		pe = frappe.get_doc("Payroll Entry", pe.name)
+		pe.set_payroll_cost_centers_for_employees()
+		self.assertEqual(pe.employee_cost_centers[employee], COST_CENTERS)
+
 	def test_get_end_date(self):
 		self.assertEqual(get_end_date("2017-01-01", "monthly"), {"end_date": "2017-01-31"})
 		self.assertEqual(get_end_date("2017-02-01", "monthly"), {"end_date": "2017-02-28"})
@@ -347,6 +353,99 @@ class TestPayrollEntry(FrappeTestCase):
 		self.assertEqual(payroll_entry.status, "Queued")
 		frappe.flags.enqueue_payroll_entry = False
 
+	@change_settings("Payroll Settings", {"payroll_processing_batch_size": 1})
+	def test_sharded_salary_slip_creation(self):
+		from hrms.payroll.doctype.payroll_entry.payroll_entry import create_salary_slips_for_shard
+
+		company = "_Test Company"
+		company_doc = frappe.get_doc("Company", company)
+		employee1 = make_employee("test_shard1@payroll.com", company=company)
+		employee2 = make_employee("test_shard2@payroll.com", company=company)
+		setup_salary_structure(employee1, company_doc)
+		setup_salary_structure(employee2, company_doc)
+
+		dates = get_start_end_dates("Monthly", nowdate())
+		payroll_entry = get_payroll_entry(
+			start_date=dates.start_date,
+			end_date=dates.end_date,
+			payable_account=company_doc.default_payroll_payable_account,
+			currency=company_doc.default_currency,
+			company=company_doc.name,
+			cost_center="Main - _TC",
+		)
+		frappe.flags.enqueue_payroll_entry = True
+		payroll_entry.submit()
+		frappe.flags.enqueue_payroll_entry = False
+		payroll_entry.reload()
+
+		# one shard per employee
+		self.assertEqual(len(payroll_entry.shards), 2)
+		self.assertEqual(payroll_entry.status, "Queued")
+
+		args = frappe._dict(
+			{
+				"payroll_frequency": payroll_entry.payroll_frequency,
+				"start_date": payroll_entry.start_date,
+				"end_date": payroll_entry.end_date,
+				"company": payroll_entry.company,
+				"posting_date": payroll_entry.posting_date,
+				"payroll_entry": payroll_entry.name,
+				"exchange_rate": payroll_entry.exchange_rate,
+				"currency": payroll_entry.currency,
+			}
+		)
+
+		# payroll entry is not marked as created until all shards finish
+		create_salary_slips_for_shard(payroll_entry.shards[0].name, frappe._dict(args))
+		payroll_entry.reload()
+		self.assertEqual(payroll_entry.shards[0].status, "Completed")
+		self.assertFalse(payroll_entry.salary_slips_created)
+
+		create_salary_slips_for_shard(payroll_entry.shards[1].name, frappe._dict(args))
+		payroll_entry.reload()
+		self.assertTrue(payroll_entry.salary_slips_created)
+		self.assertEqual(payroll_entry.status, "Submitted")
+		self.assertEqual(frappe.db.count("Salary Slip", {"payroll_entry": payroll_entry.name}), 2)
+
+	@change_settings("Payroll Settings", {"payroll_processing_batch_size": 1})
+	def test_resume_interrupted_salary_slip_submission(self):
+		from hrms.payroll.doctype.payroll_entry.payroll_entry import submit_salary_slip_batch
+
+		company = "_Test Company"
+		company_doc = frappe.get_doc("Company", company)
+		employee1 = make_employee("test_resume1@payroll.com", company=company)
+		employee2 = make_employee("test_resume2@payroll.com", company=company)
+		setup_salary_structure(employee1, company_doc)
+		setup_salary_structure(employee2, company_doc)
+
+		dates = get_start_end_dates("Monthly", nowdate())
+		payroll_entry = get_payroll_entry(
+			start_date=dates.start_date,
+			end_date=dates.end_date,
+			payable_account=company_doc.default_payroll_payable_account,
+			currency=company_doc.default_currency,
+			company=company_doc.name,
+			cost_center="Main - _TC",
+		)
+		payroll_entry.submit()
+
+		# worker dies after committing the first chunk, before the accrual entry is booked
+		salary_slips = payroll_entry.get_sal_slip_list(ss_status=0)
+		self.assertEqual(len(salary_slips), 2)
+		submit_salary_slip_batch(payroll_entry, salary_slips[:1])
+
+		# re-run submits the remaining slip and books one accrual entry for both
+		payroll_entry.submit_salary_slips()
+		payroll_entry.reload()
+		self.assertEqual(payroll_entry.status, "Submitted")
+
+		journal_entries = frappe.get_all(
+			"Salary Slip", filters={"payroll_entry": payroll_entry.name}, pluck="journal_entry"
+		)
+		self.assertEqual(len(journal_entries), 2)
+		self.assertEqual(len(set(journal_entries)), 1)
+		self.assertTrue(journal_entries[0])
+
 	def test_salary_slip_operation_failure(self):
 		company = "_Test Company"
 		company_doc = frappe.get_doc("Company", company)
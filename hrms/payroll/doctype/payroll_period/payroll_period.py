@@ -16,6 +16,29 @@ class PayrollPeriod(Document):
 		self.validate_from_to_dates("start_date", "end_date")
 		self.validate_overlap()
 
+	def on_update(self):
+		from_date, to_date = getdate(self.start_date), getdate(self.end_date)
+		if doc_before_save := self.get_doc_before_save():
+			if (
+				getdate(doc_before_save.start_date) == from_date
+				and getdate(doc_before_save.end_date) == to_date
+				and doc_before_save.company == self.company
+			):
+				return
+
+			if doc_before_save.company == self.company:
+				from_date = min(from_date, getdate(doc_before_save.start_date))
+				to_date = max(to_date, getdate(doc_before_save.end_date))
+			else:
+				enqueue_running_totals_rebuild(
+					doc_before_save.company, doc_before_save.start_date, doc_before_save.end_date
+				)
+
+		enqueue_running_totals_rebuild(self.company, from_date, to_date)
+
+	def on_trash(self):
+		enqueue_running_totals_rebuild(self.company, self.start_date, self.end_date)
+
 	def clear_cache(self):
 		get_payroll_period.clear_cache()
 		return super().clear_cache()
@@ -55,6 +78,25 @@ class PayrollPeriod(Document):
 			frappe.throw(msg)
 
 
+def enqueue_running_totals_rebuild(company: str, from_date, to_date) -> None:
+	"""Rebuilds payroll running totals of the slips in the dates, since the year to date period of those slips changes.
+	Stale totals are deleted right away, the slips are read directly until the rebuild finishes"""
+	from hrms.payroll.doctype.payroll_running_total.payroll_running_total import (
+		delete_running_totals_for_company,
+	)
+
+	delete_running_totals_for_company(company, getdate(from_date), getdate(to_date))
+	frappe.enqueue(
+		"hrms.payroll.doctype.payroll_running_total.payroll_running_total.rebuild_running_totals_for_company",
+		queue="long",
+		timeout=3000,
+		enqueue_after_commit=True,
+		company=company,
+		from_date=getdate(from_date),
+		to_date=getdate(to_date),
+	)
+
+
 def get_payroll_period_days(start_date, end_date, employee, company=None):
 	if not company:
 		company = frappe.db.get_value("Employee", employee, "company")
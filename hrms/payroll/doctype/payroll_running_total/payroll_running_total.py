@@ -0,0 +1,469 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder.functions import IfNull, Sum
+from frappe.utils import cint, create_batch, flt, get_first_day, getdate
+
+from erpnext.accounts.utils import get_fiscal_year
+
+from hrms.payroll.doctype.payroll_period.payroll_period import get_payroll_period
+
+COMPONENT_TYPES = {"earnings": "Earning", "deductions": "Deduction"}
+PARENTFIELDS = {component_type: parentfield for parentfield, component_type in COMPONENT_TYPES.items()}
+# Salary Detail fields the component totals are grouped by
+COMPONENT_KEY_FIELDS = (
+	"salary_component",
+	"component_type",
+	"is_tax_applicable",
+	"is_flexible_benefit",
+	"exempted_from_income_tax",
+	"variable_based_on_taxable_salary",
+)
+TOTAL_FIELDS = ("last_end_date", "gross_pay", "net_pay", "month_start_date", "month_net_pay")
+
+
+class PayrollRunningTotal(Document):
+	pass
+
+
+def get_running_total_name(employee: str, period_start_date) -> str:
+	return f"{employee}-{getdate(period_start_date)}"
+
+
+def get_year_to_date_period(start_date, end_date, company: str) -> tuple:
+	"""Returns the payroll period of the dates, or the fiscal year of `start_date` if there is no payroll period"""
+	if payroll_period := get_payroll_period(start_date, end_date, company):
+		return getdate(payroll_period.start_date), getdate(payroll_period.end_date)
+
+	fiscal_year = get_fiscal_year(date=start_date, company=company, as_dict=1)
+	return getdate(fiscal_year.year_start_date), getdate(fiscal_year.year_end_date)
+
+
+def get_running_totals(employees: list[str], period_start_date, period_end_date) -> dict[str, dict]:
+	"""Returns running totals of the employees for the period with component totals in `components`.
+	Totals of employees without a row, eg: on the first slip of the period, after a Payroll Period change or
+	an unfinished rebuild, are computed from their submitted slips"""
+	names = [get_running_total_name(employee, period_start_date) for employee in employees]
+
+	Totals = frappe.qb.DocType("Payroll Running Total")
+	Component = frappe.qb.DocType("Payroll Running Total Component")
+	rows = (
+		frappe.qb.from_(Totals)
+		.left_join(Component)
+		.on((Component.parent == Totals.name) & (Component.parenttype == "Payroll Running Total"))
+		.select(
+			Totals.employee,
+			*(Totals[field] for field in TOTAL_FIELDS),
+			*(Component[field] for field in COMPONENT_KEY_FIELDS),
+			Component.amount,
+			Component.additional_amount,
+		)
+		.where(Totals.name.isin(names))
+	).run(as_dict=True)
+
+	running_totals = {}
+	for row in rows:
+		totals = running_totals.setdefault(row.employee, get_empty_running_totals())
+		totals.update({field: row[field] for field in TOTAL_FIELDS})
+		if row.salary_component:
+			totals.components.append(
+				make_component_totals(
+					tuple(row[field] for field in COMPONENT_KEY_FIELDS), row.amount, row.additional_amount
+				)
+			)
+
+	if missing := [employee for employee in employees if employee not in running_totals]:
+		for totals in build_running_totals(missing, period_start_date, period_end_date):
+			if totals.period_start_date == getdate(period_start_date):
+				running_totals[totals.employee] = frappe._dict(
+					{field: totals[field] for field in TOTAL_FIELDS},
+					components=[
+						make_component_totals(key, amount, additional_amount)
+						for key, (amount, additional_amount) in totals.components.items()
+					],
+				)
+
+	for employee in employees:
+		running_totals.setdefault(employee, get_empty_running_totals())
+
+	return running_totals
+
+
+def make_component_totals(key: tuple, amount: float, additional_amount: float) -> dict:
+	return frappe._dict(
+		dict(zip(COMPONENT_KEY_FIELDS, key, strict=True)),
+		parentfield=PARENTFIELDS[key[1]],
+		amount=flt(amount),
+		additional_amount=flt(additional_amount),
+	)
+
+
+def get_empty_running_totals() -> dict:
+	return frappe._dict(
+		last_end_date=None,
+		gross_pay=0.0,
+		net_pay=0.0,
+		month_start_date=None,
+		month_net_pay=0.0,
+		components=[],
+	)
+
+
+def covers_slips_before(totals: dict, date) -> bool:
+	"""Returns True if every slip in the totals ends before `date`,
+	so that the totals are exactly those of the slips preceding a slip starting on `date`"""
+	return not totals.last_end_date or getdate(totals.last_end_date) < getdate(date)
+
+
+def get_month_to_date(totals: dict, start_date) -> float | None:
+	"""Returns net pay of the slips in the month of `start_date` ending before it,
+	or None if the totals cannot tell, eg: a later slip in the month is already submitted"""
+	if not covers_slips_before(totals, start_date):
+		return None
+
+	month_start_date = get_first_day(start_date)
+	if totals.month_start_date and getdate(totals.month_start_date) == month_start_date:
+		return flt(totals.month_net_pay)
+
+	if not totals.last_end_date or getdate(totals.last_end_date) < month_start_date:
+		return 0.0
+
+	return None
+
+
+def get_component_wise_totals(totals: dict) -> dict[str, float]:
+	component_totals = {}
+	for d in totals.components:
+		component_totals[d.salary_component] = component_totals.get(d.salary_component, 0.0) + d.amount
+
+	return component_totals
+
+
+def get_salary_detail_total(
+	details: list[dict],
+	parentfield: str,
+	salary_component: str | None = None,
+	is_tax_applicable: int | None = None,
+	is_flexible_benefit: int = 0,
+	exempted_from_income_tax: int = 0,
+	variable_based_on_taxable_salary: int = 0,
+	field_to_select: str = "amount",
+) -> float:
+	"""Sums grouped Salary Detail totals with the same filters as `SalarySlip.get_salary_slip_details`"""
+	total = 0.0
+	for d in details:
+		if (
+			d.parentfield != parentfield
+			or d.is_flexible_benefit != is_flexible_benefit
+			or (is_tax_applicable is not None and d.is_tax_applicable != is_tax_applicable)
+			or (exempted_from_income_tax and d.exempted_from_income_tax != exempted_from_income_tax)
+			or (
+				variable_based_on_taxable_salary
+				and d.variable_based_on_taxable_salary != variable_based_on_taxable_salary
+			)
+			or (salary_component and d.salary_component != salary_component)
+		):
+			continue
+
+		total += d.get(field_to_select) or 0
+
+	return total
+
+
+def add_salary_slip_to_running_totals(salary_slip: Document) -> None:
+	"""Adds a submitted slip to the running totals of its employee's period"""
+	period_start_date, period_end_date = get_year_to_date_period(
+		salary_slip.start_date, salary_slip.end_date, salary_slip.company
+	)
+	name = get_running_total_name(salary_slip.employee, period_start_date)
+	totals = frappe.db.get_value("Payroll Running Total", name, TOTAL_FIELDS, as_dict=True, for_update=True)
+	if not totals:
+		# first slip of the period, or totals not built yet. There is no row to lock,
+		# so concurrent submissions for the employee wait on the employee and then read the committed row
+		lock_employee(salary_slip.employee)
+		totals = frappe.db.get_value(
+			"Payroll Running Total", name, TOTAL_FIELDS, as_dict=True, for_update=True
+		)
+
+	if not totals:
+		refresh_running_totals(salary_slip.employee, period_start_date, period_end_date)
+		return
+
+	end_date = getdate(salary_slip.end_date)
+	month_start_date = get_first_day(salary_slip.start_date)
+	values = {
+		"gross_pay": flt(totals.gross_pay) + flt(salary_slip.gross_pay),
+		"net_pay": flt(totals.net_pay) + flt(salary_slip.net_pay),
+		"last_end_date": max(getdate(totals.last_end_date), end_date) if totals.last_end_date else end_date,
+	}
+	if totals.month_start_date and getdate(totals.month_start_date) == month_start_date:
+		values["month_net_pay"] = flt(totals.month_net_pay) + flt(salary_slip.net_pay)
+	elif not totals.month_start_date or getdate(totals.month_start_date) < month_start_date:
+		values.update(month_start_date=month_start_date, month_net_pay=flt(salary_slip.net_pay))
+
+	frappe.db.set_value("Payroll Running Total", name, values, update_modified=False)
+
+	Component = frappe.qb.DocType("Payroll Running Total Component")
+	components = {
+		tuple(row[field] for field in COMPONENT_KEY_FIELDS): row
+		for row in (
+			frappe.qb.from_(Component)
+			.select(Component.name, *COMPONENT_KEY_FIELDS, Component.amount, Component.additional_amount)
+			.where((Component.parent == name) & (Component.parenttype == "Payroll Running Total"))
+		).run(as_dict=True)
+	}
+
+	updates = {}
+	idx = len(components)
+	for key, (amount, additional_amount) in get_salary_slip_component_totals(salary_slip).items():
+		if row := components.get(key):
+			updates[row.name] = {
+				"amount": flt(row.amount) + amount,
+				"additional_amount": flt(row.additional_amount) + additional_amount,
+			}
+		else:
+			idx += 1
+			make_running_total_component(name, idx, key, amount, additional_amount).db_insert()
+
+	if updates:
+		frappe.db.bulk_update("Payroll Running Total Component", updates, update_modified=False)
+
+
+def get_salary_slip_component_totals(salary_slip: Document) -> dict[tuple, list[float]]:
+	component_totals = {}
+	for parentfield, component_type in COMPONENT_TYPES.items():
+		for d in salary_slip.get(parentfield):
+			key = (
+				d.salary_component,
+				component_type,
+				cint(d.is_tax_applicable),
+				cint(d.is_flexible_benefit),
+				cint(d.exempted_from_income_tax),
+				cint(d.variable_based_on_taxable_salary),
+			)
+			amounts = component_totals.setdefault(key, [0.0, 0.0])
+			amounts[0] += flt(d.amount)
+			amounts[1] += flt(d.additional_amount)
+
+	return component_totals
+
+
+def make_running_total_component(
+	parent: str, idx: int, key: tuple, amount: float, additional_amount: float
+) -> Document:
+	return frappe.get_doc(
+		{
+			"doctype": "Payroll Running Total Component",
+			"parent": parent,
+			"parenttype": "Payroll Running Total",
+			"parentfield": "components",
+			"idx": idx,
+			**dict(zip(COMPONENT_KEY_FIELDS, key, strict=True)),
+			"amount": amount,
+			"additional_amount": additional_amount,
+		}
+	)
+
+
+def refresh_running_totals(employee: str, period_start_date, period_end_date) -> None:
+	"""Recomputes running totals of the employee's period from the submitted slips, eg: after a cancellation"""
+	lock_employee(employee)
+	delete_running_totals([get_running_total_name(employee, period_start_date)])
+
+	for totals in build_running_totals([employee], period_start_date, period_end_date):
+		if totals.period_start_date == getdate(period_start_date):
+			insert_running_totals(totals)
+
+
+def lock_employee(employee: str) -> None:
+	frappe.db.get_value("Employee", employee, "name", for_update=True)
+
+
+def rebuild_running_totals_for_company(company: str, from_date, to_date) -> None:
+	"""Rebuilds running totals of the company's periods overlapping the dates, eg: after a Payroll Period changes.
+	Periods extending beyond the dates are left to be computed from the slips until their next submission"""
+	delete_running_totals_for_company(company, from_date, to_date)
+
+	employees = frappe.get_all(
+		"Salary Slip",
+		filters={"company": company, "docstatus": 1, "start_date": ("between", [from_date, to_date])},
+		pluck="employee",
+		distinct=True,
+	)
+	for batch in create_batch(employees, 500):
+		for totals in build_running_totals(batch, from_date, to_date):
+			if totals.period_start_date >= getdate(from_date) and totals.period_end_date <= getdate(to_date):
+				insert_running_totals(totals)
+
+
+def delete_running_totals_for_company(company: str, from_date, to_date) -> None:
+	"""Deletes running totals of the company's periods overlapping the dates,
+	so that they are computed from the slips till rebuilt"""
+	Totals = frappe.qb.DocType("Payroll Running Total")
+	delete_running_totals(
+		(
+			frappe.qb.from_(Totals)
+			.select(Totals.name)
+			.where(
+				(Totals.company == company)
+				& (Totals.period_start_date <= to_date)
+				& (Totals.period_end_date >= from_date)
+			)
+		).run(pluck=True)
+	)
+
+
+def build_running_totals(employees: list[str], from_date=None, to_date=None) -> list[dict]:
+	"""Computes running totals of the employees' submitted slips starting between the dates, if set"""
+	SalarySlip = frappe.qb.DocType("Salary Slip")
+	SalaryDetail = frappe.qb.DocType("Salary Detail")
+
+	conditions = (SalarySlip.employee.isin(employees)) & (SalarySlip.docstatus == 1)
+	if from_date:
+		conditions &= SalarySlip.start_date >= from_date
+	if to_date:
+		conditions &= SalarySlip.start_date <= to_date
+
+	slips = (
+		frappe.qb.from_(SalarySlip)
+		.select(
+			SalarySlip.name,
+			SalarySlip.employee,
+			SalarySlip.company,
+			SalarySlip.start_date,
+			SalarySlip.end_date,
+			SalarySlip.gross_pay,
+			SalarySlip.net_pay,
+		)
+		.where(conditions)
+		.orderby(SalarySlip.start_date)
+	).run(as_dict=True)
+	if not slips:
+		return []
+
+	details = (
+		frappe.qb.from_(SalarySlip)
+		.join(SalaryDetail)
+		.on(SalaryDetail.parent == SalarySlip.name)
+		.select(
+			SalaryDetail.parent,
+			SalaryDetail.parentfield,
+			SalaryDetail.salary_component,
+			SalaryDetail.is_tax_applicable,
+			SalaryDetail.is_flexible_benefit,
+			SalaryDetail.exempted_from_income_tax,
+			SalaryDetail.variable_based_on_taxable_salary,
+			Sum(IfNull(SalaryDetail.amount, 0)).as_("amount"),
+			Sum(IfNull(SalaryDetail.additional_amount, 0)).as_("additional_amount"),
+		)
+		.where(conditions & (SalaryDetail.parentfield.isin(list(COMPONENT_TYPES))))
+		.groupby(
+			SalaryDetail.parent,
+			SalaryDetail.parentfield,
+			SalaryDetail.salary_component,
+			SalaryDetail.is_tax_applicable,
+			SalaryDetail.is_flexible_benefit,
+			SalaryDetail.exempted_from_income_tax,
+			SalaryDetail.variable_based_on_taxable_salary,
+		)
+	).run(as_dict=True)
+
+	periods = {}
+	running_totals = {}
+	totals_by_slip = {}
+	for slip in slips:
+		period_key = (slip.start_date, slip.end_date, slip.company)
+		if period_key not in periods:
+			periods[period_key] = get_year_to_date_period(slip.start_date, slip.end_date, slip.company)
+		period_start_date, period_end_date = periods[period_key]
+
+		totals = running_totals.setdefault(
+			(slip.employee, period_start_date),
+			frappe._dict(
+				get_empty_running_totals(),
+				employee=slip.employee,
+				company=slip.company,
+				period_start_date=period_start_date,
+				period_end_date=period_end_date,
+				components={},
+			),
+		)
+		totals.gross_pay += flt(slip.gross_pay)
+		totals.net_pay += flt(slip.net_pay)
+		totals.last_end_date = max(totals.last_end_date or slip.end_date, slip.end_date)
+
+		# slips are in the order of start date, so the last month seen is the latest
+		month_start_date = get_first_day(slip.start_date)
+		if totals.month_start_date != month_start_date:
+			totals.month_start_date, totals.month_net_pay = month_start_date, 0.0
+		totals.month_net_pay += flt(slip.net_pay)
+
+		totals_by_slip[slip.name] = totals
+
+	for d in details:
+		key = (
+			d.salary_component,
+			COMPONENT_TYPES[d.parentfield],
+			cint(d.is_tax_applicable),
+			cint(d.is_flexible_benefit),
+			cint(d.exempted_from_income_tax),
+			cint(d.variable_based_on_taxable_salary),
+		)
+		amounts = totals_by_slip[d.parent].components.setdefault(key, [0.0, 0.0])
+		amounts[0] += flt(d.amount)
+		amounts[1] += flt(d.additional_amount)
+
+	return list(running_totals.values())
+
+
+def insert_running_totals(totals: dict) -> None:
+	name = get_running_total_name(totals.employee, totals.period_start_date)
+	frappe.get_doc(
+		{
+			"doctype": "Payroll Running Total",
+			"name": name,
+			"employee": totals.employee,
+			"company": totals.company,
+			"period_start_date": totals.period_start_date,
+			"period_end_date": totals.period_end_date,
+			**{field: totals[field] for field in TOTAL_FIELDS},
+		}
+	).db_insert()
+
+	for idx, (key, (amount, additional_amount)) in enumerate(totals.components.items(), start=1):
+		make_running_total_component(name, idx, key, amount, additional_amount).db_insert()
+
+
+def delete_running_totals(names: list[str]) -> None:
+	if not names:
+		return
+
+	frappe.db.delete(
+		"Payroll Running Total Component",
+		{"parent": ("in", names), "parenttype": "Payroll Running Total"},
+	)
+	frappe.db.delete("Payroll Running Total", {"name": ("in", names)})
+
+
+def clear_running_totals(employee: str | None = None) -> None:
+	if employee:
+		delete_running_totals(frappe.get_all("Payroll Running Total", {"employee": employee}, pluck="name"))
+	else:
+		frappe.db.delete("Payroll Running Total Component", {"parenttype": "Payroll Running Total"})
+		frappe.db.delete("Payroll Running Total")
+
+
+def rebuild_payroll_running_totals(employee: str | None = None) -> None:
+	"""Rebuilds running totals of all submitted salary slips, eg:
+	bench --site <site> execute hrms.payroll.doctype.payroll_running_total.payroll_running_total.rebuild_payroll_running_totals
+	"""
+	clear_running_totals(employee)
+
+	filters = {"docstatus": 1, "employee": employee} if employee else {"docstatus": 1}
+	employees = frappe.get_all("Salary Slip", filters=filters, pluck="employee", distinct=True)
+	for batch in create_batch(employees, 500):
+		for totals in build_running_totals(batch):
+			insert_running_totals(totals)
+		frappe.db.commit()  # nosemgrep
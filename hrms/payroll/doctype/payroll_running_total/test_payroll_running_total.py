@@ -0,0 +1,159 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.query_builder.functions import Sum
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, flt, getdate
+
+from erpnext.setup.doctype.employee.test_employee import make_employee
+
+from hrms.payroll.doctype.employee_tax_exemption_declaration.test_employee_tax_exemption_declaration import (
+	create_payroll_period,
+)
+from hrms.payroll.doctype.payroll_running_total.payroll_running_total import (
+	build_running_totals,
+	clear_running_totals,
+	get_running_total_name,
+	get_running_totals,
+	get_salary_detail_total,
+)
+from hrms.payroll.doctype.salary_slip.test_salary_slip import (
+	create_salary_slips_for_payroll_period,
+	create_tax_slab,
+)
+from hrms.payroll.doctype.salary_structure.test_salary_structure import make_salary_structure
+
+
+class TestPayrollRunningTotal(IntegrationTestCase):
+	def setUp(self):
+		self.employee = make_employee("test_payroll_running_total@salary.com", company="_Test Company")
+		frappe.db.delete("Salary Slip", {"employee": self.employee})
+		clear_running_totals(self.employee)
+
+		self.payroll_period = create_payroll_period(name="_Test Payroll Period", company="_Test Company")
+		create_tax_slab(
+			self.payroll_period,
+			allow_tax_exemption=True,
+			currency="INR",
+			effective_date=getdate("2019-04-01"),
+			company="_Test Company",
+		)
+		self.salary_structure = make_salary_structure(
+			"Monthly Salary Structure Test for Payroll Running Total",
+			"Monthly",
+			employee=self.employee,
+			company="_Test Company",
+			currency="INR",
+			payroll_period=self.payroll_period,
+		)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_running_totals_maintained_on_submit_and_cancel(self):
+		create_salary_slips_for_payroll_period(
+			self.employee, self.salary_structure.name, self.payroll_period, deduct_random=False, num=3
+		)
+		slips = frappe.get_all(
+			"Salary Slip",
+			filters={"employee": self.employee, "docstatus": 1},
+			fields=["name", "net_pay", "gross_pay", "end_date"],
+			order_by="start_date",
+		)
+
+		totals = self.get_running_totals()
+		self.assertEqual(flt(totals.net_pay, 2), flt(sum(slip.net_pay for slip in slips), 2))
+		self.assertEqual(flt(totals.gross_pay, 2), flt(sum(slip.gross_pay for slip in slips), 2))
+		self.assertEqual(getdate(totals.last_end_date), getdate(slips[-1].end_date))
+		self.assert_totals_match_salary_slips(totals)
+
+		frappe.get_doc("Salary Slip", slips[-1].name).cancel()
+
+		totals = self.get_running_totals()
+		self.assertEqual(flt(totals.net_pay, 2), flt(sum(slip.net_pay for slip in slips[:-1]), 2))
+		self.assertEqual(getdate(totals.last_end_date), getdate(slips[-2].end_date))
+		self.assert_totals_match_salary_slips(totals)
+
+	def test_totals_are_built_from_salary_slips(self):
+		create_salary_slips_for_payroll_period(
+			self.employee, self.salary_structure.name, self.payroll_period, deduct_random=False, num=2
+		)
+		maintained = self.get_running_totals()
+
+		# totals built from the slips match the ones maintained on submit
+		clear_running_totals(self.employee)
+		self.assertFalse(frappe.db.exists("Payroll Running Total", {"employee": self.employee}))
+		built = build_running_totals([self.employee])
+
+		self.assertEqual(len(built), 1)
+		self.assertEqual(flt(built[0].net_pay, 2), flt(maintained.net_pay, 2))
+		self.assertEqual(
+			{key: [flt(amount, 2) for amount in amounts] for key, amounts in built[0].components.items()},
+			{
+				(
+					d.salary_component,
+					d.component_type,
+					d.is_tax_applicable,
+					d.is_flexible_benefit,
+					d.exempted_from_income_tax,
+					d.variable_based_on_taxable_salary,
+				): [flt(d.amount, 2), flt(d.additional_amount, 2)]
+				for d in maintained.components
+			},
+		)
+
+	def test_totals_are_computed_from_salary_slips_without_a_row(self):
+		create_salary_slips_for_payroll_period(
+			self.employee, self.salary_structure.name, self.payroll_period, deduct_random=False, num=2
+		)
+		maintained = self.get_running_totals()
+
+		# a changed payroll period deletes the totals of its dates till they are rebuilt
+		self.payroll_period.end_date = add_days(self.payroll_period.end_date, -1)
+		self.payroll_period.save()
+		self.assertFalse(frappe.db.exists("Payroll Running Total", {"employee": self.employee}))
+
+		computed = get_running_totals(
+			[self.employee], self.payroll_period.start_date, self.payroll_period.end_date
+		)[self.employee]
+		self.assertEqual(flt(computed.net_pay, 2), flt(maintained.net_pay, 2))
+		self.assertEqual(getdate(computed.last_end_date), getdate(maintained.last_end_date))
+		self.assert_totals_match_salary_slips(computed)
+
+	def get_running_totals(self):
+		name = get_running_total_name(self.employee, self.payroll_period.start_date)
+		self.assertTrue(frappe.db.exists("Payroll Running Total", name))
+		return get_running_totals(
+			[self.employee], self.payroll_period.start_date, self.payroll_period.end_date
+		)[self.employee]
+
+	def assert_totals_match_salary_slips(self, totals):
+		SalarySlip = frappe.qb.DocType("Salary Slip")
+		SalaryDetail = frappe.qb.DocType("Salary Detail")
+		for parentfield, is_tax_applicable in (("earnings", 1), ("earnings", 0), ("deductions", None)):
+			query = (
+				frappe.qb.from_(SalarySlip)
+				.join(SalaryDetail)
+				.on(SalaryDetail.parent == SalarySlip.name)
+				.select(Sum(SalaryDetail.amount))
+				.where(
+					(SalarySlip.employee == self.employee)
+					& (SalarySlip.docstatus == 1)
+					& (SalaryDetail.parentfield == parentfield)
+					& (SalaryDetail.is_flexible_benefit == 0)
+				)
+			)
+			if is_tax_applicable is not None:
+				query = query.where(SalaryDetail.is_tax_applicable == is_tax_applicable)
+
+			expected = flt(query.run()[0][0], 2)
+			self.assertEqual(
+				flt(
+					get_salary_detail_total(
+						totals.components, parentfield, is_tax_applicable=is_tax_applicable
+					),
+					2,
+				),
+				expected,
+			)
@@ -4,6 +4,7 @@
 
 import unicodedata
 from datetime import date
+from types import CodeType
 
 import frappe
 from frappe import _, msgprint
@@ -34,7 +35,10 @@ from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employe
 from erpnext.utilities.transaction_base import TransactionBase
 
 from hrms.hr.utils import validate_active_employee
-from hrms.payroll.doctype.additional_salary.additional_salary import get_additional_salaries
+from hrms.payroll.doctype.additional_salary.additional_salary import (
+	get_additional_salaries,
+	validate_overwritten_components,
+)
 from hrms.payroll.doctype.employee_benefit_application.employee_benefit_application import (
 	get_benefit_component_amount,
 )
@@ -47,6 +51,16 @@ from hrms.payroll.doctype.payroll_period.payroll_period import (
 	get_payroll_period,
 	get_period_factor,
 )
+from hrms.payroll.doctype.payroll_running_total.payroll_running_total import (
+	add_salary_slip_to_running_totals,
+	covers_slips_before,
+	get_component_wise_totals,
+	get_month_to_date,
+	get_running_totals,
+	get_salary_detail_total,
+	get_year_to_date_period,
+	refresh_running_totals,
+)
 from hrms.payroll.doctype.salary_slip.salary_slip_loan_utils import (
 	cancel_loan_repayment_entry,
 	make_loan_repayment_entry,
@@ -57,11 +71,13 @@ from hrms.payroll.utils import sanitize_expression
 from hrms.utils.holiday_list import get_holiday_dates_between
 
 # cache keys
-HOLIDAYS_BETWEEN_DATES = "holidays_between_dates"
 LEAVE_TYPE_MAP = "leave_type_map"
 SALARY_COMPONENT_VALUES = "salary_component_values"
 TAX_COMPONENTS_BY_COMPANY = "tax_components_by_company"
 
+# compiled conditions and formulas per salary structure: {structure: (modified, {code: code object})}
+_compiled_formulas: dict[str, tuple[str, dict[str, CodeType]]] = {}
+
 
 class SalarySlip(TransactionBase):
 	def __init__(self, *args, **kwargs):
@@ -79,6 +95,10 @@ class SalarySlip(TransactionBase):
 			"ceil": ceil,
 			"floor": floor,
 		}
+		# prefetched inputs set by Payroll Entry when creating slips in bulk, see SalarySlipBatch
+		self._batch = None
+		# totals of the employee's submitted slips in the year to date period, see PayrollRunningTotal
+		self._running_totals = None
 
 	@property
 	def joining_date(self):
@@ -132,6 +152,7 @@ class SalarySlip(TransactionBase):
 		return self.__actual_end_date
 
 	def validate(self):
+		self._running_totals = None
 		self.check_salary_withholding()
 		self.status = self.get_status()
 		validate_active_employee(self.employee)
@@ -194,6 +215,7 @@ class SalarySlip(TransactionBase):
 			self.update_status(self.name)
 
 			make_loan_repayment_entry(self)
+			add_salary_slip_to_running_totals(self)
 
 			if not frappe.flags.via_payroll_entry and not frappe.flags.in_patch:
 				email_salary_slip = cint(
@@ -232,6 +254,7 @@ class SalarySlip(TransactionBase):
 		self.set_status()
 		self.update_status()
 		self.update_payment_status_for_gratuity_and_leave_encashment()
+		refresh_running_totals(self.employee, *self.get_year_to_date_period())
 
 		cancel_loan_repayment_entry(self)
 		self.publish_update()
@@ -359,6 +382,18 @@ class SalarySlip(TransactionBase):
 				self.append("timesheets", {"time_sheet": data.name, "working_hours": data.total_hours})
 
 	def check_sal_struct(self):
+		if self._batch:
+			payroll_frequency = (
+				self.payroll_frequency
+				if not self.salary_slip_based_on_timesheet and self.payroll_frequency
+				else None
+			)
+			salary_structure = self._batch.get_active_salary_structure(
+				self.employee, self.end_date, payroll_frequency
+			)
+			if salary_structure is not None:
+				return self.set_salary_structure(salary_structure)
+
 		ss = frappe.qb.DocType("Salary Structure")
 		ssa = frappe.qb.DocType("Salary Structure Assignment")
 
@@ -386,9 +421,11 @@ class SalarySlip(TransactionBase):
 			query = query.where(ss.payroll_frequency == self.payroll_frequency)
 
 		st_name = query.run()
+		return self.set_salary_structure(st_name[0][0] if st_name else None)
 
-		if st_name:
-			self.salary_structure = st_name[0][0]
+	def set_salary_structure(self, salary_structure: str | None) -> str | None:
+		if salary_structure:
+			self.salary_structure = salary_structure
 			return self.salary_structure
 
 		else:
@@ -519,6 +556,19 @@ class SalarySlip(TransactionBase):
 
 	def get_half_absent_days(self, consider_marked_attendance_on_holidays, holidays):
 		"""Calculates the number of half absent days for an employee within a date range"""
+		attendance = self._batch and self._batch.get_attendance(
+			self.employee, self.actual_start_date, self.actual_end_date
+		)
+		if attendance is not None:
+			exclude_holidays = (not consider_marked_attendance_on_holidays) and holidays
+			return sum(
+				1
+				for d in attendance
+				if d.status == "Half Day"
+				and d.half_day_status == "Absent"
+				and not (exclude_holidays and d.attendance_date in holidays)
+			)
+
 		Attendance = frappe.qb.DocType("Attendance")
 		query = (
 			frappe.qb.from_(Attendance)
@@ -575,6 +625,12 @@ class SalarySlip(TransactionBase):
 		return no_of_holidays
 
 	def _get_marked_attendance_days(self, holidays: list | None = None) -> float:
+		attendance = self._batch and self._batch.get_attendance(
+			self.employee, self.actual_start_date, self.actual_end_date
+		)
+		if attendance is not None:
+			return sum(1 for d in attendance if not (holidays and d.attendance_date in holidays))
+
 		Attendance = frappe.qb.DocType("Attendance")
 		query = (
 			frappe.qb.from_(Attendance)
@@ -613,25 +669,24 @@ class SalarySlip(TransactionBase):
 		return payment_days
 
 	def get_holidays_for_employee(self, start_date, end_date):
-		holiday_list = get_holiday_list_for_employee(self.employee)
-		key = f"{holiday_list}:{start_date}:{end_date}"
-		holiday_dates = frappe.cache().hget(HOLIDAYS_BETWEEN_DATES, key)
+		holiday_dates = self._batch and self._batch.get_holidays(self.employee, start_date, end_date)
+		if holiday_dates is not None:
+			return holiday_dates
 
-		if not holiday_dates:
-			holiday_dates = get_holiday_dates_between(holiday_list, start_date, end_date)
-			frappe.cache().hset(HOLIDAYS_BETWEEN_DATES, key, holiday_dates)
-
-		return holiday_dates
+		holiday_list = get_holiday_list_for_employee(self.employee)
+		return get_holiday_dates_between(holiday_list, start_date, end_date)
 
 	def calculate_lwp_or_ppl_based_on_leave_application(
 		self, holidays, working_days_list, daily_wages_fraction_for_half_day
 	):
 		lwp = 0
-		leaves = get_lwp_or_ppl_for_date_range(
-			self.employee,
-			self.start_date,
-			self.end_date,
-		)
+		leaves = self._batch and self._batch.get_leaves(self.employee, self.start_date, self.end_date)
+		if leaves is None:
+			leaves = get_lwp_or_ppl_for_date_range(
+				self.employee,
+				self.start_date,
+				self.end_date,
+			)
 
 		for d in working_days_list:
 			if self.relieving_date and d > self.relieving_date:
@@ -677,6 +732,10 @@ class SalarySlip(TransactionBase):
 		return frappe.cache().get_value(LEAVE_TYPE_MAP, _get_leave_type_map)
 
 	def get_employee_attendance(self, start_date, end_date):
+		attendance_details = self._batch and self._batch.get_attendance(self.employee, start_date, end_date)
+		if attendance_details is not None:
+			return [d for d in attendance_details if d.status in ("Absent", "Half Day", "On Leave")]
+
 		attendance = frappe.qb.DocType("Attendance")
 
 		attendance_details = (
@@ -773,18 +832,13 @@ class SalarySlip(TransactionBase):
 			doc.append("earnings", wages_row)
 
 	def set_salary_structure_assignment(self):
-		self._salary_structure_assignment = frappe.db.get_value(
-			"Salary Structure Assignment",
-			{
-				"employee": self.employee,
-				"salary_structure": self.salary_structure,
-				"from_date": ("<=", self.actual_start_date),
-				"docstatus": 1,
-			},
-			"*",
-			order_by="from_date desc",
-			as_dict=True,
+		assignment = self._batch and self._batch.get_salary_structure_assignment(
+			self.employee, self.salary_structure, self.actual_start_date
 		)
+		if assignment is not None:
+			self._salary_structure_assignment = assignment
+		else:
+			self._salary_structure_assignment = self.get_salary_structure_assignment()
 
 		if not self._salary_structure_assignment:
 			frappe.throw(
@@ -796,6 +850,20 @@ class SalarySlip(TransactionBase):
 				)
 			)
 
+	def get_salary_structure_assignment(self) -> dict | None:
+		return frappe.db.get_value(
+			"Salary Structure Assignment",
+			{
+				"employee": self.employee,
+				"salary_structure": self.salary_structure,
+				"from_date": ("<=", self.actual_start_date),
+				"docstatus": 1,
+			},
+			"*",
+			order_by="from_date desc",
+			as_dict=True,
+		)
+
 	def calculate_net_pay(self, skip_tax_breakup_computation: bool = False):
 		def set_gross_pay_and_base_gross_pay():
 			self.gross_pay = self.get_component_totals("earnings", depends_on_payment_days=1)
@@ -1012,6 +1080,7 @@ class SalarySlip(TransactionBase):
 
 	def get_future_period_non_taxable_earnings(self):
 		salary_slip = frappe.copy_doc(self)
+		salary_slip._batch = self._batch
 		# consider full payment days for future period
 		salary_slip.payment_days = salary_slip.total_working_days
 		salary_slip.calculate_net_pay(skip_tax_breakup_computation=True)
@@ -1225,11 +1294,14 @@ class SalarySlip(TransactionBase):
 	def eval_condition_and_formula(self, struct_row, data):
 		try:
 			condition, formula, amount = struct_row.condition, struct_row.formula, struct_row.amount
-			if condition and not _safe_eval(condition, self.whitelisted_globals, data):
+			if condition and not _safe_eval(
+				self.get_compiled_formula(condition), self.whitelisted_globals, data
+			):
 				return None
 			if struct_row.amount_based_on_formula and formula:
 				amount = flt(
-					_safe_eval(formula, self.whitelisted_globals, data), struct_row.precision("amount")
+					_safe_eval(self.get_compiled_formula(formula), self.whitelisted_globals, data),
+					struct_row.precision("amount"),
 				)
 			if amount:
 				data[struct_row.abbr] = amount
@@ -1259,6 +1331,10 @@ class SalarySlip(TransactionBase):
 			)
 			raise
 
+	def get_compiled_formula(self, code: str) -> CodeType:
+		structure = self._salary_structure_doc
+		return get_compiled_formula(structure.name, str(structure.modified), code)
+
 	def add_employee_benefits(self):
 		for struct_row in self._salary_structure_doc.get("earnings"):
 			if struct_row.is_flexible_benefit == 1:
@@ -1304,9 +1380,17 @@ class SalarySlip(TransactionBase):
 						self.update_component_row(frappe._dict(last_benefit.struct_row), amount, "earnings")
 
 	def add_additional_salary_components(self, component_type):
-		additional_salaries = get_additional_salaries(
+		additional_salaries = self._batch and self._batch.get_additional_salaries(
 			self.employee, self.start_date, self.end_date, component_type
 		)
+		if additional_salaries is not None:
+			additional_salaries = validate_overwritten_components(
+				additional_salaries, self.start_date, self.end_date
+			)
+		else:
+			additional_salaries = get_additional_salaries(
+				self.employee, self.start_date, self.end_date, component_type
+			)
 
 		for additional_salary in additional_salaries:
 			self.update_component_row(
@@ -1577,7 +1661,9 @@ class SalarySlip(TransactionBase):
 				title=_("Missing Tax Slab"),
 			)
 
-		income_tax_slab_doc = frappe.get_cached_doc("Income Tax Slab", income_tax_slab)
+		income_tax_slab_doc = (
+			self._batch and self._batch.get_income_tax_slab(income_tax_slab)
+		) or frappe.get_cached_doc("Income Tax Slab", income_tax_slab)
 		if income_tax_slab_doc.disabled:
 			frappe.throw(_("Income Tax Slab: {0} is disabled").format(income_tax_slab))
 
@@ -1622,6 +1708,37 @@ class SalarySlip(TransactionBase):
 		variable_based_on_taxable_salary=0,
 		field_to_select="amount",
 	):
+		if self._batch:
+			total = self._batch.get_salary_slip_details(
+				self.employee,
+				start_date,
+				end_date,
+				parentfield,
+				salary_component=salary_component,
+				is_tax_applicable=is_tax_applicable,
+				is_flexible_benefit=is_flexible_benefit,
+				exempted_from_income_tax=exempted_from_income_tax,
+				variable_based_on_taxable_salary=variable_based_on_taxable_salary,
+				field_to_select=field_to_select,
+			)
+			if total is not None:
+				return total
+
+		running_totals = self.get_running_totals()
+		if getdate(start_date) == self.get_year_to_date_period()[0] and covers_slips_before(
+			running_totals, end_date
+		):
+			return get_salary_detail_total(
+				running_totals.components,
+				parentfield,
+				salary_component=salary_component,
+				is_tax_applicable=is_tax_applicable,
+				is_flexible_benefit=is_flexible_benefit,
+				exempted_from_income_tax=exempted_from_income_tax,
+				variable_based_on_taxable_salary=variable_based_on_taxable_salary,
+				field_to_select=field_to_select,
+			)
+
 		ss = frappe.qb.DocType("Salary Slip")
 		sd = frappe.qb.DocType("Salary Detail")
 
@@ -1847,20 +1964,14 @@ class SalarySlip(TransactionBase):
 		total_exemption_amount = 0
 		if self.tax_slab.allow_tax_exemption:
 			if self.deduct_tax_for_unsubmitted_tax_exemption_proof:
-				exemption_proof = frappe.db.get_value(
-					"Employee Tax Exemption Proof Submission",
-					{"employee": self.employee, "payroll_period": self.payroll_period.name, "docstatus": 1},
-					"exemption_amount",
-					cache=True,
+				exemption_proof = self.get_tax_exemption(
+					"Employee Tax Exemption Proof Submission", "exemption_amount"
 				)
 				if exemption_proof:
 					total_exemption_amount = exemption_proof
 			else:
-				declaration = frappe.db.get_value(
-					"Employee Tax Exemption Declaration",
-					{"employee": self.employee, "payroll_period": self.payroll_period.name, "docstatus": 1},
-					"total_exemption_amount",
-					cache=True,
+				declaration = self.get_tax_exemption(
+					"Employee Tax Exemption Declaration", "total_exemption_amount"
 				)
 				if declaration:
 					total_exemption_amount = declaration
@@ -1870,7 +1981,27 @@ class SalarySlip(TransactionBase):
 
 		return total_exemption_amount
 
+	def get_tax_exemption(self, doctype: str, fieldname: str):
+		exemption = self._batch and self._batch.get_tax_exemption(
+			self.employee, self.payroll_period.name, doctype
+		)
+		if exemption is not None:
+			return exemption
+
+		return frappe.db.get_value(
+			doctype,
+			{"employee": self.employee, "payroll_period": self.payroll_period.name, "docstatus": 1},
+			fieldname,
+			cache=True,
+		)
+
 	def get_income_form_other_sources(self):
+		other_income = self._batch and self._batch.get_other_income(
+			self.employee, self.payroll_period.name, self.company
+		)
+		if other_income is not None:
+			return other_income
+
 		return (
 			frappe.get_all(
 				"Employee Other Income",
@@ -2019,88 +2150,51 @@ class SalarySlip(TransactionBase):
 		self.net_pay = flt(self.gross_pay) - flt(self.total_deduction)
 
 	def compute_year_to_date(self):
-		year_to_date = 0
-		period_start_date, period_end_date = self.get_year_to_date_period()
-
-		salary_slip_sum = frappe.get_list(
-			"Salary Slip",
-			fields=["sum(net_pay) as net_sum", "sum(gross_pay) as gross_sum"],
-			filters={
-				"employee": self.employee,
-				"start_date": [">=", period_start_date],
-				"end_date": ["<", period_end_date],
-				"name": ["!=", self.name],
-				"docstatus": 1,
-			},
-		)
-
-		year_to_date = flt(salary_slip_sum[0].net_sum) if salary_slip_sum else 0.0
-		gross_year_to_date = flt(salary_slip_sum[0].gross_sum) if salary_slip_sum else 0.0
-
-		year_to_date += self.net_pay
-		gross_year_to_date += self.gross_pay
-		self.year_to_date = year_to_date
-		self.gross_year_to_date = gross_year_to_date
+		running_totals = self.get_running_totals()
+		self.year_to_date = flt(running_totals.net_pay) + self.net_pay
+		self.gross_year_to_date = flt(running_totals.gross_pay) + self.gross_pay
 
 	def compute_month_to_date(self):
-		month_to_date = 0
-		first_day_of_the_month = get_first_day(self.start_date)
-		salary_slip_sum = frappe.get_list(
-			"Salary Slip",
-			fields=["sum(net_pay) as sum"],
-			filters={
-				"employee": self.employee,
-				"start_date": [">=", first_day_of_the_month],
-				"end_date": ["<", self.start_date],
-				"name": ["!=", self.name],
-				"docstatus": 1,
-			},
-		)
-
-		month_to_date = flt(salary_slip_sum[0].sum) if salary_slip_sum else 0.0
+		month_to_date = get_month_to_date(self.get_running_totals(), self.start_date)
+		if month_to_date is None:
+			salary_slip_sum = frappe.get_list(
+				"Salary Slip",
+				fields=["sum(net_pay) as sum"],
+				filters={
+					"employee": self.employee,
+					"start_date": [">=", get_first_day(self.start_date)],
+					"end_date": ["<", self.start_date],
+					"name": ["!=", self.name],
+					"docstatus": 1,
+				},
+			)
+			month_to_date = flt(salary_slip_sum[0].sum) if salary_slip_sum else 0.0
 
-		month_to_date += self.net_pay
-		self.month_to_date = month_to_date
+		self.month_to_date = month_to_date + self.net_pay
 
 	def compute_component_wise_year_to_date(self):
-		period_start_date, period_end_date = self.get_year_to_date_period()
-
-		ss = frappe.qb.DocType("Salary Slip")
-		sd = frappe.qb.DocType("Salary Detail")
+		component_totals = get_component_wise_totals(self.get_running_totals())
 
 		for key in ("earnings", "deductions"):
 			for component in self.get(key):
-				year_to_date = 0
-				component_sum = (
-					frappe.qb.from_(sd)
-					.inner_join(ss)
-					.on(sd.parent == ss.name)
-					.select(Sum(sd.amount).as_("sum"))
-					.where(
-						(ss.employee == self.employee)
-						& (sd.salary_component == component.salary_component)
-						& (ss.start_date >= period_start_date)
-						& (ss.end_date < period_end_date)
-						& (ss.name != self.name)
-						& (ss.docstatus == 1)
-					)
-				).run()
+				component.year_to_date = (
+					component_totals.get(component.salary_component, 0.0) + component.amount
+				)
 
-				year_to_date = flt(component_sum[0][0]) if component_sum else 0.0
-				year_to_date += component.amount
-				component.year_to_date = year_to_date
+	def get_running_totals(self) -> dict:
+		"""Returns totals of the employee's submitted slips in the year to date period"""
+		if self._running_totals is None:
+			period_start_date, period_end_date = self.get_year_to_date_period()
+			running_totals = self._batch and self._batch.get_running_totals(self.employee, period_start_date)
+			self._running_totals = (
+				running_totals
+				or get_running_totals([self.employee], period_start_date, period_end_date)[self.employee]
+			)
 
-	def get_year_to_date_period(self):
-		if self.payroll_period:
-			period_start_date = self.payroll_period.start_date
-			period_end_date = self.payroll_period.end_date
-		else:
-			# get dates based on fiscal year if no payroll period exists
-			fiscal_year = get_fiscal_year(date=self.start_date, company=self.company, as_dict=1)
-			period_start_date = fiscal_year.year_start_date
-			period_end_date = fiscal_year.year_end_date
+		return self._running_totals
 
-		return period_start_date, period_end_date
+	def get_year_to_date_period(self):
+		return get_year_to_date_period(self.start_date, self.end_date, self.company)
 
 	def add_leave_balances(self):
 		self.set("leave_details", [])
@@ -2245,9 +2339,37 @@ def eval_tax_slab_condition(condition, eval_globals=None, eval_locals=None):
 
 def get_lwp_or_ppl_for_date_range(employee, start_date, end_date):
 	LeaveApplication = frappe.qb.DocType("Leave Application")
-	LeaveType = frappe.qb.DocType("Leave Type")
+	leaves = (
+		get_lwp_or_ppl_query(start_date, end_date)
+		.where(LeaveApplication.employee == employee)
+		.run(as_dict=True)
+	)
+
+	return get_leave_date_mapper(leaves)
+
 
+def get_lwp_or_ppl_for_employees(employees: list[str], start_date, end_date) -> dict:
+	"""Returns leave date mappers for multiple employees keyed by employee"""
+	LeaveApplication = frappe.qb.DocType("Leave Application")
 	leaves = (
+		get_lwp_or_ppl_query(start_date, end_date)
+		.select(LeaveApplication.employee)
+		.where(LeaveApplication.employee.isin(employees))
+		.run(as_dict=True)
+	)
+
+	leaves_by_employee = {}
+	for leave in leaves:
+		leaves_by_employee.setdefault(leave.employee, []).append(leave)
+
+	return {employee: get_leave_date_mapper(leaves_by_employee.get(employee, [])) for employee in employees}
+
+
+def get_lwp_or_ppl_query(start_date, end_date):
+	LeaveApplication = frappe.qb.DocType("Leave Application")
+	LeaveType = frappe.qb.DocType("Leave Type")
+
+	return (
 		frappe.qb.from_(LeaveApplication)
 		.inner_join(LeaveType)
 		.on(LeaveType.name == LeaveApplication.leave_type)
@@ -2265,12 +2387,13 @@ def get_lwp_or_ppl_for_date_range(employee, start_date, end_date):
 			((LeaveType.is_lwp == 1) | (LeaveType.is_ppl == 1))
 			& (LeaveApplication.docstatus == 1)
 			& (LeaveApplication.status == "Approved")
-			& (LeaveApplication.employee == employee)
 			& ((LeaveApplication.salary_slip.isnull()) | (LeaveApplication.salary_slip == ""))
 			& ((LeaveApplication.from_date <= end_date) & (LeaveApplication.to_date >= start_date))
 		)
-	).run(as_dict=True)
+	)
+
 
+def get_leave_date_mapper(leaves: list[dict]) -> frappe._dict:
 	leave_date_mapper = frappe._dict()
 	for leave in leaves:
 		if leave.from_date == leave.to_date:
@@ -2329,7 +2452,7 @@ def on_doctype_update():
 	frappe.db.add_index("Salary Slip", ["employee", "start_date", "end_date"])
 
 
-def _safe_eval(code: str, eval_globals: dict | None = None, eval_locals: dict | None = None):
+def _safe_eval(code: str | CodeType, eval_globals: dict | None = None, eval_locals: dict | None = None):
 	"""Old version of safe_eval from framework.
 
 	Note: current frappe.safe_eval transforms code so if you have nested
@@ -2337,11 +2460,12 @@ def _safe_eval(code: str, eval_globals: dict | None = None, eval_locals: dict |
 	There's no workaround for this and people need large formulas in some
 	countries so this is alternate implementation for that.
 
+	`code` can also be a code object returned by `_compile`, which skips validation and parsing.
+
 	WARNING: DO NOT use this function anywhere else outside of this file.
 	"""
-	code = unicodedata.normalize("NFKC", code)
-
-	_check_attributes(code)
+	if isinstance(code, str):
+		code = _compile(code)
 
 	whitelisted_globals = {"int": int, "float": float, "long": int, "round": round}
 	if not eval_globals:
@@ -2352,6 +2476,40 @@ def _safe_eval(code: str, eval_globals: dict | None = None, eval_locals: dict |
 	return eval(code, eval_globals, eval_locals)  # nosemgrep
 
 
+def _compile(code: str) -> CodeType:
+	"""Validates a condition or formula and compiles it for evaluation with `_safe_eval`"""
+	code = unicodedata.normalize("NFKC", code)
+
+	_check_attributes(code)
+
+	return compile(code, "<salary structure formula>", "eval")
+
+
+def get_compiled_formula(salary_structure: str, modified: str, code: str) -> CodeType:
+	"""Returns the compiled code object for a condition or formula of a salary structure.
+
+	Code objects are cached in the worker process per structure version, so a formula is
+	validated and parsed once per payroll run instead of once per salary slip.
+	"""
+	version, compiled = _compiled_formulas.get(salary_structure, (None, None))
+	if version != modified:
+		# structure was updated since it was cached, drop the stale formulas
+		version, compiled = modified, {}
+		_compiled_formulas[salary_structure] = (version, compiled)
+
+	if code not in compiled:
+		compiled[code] = _compile(code)
+
+	return compiled[code]
+
+
+def clear_compiled_formulas(salary_structure: str | None = None) -> None:
+	if salary_structure:
+		_compiled_formulas.pop(salary_structure, None)
+	else:
+		_compiled_formulas.clear()
+
+
 def _check_attributes(code: str) -> None:
 	import ast
 
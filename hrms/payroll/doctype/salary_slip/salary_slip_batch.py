@@ -0,0 +1,424 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import frappe
+from frappe.query_builder import Order
+from frappe.query_builder.functions import IfNull, Sum
+from frappe.utils import getdate
+
+from hrms.payroll.doctype.additional_salary.additional_salary import get_additional_salaries_for_employees
+from hrms.payroll.doctype.payroll_period.payroll_period import get_payroll_period
+from hrms.payroll.doctype.payroll_running_total.payroll_running_total import (
+	covers_slips_before,
+	get_running_totals,
+	get_salary_detail_total,
+	get_year_to_date_period,
+)
+from hrms.utils.holiday_list import get_holiday_dates_between
+
+
+class SalarySlipBatch:
+	"""Inputs for salary slips of many employees over the same period, fetched with set-based queries.
+
+	A batch is attached to a Salary Slip via `_batch`. Each lookup returns None when the batch does not
+	cover the requested employee or date range, in which case the slip runs its own query.
+	"""
+
+	def __init__(self, employees: list[str], start_date, end_date, company: str):
+		self.employees = list(employees)
+		# membership checks run once per slip, keep them constant time
+		self.employee_set = set(self.employees)
+		self.start_date = getdate(start_date)
+		self.end_date = getdate(end_date)
+		self.company = company
+
+		self.payroll_period = get_payroll_period(self.start_date, self.end_date, company)
+		self.holiday_list_by_employee = self.fetch_holiday_lists()
+		self.holidays_by_list = self.fetch_holidays()
+		self.attendance_by_employee = self.fetch_attendance()
+		self.leaves_by_employee = self.fetch_leaves()
+		self.additional_salaries = get_additional_salaries_for_employees(
+			self.employees, self.start_date, self.end_date
+		)
+		self.assignments_by_employee = self.fetch_salary_structure_assignments()
+		self.salary_structures = self.fetch_salary_structures()
+		self.income_tax_slabs = self.fetch_income_tax_slabs()
+		self.tax_exemptions = self.fetch_tax_exemptions()
+		self.other_incomes = self.fetch_other_incomes()
+		self.year_to_date_period = get_year_to_date_period(self.start_date, self.end_date, company)
+		self.running_totals = get_running_totals(self.employees, *self.year_to_date_period)
+		self.previous_salary_details = self.fetch_previous_salary_details()
+
+	def covers(self, employee: str, start_date, end_date) -> bool:
+		return (
+			employee in self.holiday_list_by_employee
+			and self.start_date <= getdate(start_date)
+			and getdate(end_date) <= self.end_date
+		)
+
+	def fetch_holiday_lists(self) -> dict:
+		Employee = frappe.qb.DocType("Employee")
+		Company = frappe.qb.DocType("Company")
+
+		employees = (
+			frappe.qb.from_(Employee)
+			.join(Company)
+			.on(Company.name == Employee.company)
+			.select(Employee.name, Employee.holiday_list, Company.default_holiday_list)
+			.where(Employee.name.isin(self.employees))
+		).run(as_dict=True)
+
+		# employees without any holiday list are left out so that the slip raises the usual error
+		return {
+			d.name: d.holiday_list or d.default_holiday_list
+			for d in employees
+			if d.holiday_list or d.default_holiday_list
+		}
+
+	def fetch_holidays(self) -> dict:
+		holiday_lists = set(self.holiday_list_by_employee.values())
+		if not holiday_lists:
+			return {}
+
+		return {
+			holiday_list: get_holiday_dates_between(holiday_list, self.start_date, self.end_date)
+			for holiday_list in holiday_lists
+		}
+
+	def fetch_attendance(self) -> dict:
+		Attendance = frappe.qb.DocType("Attendance")
+		attendance = (
+			frappe.qb.from_(Attendance)
+			.select(
+				Attendance.employee,
+				Attendance.attendance_date,
+				Attendance.status,
+				Attendance.leave_type,
+				Attendance.half_day_status,
+			)
+			.where(
+				(Attendance.employee.isin(self.employees))
+				& (Attendance.docstatus == 1)
+				& (Attendance.attendance_date.between(self.start_date, self.end_date))
+			)
+		).run()
+
+		# plain tuples keep the memory footprint low for large batches
+		attendance_by_employee = {}
+		for employee, *details in attendance:
+			attendance_by_employee.setdefault(employee, []).append(tuple(details))
+
+		return attendance_by_employee
+
+	def fetch_leaves(self) -> dict:
+		from hrms.payroll.doctype.salary_slip.salary_slip import get_lwp_or_ppl_for_employees
+
+		return get_lwp_or_ppl_for_employees(self.employees, self.start_date, self.end_date)
+
+	def fetch_salary_structure_assignments(self) -> dict:
+		SalaryStructureAssignment = frappe.qb.DocType("Salary Structure Assignment")
+		assignments = (
+			frappe.qb.from_(SalaryStructureAssignment)
+			.select("*")
+			.where(
+				(SalaryStructureAssignment.employee.isin(self.employees))
+				& (SalaryStructureAssignment.docstatus == 1)
+				& (SalaryStructureAssignment.from_date <= self.end_date)
+			)
+			.orderby(SalaryStructureAssignment.from_date, order=Order.desc)
+		).run(as_dict=True)
+
+		assignments_by_employee = {}
+		for assignment in assignments:
+			assignments_by_employee.setdefault(assignment.employee, []).append(assignment)
+
+		return assignments_by_employee
+
+	def fetch_salary_structures(self) -> dict:
+		structures = {
+			assignment.salary_structure
+			for assignments in self.assignments_by_employee.values()
+			for assignment in assignments
+		}
+		if not structures:
+			return {}
+
+		return {
+			d.name: d
+			for d in frappe.get_all(
+				"Salary Structure",
+				filters={"name": ("in", list(structures))},
+				fields=["name", "docstatus", "is_active", "payroll_frequency"],
+			)
+		}
+
+	def fetch_income_tax_slabs(self) -> dict:
+		"""Income Tax Slabs of the assignments along with their slabs and other taxes and charges"""
+		names = {
+			assignment.income_tax_slab
+			for assignments in self.assignments_by_employee.values()
+			for assignment in assignments
+			if assignment.income_tax_slab
+		}
+		if not names:
+			return {}
+
+		IncomeTaxSlab = frappe.qb.DocType("Income Tax Slab")
+		tax_slabs = {
+			d.name: d
+			for d in (
+				frappe.qb.from_(IncomeTaxSlab).select("*").where(IncomeTaxSlab.name.isin(list(names)))
+			).run(as_dict=True)
+		}
+		for tax_slab in tax_slabs.values():
+			tax_slab.update({"slabs": [], "other_taxes_and_charges": []})
+
+		for doctype, parentfield in (
+			("Taxable Salary Slab", "slabs"),
+			("Income Tax Slab Other Charges", "other_taxes_and_charges"),
+		):
+			Child = frappe.qb.DocType(doctype)
+			rows = (
+				frappe.qb.from_(Child)
+				.select("*")
+				.where((Child.parent.isin(list(tax_slabs))) & (Child.parenttype == "Income Tax Slab"))
+				.orderby(Child.idx)
+			).run(as_dict=True)
+			for row in rows:
+				tax_slabs[row.parent][parentfield].append(row)
+
+		return tax_slabs
+
+	def fetch_tax_exemptions(self) -> dict:
+		"""Exemption amounts of submitted declarations and proof submissions for the payroll period"""
+		if not self.payroll_period:
+			return {}
+
+		return {
+			doctype: dict(
+				frappe.get_all(
+					doctype,
+					filters={
+						"employee": ("in", self.employees),
+						"payroll_period": self.payroll_period.name,
+						"docstatus": 1,
+					},
+					fields=["employee", fieldname],
+					as_list=True,
+				)
+			)
+			for doctype, fieldname in (
+				("Employee Tax Exemption Declaration", "total_exemption_amount"),
+				("Employee Tax Exemption Proof Submission", "exemption_amount"),
+			)
+		}
+
+	def fetch_other_incomes(self) -> dict:
+		if not self.payroll_period:
+			return {}
+
+		EmployeeOtherIncome = frappe.qb.DocType("Employee Other Income")
+		return dict(
+			(
+				frappe.qb.from_(EmployeeOtherIncome)
+				.select(EmployeeOtherIncome.employee, Sum(EmployeeOtherIncome.amount))
+				.where(
+					(EmployeeOtherIncome.employee.isin(self.employees))
+					& (EmployeeOtherIncome.payroll_period == self.payroll_period.name)
+					& (EmployeeOtherIncome.company == self.company)
+					& (EmployeeOtherIncome.docstatus == 1)
+				)
+				.groupby(EmployeeOtherIncome.employee)
+			).run()
+		)
+
+	def fetch_previous_salary_details(self) -> dict:
+		"""Salary Detail totals of submitted slips from the start of the payroll period till this batch.
+		Read from the running totals, unless the employee has a submitted slip from this batch's dates onwards"""
+		if not self.payroll_period:
+			return {}
+
+		details_by_employee = {
+			employee: totals.components
+			for employee, totals in self.running_totals.items()
+			if covers_slips_before(totals, self.start_date)
+		}
+		employees = [employee for employee in self.employees if employee not in details_by_employee]
+		if not employees:
+			return details_by_employee
+
+		SalarySlip = frappe.qb.DocType("Salary Slip")
+		SalaryDetail = frappe.qb.DocType("Salary Detail")
+		details = (
+			frappe.qb.from_(SalarySlip)
+			.join(SalaryDetail)
+			.on(SalaryDetail.parent == SalarySlip.name)
+			.select(
+				SalarySlip.employee,
+				SalaryDetail.parentfield,
+				SalaryDetail.salary_component,
+				SalaryDetail.is_tax_applicable,
+				SalaryDetail.is_flexible_benefit,
+				SalaryDetail.exempted_from_income_tax,
+				SalaryDetail.variable_based_on_taxable_salary,
+				Sum(IfNull(SalaryDetail.amount, 0)).as_("amount"),
+				Sum(IfNull(SalaryDetail.additional_amount, 0)).as_("additional_amount"),
+			)
+			.where(
+				(SalarySlip.employee.isin(employees))
+				& (SalarySlip.docstatus == 1)
+				& (SalarySlip.start_date.between(self.payroll_period.start_date, self.start_date))
+				& (SalarySlip.end_date.between(self.payroll_period.start_date, self.start_date))
+			)
+			.groupby(
+				SalarySlip.employee,
+				SalaryDetail.parentfield,
+				SalaryDetail.salary_component,
+				SalaryDetail.is_tax_applicable,
+				SalaryDetail.is_flexible_benefit,
+				SalaryDetail.exempted_from_income_tax,
+				SalaryDetail.variable_based_on_taxable_salary,
+			)
+		).run(as_dict=True)
+
+		details_by_employee.update({employee: [] for employee in employees})
+		for d in details:
+			details_by_employee[d.employee].append(d)
+
+		return details_by_employee
+
+	def get_holidays(self, employee: str, start_date, end_date) -> list | None:
+		if not self.covers(employee, start_date, end_date):
+			return None
+
+		start_date, end_date = getdate(start_date), getdate(end_date)
+		holiday_list = self.holiday_list_by_employee[employee]
+		return [d for d in self.holidays_by_list.get(holiday_list, []) if start_date <= d <= end_date]
+
+	def get_attendance(self, employee: str, start_date, end_date) -> list | None:
+		if not self.covers(employee, start_date, end_date):
+			return None
+
+		start_date, end_date = getdate(start_date), getdate(end_date)
+		return [
+			frappe._dict(
+				attendance_date=attendance_date,
+				status=status,
+				leave_type=leave_type,
+				half_day_status=half_day_status,
+			)
+			for attendance_date, status, leave_type, half_day_status in self.attendance_by_employee.get(
+				employee, []
+			)
+			if start_date <= attendance_date <= end_date
+		]
+
+	def get_leaves(self, employee: str, start_date, end_date) -> dict | None:
+		if getdate(start_date) != self.start_date or getdate(end_date) != self.end_date:
+			return None
+
+		return self.leaves_by_employee.get(employee)
+
+	def get_additional_salaries(
+		self, employee: str, start_date, end_date, component_type: str
+	) -> list | None:
+		if getdate(start_date) != self.start_date or getdate(end_date) != self.end_date:
+			return None
+
+		if employee not in self.employee_set:
+			return None
+
+		return self.additional_salaries.get((employee, component_type), [])
+
+	def get_salary_structure_assignment(self, employee: str, salary_structure: str, from_date) -> dict | None:
+		if employee not in self.employee_set or getdate(from_date) > self.end_date:
+			return None
+
+		from_date = getdate(from_date)
+		return next(
+			(
+				assignment
+				for assignment in self.assignments_by_employee.get(employee, [])
+				if assignment.salary_structure == salary_structure and assignment.from_date <= from_date
+			),
+			frappe._dict(),
+		)
+
+	def get_active_salary_structure(
+		self, employee: str, end_date, payroll_frequency: str | None
+	) -> str | None:
+		"""Returns the structure of the latest active assignment, an empty string if there is none,
+		or None if the batch cannot answer for this employee"""
+		if employee not in self.employee_set or getdate(end_date) != self.end_date:
+			return None
+
+		for assignment in self.assignments_by_employee.get(employee, []):
+			structure = self.salary_structures.get(assignment.salary_structure)
+			if not structure or structure.docstatus != 1 or structure.is_active != "Yes":
+				continue
+			if payroll_frequency and structure.payroll_frequency != payroll_frequency:
+				continue
+
+			return assignment.salary_structure
+
+		return ""
+
+	def get_income_tax_slab(self, income_tax_slab: str) -> dict | None:
+		return self.income_tax_slabs.get(income_tax_slab)
+
+	def covers_payroll_period(self, employee: str, payroll_period: str) -> bool:
+		return bool(
+			employee in self.employee_set
+			and self.payroll_period
+			and self.payroll_period.name == payroll_period
+		)
+
+	def get_tax_exemption(self, employee: str, payroll_period: str, doctype: str) -> float | None:
+		if not self.covers_payroll_period(employee, payroll_period):
+			return None
+
+		return self.tax_exemptions[doctype].get(employee, 0)
+
+	def get_other_income(self, employee: str, payroll_period: str, company: str) -> float | None:
+		if company != self.company or not self.covers_payroll_period(employee, payroll_period):
+			return None
+
+		return self.other_incomes.get(employee) or 0.0
+
+	def get_salary_slip_details(
+		self,
+		employee: str,
+		start_date,
+		end_date,
+		parentfield: str,
+		salary_component: str | None = None,
+		is_tax_applicable: int | None = None,
+		is_flexible_benefit: int = 0,
+		exempted_from_income_tax: int = 0,
+		variable_based_on_taxable_salary: int = 0,
+		field_to_select: str = "amount",
+	) -> float | None:
+		if (
+			not self.payroll_period
+			or employee not in self.previous_salary_details
+			or getdate(start_date) != getdate(self.payroll_period.start_date)
+			or getdate(end_date) != self.start_date
+		):
+			return None
+
+		return get_salary_detail_total(
+			self.previous_salary_details[employee],
+			parentfield,
+			salary_component=salary_component,
+			is_tax_applicable=is_tax_applicable,
+			is_flexible_benefit=is_flexible_benefit,
+			exempted_from_income_tax=exempted_from_income_tax,
+			variable_based_on_taxable_salary=variable_based_on_taxable_salary,
+			field_to_select=field_to_select,
+		)
+
+	def get_running_totals(self, employee: str, period_start_date) -> dict | None:
+		if employee not in self.running_totals or getdate(period_start_date) != self.year_to_date_period[0]:
+			return None
+
+		return self.running_totals[employee]
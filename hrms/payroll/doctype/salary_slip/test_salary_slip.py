@@ -36,8 +36,8 @@ from hrms.payroll.doctype.employee_tax_exemption_declaration.test_employee_tax_e
 	create_payroll_period,
 )
 from hrms.payroll.doctype.payroll_entry.payroll_entry import get_month_details
+from hrms.payroll.doctype.payroll_running_total.payroll_running_total import clear_running_totals
 from hrms.payroll.doctype.salary_slip.salary_slip import (
-	HOLIDAYS_BETWEEN_DATES,
 	LEAVE_TYPE_MAP,
 	SALARY_COMPONENT_VALUES,
 	TAX_COMPONENTS_BY_COMPANY,
@@ -47,6 +47,7 @@ from hrms.payroll.doctype.salary_slip.salary_slip import (
 )
 from hrms.payroll.doctype.salary_structure.salary_structure import make_salary_slip
 from hrms.tests.test_utils import get_email_by_subject, get_first_sunday
+from hrms.utils.holiday_list import HOLIDAY_CALENDAR, get_holiday_calendar
 
 
 class TestSalarySlip(IntegrationTestCase):
@@ -179,6 +180,53 @@ class TestSalarySlip(IntegrationTestCase):
 
 		self.assertEqual(rounded(ss.gross_pay), rounded(gross_pay))
 
+	@change_settings("Payroll Settings", {"payroll_based_on": "Attendance"})
+	def test_salary_slip_with_prefetched_batch(self):
+		from hrms.payroll.doctype.salary_slip.salary_slip_batch import SalarySlipBatch
+
+		emp_id = make_employee("test_salary_slip_batch@salary.com")
+		frappe.db.set_value("Employee", emp_id, {"relieving_date": None, "status": "Active"})
+
+		first_sunday = get_first_sunday()
+		mark_attendance(emp_id, add_days(first_sunday, 1), "Absent", ignore_validate=True)
+		mark_attendance(
+			emp_id,
+			add_days(first_sunday, 2),
+			"Half Day",
+			leave_type="Leave Without Pay",
+			ignore_validate=True,
+			half_day_status="Absent",
+		)
+
+		ss = make_employee_salary_slip(emp_id, "Monthly", "Test Salary Slip Batch")
+		fields = (
+			"total_working_days",
+			"payment_days",
+			"leave_without_pay",
+			"absent_days",
+			"gross_pay",
+			"net_pay",
+		)
+		expected = {field: ss.get(field) for field in fields}
+		frappe.delete_doc("Salary Slip", ss.name)
+
+		batch_ss = frappe.get_doc(
+			{
+				"doctype": "Salary Slip",
+				"employee": emp_id,
+				"company": ss.company,
+				"posting_date": ss.posting_date,
+				"payroll_frequency": "Monthly",
+				"start_date": ss.start_date,
+				"end_date": ss.end_date,
+			}
+		)
+		batch_ss._batch = SalarySlipBatch([emp_id], ss.start_date, ss.end_date, ss.company)
+		batch_ss.insert()
+
+		for field in fields:
+			self.assertEqual(batch_ss.get(field), expected[field], field)
+
 	@change_settings(
 		"Payroll Settings",
 		{
@@ -657,6 +705,37 @@ class TestSalarySlip(IntegrationTestCase):
 		self.assertEqual(ss.earnings[1].amount, 3000)
 		self.assertEqual(ss.gross_pay, 78000)
 
+	def test_holiday_calendar(self):
+		holiday_list = make_holiday_list(
+			"Test Holiday Calendar", from_date="2024-12-01", to_date="2025-01-31", weekly_off_days=["Sunday"]
+		)
+		doc = frappe.get_doc("Holiday List", holiday_list)
+		doc.append("holidays", {"holiday_date": "2025-01-01", "description": "New Year"})
+		doc.save()
+
+		calendar = get_holiday_calendar(holiday_list)
+		# 9 sundays and new year, across the year boundary
+		self.assertEqual(calendar.count("2024-12-01", "2025-01-31"), 10)
+		self.assertEqual(calendar.count("2024-12-01", "2025-01-31", skip_weekly_offs=True), 1)
+		self.assertEqual(calendar.count("2025-01-31", "2024-12-01"), 0)
+		self.assertEqual(
+			calendar.get_dates("2024-12-29", "2025-01-05"),
+			[getdate("2024-12-29"), getdate("2025-01-01"), getdate("2025-01-05")],
+		)
+		self.assertTrue(calendar.is_holiday("2025-01-01", skip_weekly_offs=True))
+		self.assertFalse(calendar.is_holiday("2025-01-05", skip_weekly_offs=True))
+		self.assertTrue(calendar.is_weekly_off("2025-01-05"))
+		self.assertFalse(calendar.is_holiday("2025-01-02"))
+
+		# only the edited list is rebuilt
+		frappe.cache().hset(HOLIDAY_CALENDAR, "Other Holiday List", {})
+		doc.append("holidays", {"holiday_date": "2025-01-02", "description": "Day after New Year"})
+		doc.save()
+
+		self.assertEqual(frappe.cache().hget(HOLIDAY_CALENDAR, "Other Holiday List"), {})
+		self.assertTrue(get_holiday_calendar(holiday_list).is_holiday("2025-01-02"))
+		self.assertEqual(get_holiday_calendar(holiday_list).count("2024-12-01", "2025-01-31"), 11)
+
 	@change_settings(
 		"Payroll Settings",
 		{
@@ -973,6 +1052,7 @@ class TestSalarySlip(IntegrationTestCase):
 
 		# clear salary slip for this employee
 		frappe.db.sql("DELETE FROM `tabSalary Slip` where employee_name = 'test_ytd@salary.com'")
+		clear_running_totals(applicant)
 
 		create_salary_slips_for_payroll_period(
 			applicant, salary_structure.name, payroll_period, deduct_random=False, num=6
@@ -1017,6 +1097,7 @@ class TestSalarySlip(IntegrationTestCase):
 
 		# clear salary slip for this employee
 		frappe.db.sql("DELETE FROM `tabSalary Slip` where employee_name = '%s'" % employee_name)
+		clear_running_totals(applicant)
 
 		create_salary_slips_for_payroll_period(
 			applicant, salary_structure.name, payroll_period, deduct_random=False, num=3
@@ -1062,6 +1143,7 @@ class TestSalarySlip(IntegrationTestCase):
 		]
 		for doc in delete_docs:
 			frappe.db.sql(f"DELETE FROM `tab{doc}` WHERE employee='{employee}'")
+		clear_running_totals(employee)
 
 		from hrms.payroll.doctype.salary_structure.test_salary_structure import make_salary_structure
 
@@ -1089,6 +1171,7 @@ class TestSalarySlip(IntegrationTestCase):
 			print("\nSalary Slip - Annual tax calculation failed\n")
 			raise
 		frappe.db.sql("""delete from `tabSalary Slip` where employee=%s""", (employee))
+		clear_running_totals(employee)
 
 		# create exemption declaration so the tax amount varies
 		create_exemption_declaration(employee, payroll_period.name)
@@ -1114,6 +1197,7 @@ class TestSalarySlip(IntegrationTestCase):
 		data["benefit-2"] = create_benefit_claim(employee, payroll_period, 35000, "Leave Travel Allowance")
 
 		frappe.db.sql("""delete from `tabSalary Slip` where employee=%s""", (employee))
+		clear_running_totals(employee)
 		data["deducted_dates"] = create_salary_slips_for_payroll_period(
 			employee, salary_structure.name, payroll_period
 		)
@@ -1128,6 +1212,7 @@ class TestSalarySlip(IntegrationTestCase):
 
 		# create additional salary of 150000
 		frappe.db.sql("""delete from `tabSalary Slip` where employee=%s""", (employee))
+		clear_running_totals(employee)
 		data["additional-1"] = create_additional_salary(employee, payroll_period, 150000)
 		data["deducted_dates"] = create_salary_slips_for_payroll_period(
 			employee, salary_structure.name, payroll_period
@@ -1199,6 +1284,7 @@ class TestSalarySlip(IntegrationTestCase):
 		]
 		for doc in delete_docs:
 			frappe.db.sql(f"DELETE FROM `tab{doc}` WHERE employee='{employee}'")
+		clear_running_totals(employee)
 
 		from hrms.payroll.doctype.salary_structure.test_salary_structure import make_salary_structure
 
@@ -1222,6 +1308,7 @@ class TestSalarySlip(IntegrationTestCase):
 		self.assertEqual(tax_paid, annual_tax)
 
 		frappe.db.sql("""delete from `tabSalary Slip` where employee=%s""", (employee))
+		clear_running_totals(employee)
 
 		# ------------------------------------
 		# Recurring additional salary
@@ -1230,6 +1317,7 @@ class TestSalarySlip(IntegrationTestCase):
 		create_recurring_additional_salary(employee, "Performance Bonus", 20000, start_date, end_date)
 
 		frappe.db.sql("""delete from `tabSalary Slip` where employee=%s""", (employee))
+		clear_running_totals(employee)
 
 		create_salary_slips_for_payroll_period(
 			employee, salary_structure.name, payroll_period, deduct_random=False, num=4
@@ -1467,6 +1555,36 @@ class TestSalarySlip(IntegrationTestCase):
 		self.assertEqual(flt(salary_slip.future_income_tax_deductions, 2), 125439.65)
 		self.assertEqual(flt(salary_slip.total_income_tax, 2), 136843.25)
 
+		# taxes are the same with the tax slab, exemptions and other income prefetched for a batch
+		from hrms.payroll.doctype.salary_slip.salary_slip_batch import SalarySlipBatch
+
+		batch_slip = frappe.get_doc(
+			{
+				"doctype": "Salary Slip",
+				"employee": emp,
+				"company": "_Test Company",
+				"posting_date": salary_slip.posting_date,
+				"payroll_frequency": "Monthly",
+				"start_date": salary_slip.start_date,
+				"end_date": salary_slip.end_date,
+			}
+		)
+		batch_slip._batch = SalarySlipBatch(
+			[emp], salary_slip.start_date, salary_slip.end_date, "_Test Company"
+		)
+		self.assertEqual(len(batch_slip._batch.income_tax_slabs), 1)
+		batch_slip.insert()
+
+		for field in (
+			"income_from_other_sources",
+			"standard_tax_exemption_amount",
+			"tax_exemption_declaration",
+			"annual_taxable_amount",
+			"current_month_income_tax",
+			"total_income_tax",
+		):
+			self.assertEqual(flt(batch_slip.get(field), 2), flt(salary_slip.get(field), 2), field)
+
 	def test_consistent_future_earnings_irrespective_of_payment_days(self):
 		"""
 		For CTC calculation, verifies that future non taxable earnings remain
@@ -1804,6 +1922,24 @@ class TestSalarySlipSafeEval(IntegrationTestCase):
 		self.assertTrue(_safe_eval("'x' != 'Information Techonology'"))
 		self.assertRaises(SyntaxError, _safe_eval, "'blah'.format(1)")
 
+	def test_compiled_formula_cache(self):
+		from hrms.payroll.doctype.salary_slip.salary_slip import (
+			clear_compiled_formulas,
+			get_compiled_formula,
+		)
+
+		clear_compiled_formulas()
+		compiled = get_compiled_formula("_Test Structure", "v1", "base * 0.5")
+		self.assertIs(get_compiled_formula("_Test Structure", "v1", "base * 0.5"), compiled)
+		self.assertEqual(_safe_eval(compiled, eval_locals={"base": 100}), 50)
+
+		# a new structure version recompiles
+		self.assertIsNot(get_compiled_formula("_Test Structure", "v2", "base * 0.5"), compiled)
+
+		# unsafe code is rejected while compiling
+		self.assertRaises(SyntaxError, get_compiled_formula, "_Test Structure", "v2", "(x := (40+2))")
+		clear_compiled_formulas()
+
 
 def make_income_tax_components():
 	tax_components = [
@@ -2777,7 +2913,7 @@ def create_ss_email_template():
 
 def clear_cache():
 	for key in [
-		HOLIDAYS_BETWEEN_DATES,
+		HOLIDAY_CALENDAR,
 		LEAVE_TYPE_MAP,
 		SALARY_COMPONENT_VALUES,
 		TAX_COMPONENTS_BY_COMPANY,
@@ -32,9 +32,19 @@ class SalaryStructure(Document):
 
 	def on_update(self):
 		self.reset_condition_and_formula_fields()
+		self.clear_compiled_formulas()
 
 	def on_update_after_submit(self):
 		self.reset_condition_and_formula_fields()
+		self.clear_compiled_formulas()
+
+	def on_cancel(self):
+		self.clear_compiled_formulas()
+
+	def clear_compiled_formulas(self):
+		from hrms.payroll.doctype.salary_slip.salary_slip import clear_compiled_formulas
+
+		clear_compiled_formulas(self.name)
 
 	def validate_formula_setup(self):
 		for table in ["earnings", "deductions"]:
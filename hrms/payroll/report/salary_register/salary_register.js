@@ -80,4 +80,40 @@ frappe.query_reports["Salary Register"] = {
 			width: "100px",
 		},
 	],
+	onload: function (report) {
+		report.page.add_inner_button(__("Export in Background"), function () {
+			frappe.prompt(
+				{
+					fieldname: "file_format",
+					label: __("File Format"),
+					fieldtype: "Select",
+					options: ["CSV", "Excel"],
+					default: "CSV",
+					reqd: 1,
+				},
+				(values) => {
+					frappe.call({
+						method: "hrms.payroll.report.salary_register.salary_register.export_salary_register",
+						args: {
+							filters: report.get_filter_values(),
+							file_format: values.file_format,
+						},
+					});
+				},
+				__("Export Salary Register"),
+				__("Export"),
+			);
+		});
+
+		frappe.realtime.off("salary_register_export");
+		frappe.realtime.on("salary_register_export", (data) => {
+			frappe.msgprint({
+				title: __("Salary Register Exported"),
+				message: __("The Salary Register is ready to {0}.", [
+					`<a href="${data.file_url}" target="_blank">${__("download")}</a>`,
+				]),
+				indicator: "green",
+			});
+		});
+	},
 };
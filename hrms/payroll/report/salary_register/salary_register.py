@@ -1,94 +1,116 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
+import csv
+import hashlib
+import json
 
 import frappe
 from frappe import _
-from frappe.utils import flt
+from frappe.query_builder import Case, Criterion
+from frappe.query_builder.functions import Sum
+from frappe.utils import add_days, flt, now_datetime
+from frappe.utils.background_jobs import is_job_enqueued
 
 import erpnext
 
 salary_slip = frappe.qb.DocType("Salary Slip")
 salary_detail = frappe.qb.DocType("Salary Detail")
 salary_component = frappe.qb.DocType("Salary Component")
+employee = frappe.qb.DocType("Employee")
+
+# salary slips are fetched and pivoted in pages of this size, so memory stays bounded for long ranges
+SALARY_SLIP_PAGE_SIZE = 1000
+# exported registers are private files of the requesting user, deleted after a day
+EXPORT_FILE_PREFIX = "salary_register_export_"
 
 
 def execute(filters=None):
 	if not filters:
 		filters = {}
 
-	currency = None
-	if filters.get("currency"):
-		currency = filters.get("currency")
 	company_currency = erpnext.get_company_currency(filters.get("company"))
+	earning_types, ded_types = get_earning_and_deduction_types(filters, company_currency)
+	columns = get_columns(earning_types, ded_types)
 
-	salary_slips = get_salary_slips(filters, company_currency)
-	if not salary_slips:
+	data = list(get_data(filters, company_currency, earning_types, ded_types, columns))
+	if not data:
 		return [], []
 
-	earning_types, ded_types = get_earning_and_deduction_types(salary_slips)
-	columns = get_columns(earning_types, ded_types)
-
-	ss_earning_map = get_salary_slip_details(salary_slips, currency, company_currency, "earnings")
-	ss_ded_map = get_salary_slip_details(salary_slips, currency, company_currency, "deductions")
-
-	doj_map = get_employee_doj_map()
-
-	data = []
-	for ss in salary_slips:
-		row = {
-			"salary_slip_id": ss.name,
-			"employee": ss.employee,
-			"employee_name": ss.employee_name,
-			"data_of_joining": doj_map.get(ss.employee),
-			"branch": ss.branch,
-			"department": ss.department,
-			"designation": ss.designation,
-			"company": ss.company,
-			"start_date": ss.start_date,
-			"end_date": ss.end_date,
-			"leave_without_pay": ss.leave_without_pay,
-			"absent_days": ss.absent_days,
-			"payment_days": ss.payment_days,
-			"currency": currency or company_currency,
-			"total_loan_repayment": ss.total_loan_repayment,
-		}
+	return columns, data
 
-		update_column_width(ss, columns)
 
-		for e in earning_types:
-			row.update({frappe.scrub(e): ss_earning_map.get(ss.name, {}).get(e)})
+def get_data(filters, company_currency, earning_types, ded_types, columns=None):
+	"""Yields report rows page by page with the component amounts pivoted per salary slip"""
+	currency = filters.get("currency")
+	components = [("earnings", e) for e in earning_types] + [("deductions", d) for d in ded_types]
+
+	for salary_slips in get_salary_slip_pages(filters, company_currency):
+		component_amounts = get_salary_slip_details(salary_slips, components)
+
+		for ss in salary_slips:
+			row = {
+				"salary_slip_id": ss.name,
+				"employee": ss.employee,
+				"employee_name": ss.employee_name,
+				"data_of_joining": ss.date_of_joining,
+				"branch": ss.branch,
+				"department": ss.department,
+				"designation": ss.designation,
+				"company": ss.company,
+				"start_date": ss.start_date,
+				"end_date": ss.end_date,
+				"leave_without_pay": ss.leave_without_pay,
+				"absent_days": ss.absent_days,
+				"payment_days": ss.payment_days,
+				"currency": currency or company_currency,
+				"total_loan_repayment": ss.total_loan_repayment,
+			}
 
-		for d in ded_types:
-			row.update({frappe.scrub(d): ss_ded_map.get(ss.name, {}).get(d)})
+			if columns:
+				update_column_width(ss, columns)
 
-		if currency == company_currency:
-			row.update(
-				{
-					"gross_pay": flt(ss.gross_pay) * flt(ss.exchange_rate),
-					"total_deduction": flt(ss.total_deduction) * flt(ss.exchange_rate),
-					"net_pay": flt(ss.net_pay) * flt(ss.exchange_rate),
-				}
-			)
+			amounts = component_amounts.get(ss.name, {})
+			for idx, (_parentfield, component) in enumerate(components):
+				amount = amounts.get(f"component_{idx}")
+				if amount is not None and currency == company_currency:
+					amount = flt(amount) * flt(ss.exchange_rate if ss.exchange_rate else 1)
+				row[frappe.scrub(component)] = amount
 
-		else:
-			row.update(
-				{"gross_pay": ss.gross_pay, "total_deduction": ss.total_deduction, "net_pay": ss.net_pay}
-			)
+			if currency == company_currency:
+				row.update(
+					{
+						"gross_pay": flt(ss.gross_pay) * flt(ss.exchange_rate),
+						"total_deduction": flt(ss.total_deduction) * flt(ss.exchange_rate),
+						"net_pay": flt(ss.net_pay) * flt(ss.exchange_rate),
+					}
+				)
 
-		data.append(row)
+			else:
+				row.update(
+					{"gross_pay": ss.gross_pay, "total_deduction": ss.total_deduction, "net_pay": ss.net_pay}
+				)
 
-	return columns, data
+			yield row
 
 
-def get_earning_and_deduction_types(salary_slips):
-	salary_component_and_type = {_("Earning"): [], _("Deduction"): []}
+def get_earning_and_deduction_types(filters, company_currency):
+	components = (
+		frappe.qb.from_(salary_slip)
+		.join(salary_detail)
+		.on(salary_detail.parent == salary_slip.name)
+		.join(salary_component)
+		.on(salary_component.name == salary_detail.salary_component)
+		.select(salary_detail.salary_component, salary_component.type)
+		.distinct()
+		.where((salary_detail.amount != 0) & get_conditions(filters, company_currency))
+	).run()
 
-	for salary_component in get_salary_components(salary_slips):
-		component_type = get_salary_component_type(salary_component)
-		salary_component_and_type[_(component_type)].append(salary_component)
+	salary_component_and_type = {"Earning": [], "Deduction": []}
+	for component, component_type in components:
+		salary_component_and_type[component_type].append(component)
 
-	return sorted(salary_component_and_type[_("Earning")]), sorted(salary_component_and_type[_("Deduction")])
+	return sorted(salary_component_and_type["Earning"]), sorted(salary_component_and_type["Deduction"])
 
 
 def update_column_width(ss, columns):
@@ -257,89 +279,222 @@ def get_columns(earning_types, ded_types):
 	return columns
 
 
-def get_salary_components(salary_slips):
-	return (
-		frappe.qb.from_(salary_detail)
-		.where((salary_detail.amount != 0) & (salary_detail.parent.isin([d.name for d in salary_slips])))
-		.select(salary_detail.salary_component)
-		.distinct()
-	).run(pluck=True)
-
-
-def get_salary_component_type(salary_component):
-	return frappe.db.get_value("Salary Component", salary_component, "type", cache=True)
-
-
-def get_salary_slips(filters, company_currency):
+def get_conditions(filters, company_currency):
 	doc_status = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
-
-	query = frappe.qb.from_(salary_slip).select(salary_slip.star)
+	conditions = []
 
 	if filters.get("docstatus"):
-		query = query.where(salary_slip.docstatus == doc_status[filters.get("docstatus")])
+		conditions.append(salary_slip.docstatus == doc_status[filters.get("docstatus")])
 
 	if filters.get("from_date"):
-		query = query.where(salary_slip.start_date >= filters.get("from_date"))
+		conditions.append(salary_slip.start_date >= filters.get("from_date"))
 
 	if filters.get("to_date"):
-		query = query.where(salary_slip.end_date <= filters.get("to_date"))
+		conditions.append(salary_slip.end_date <= filters.get("to_date"))
 
 	if filters.get("company"):
-		query = query.where(salary_slip.company == filters.get("company"))
+		conditions.append(salary_slip.company == filters.get("company"))
 
 	if filters.get("employee"):
-		query = query.where(salary_slip.employee == filters.get("employee"))
+		conditions.append(salary_slip.employee == filters.get("employee"))
 
 	if filters.get("currency") and filters.get("currency") != company_currency:
-		query = query.where(salary_slip.currency == filters.get("currency"))
+		conditions.append(salary_slip.currency == filters.get("currency"))
 
 	if filters.get("department"):
-		query = query.where(salary_slip.department == filters["department"])
+		conditions.append(salary_slip.department == filters["department"])
 
 	if filters.get("designation"):
-		query = query.where(salary_slip.designation == filters["designation"])
+		conditions.append(salary_slip.designation == filters["designation"])
 
 	if filters.get("branch"):
-		query = query.where(salary_slip.branch == filters["branch"])
+		conditions.append(salary_slip.branch == filters["branch"])
+
+	return Criterion.all(conditions)
 
-	salary_slips = query.run(as_dict=1)
 
-	return salary_slips or []
+def get_salary_slip_pages(filters, company_currency, page_size=SALARY_SLIP_PAGE_SIZE):
+	"""Yields salary slips in pages ordered by name, each page starting after the last slip of the previous one"""
+	query = (
+		frappe.qb.from_(salary_slip)
+		.left_join(employee)
+		.on(employee.name == salary_slip.employee)
+		.select(
+			salary_slip.name,
+			salary_slip.employee,
+			salary_slip.employee_name,
+			employee.date_of_joining,
+			salary_slip.branch,
+			salary_slip.department,
+			salary_slip.designation,
+			salary_slip.company,
+			salary_slip.start_date,
+			salary_slip.end_date,
+			salary_slip.leave_without_pay,
+			salary_slip.absent_days,
+			salary_slip.payment_days,
+			salary_slip.total_loan_repayment,
+			salary_slip.gross_pay,
+			salary_slip.total_deduction,
+			salary_slip.net_pay,
+			salary_slip.exchange_rate,
+		)
+		.where(get_conditions(filters, company_currency))
+		.orderby(salary_slip.name)
+		.limit(page_size)
+	)
 
+	last_salary_slip = None
+	while True:
+		page_query = query
+		if last_salary_slip:
+			page_query = query.where(salary_slip.name > last_salary_slip)
 
-def get_employee_doj_map():
-	employee = frappe.qb.DocType("Employee")
+		salary_slips = page_query.run(as_dict=True)
+		if not salary_slips:
+			break
 
-	result = (frappe.qb.from_(employee).select(employee.name, employee.date_of_joining)).run()
+		yield salary_slips
 
-	return frappe._dict(result)
+		if len(salary_slips) < page_size:
+			break
+		last_salary_slip = salary_slips[-1].name
 
 
-def get_salary_slip_details(salary_slips, currency, company_currency, component_type):
-	salary_slips = [ss.name for ss in salary_slips]
+def get_salary_slip_details(salary_slips, components):
+	"""Returns component amounts of the salary slips pivoted in the query as `component_{idx}` columns
+	for the index of the (parentfield, salary component) in `components`"""
+	if not components:
+		return {}
 
 	result = (
-		frappe.qb.from_(salary_slip)
-		.join(salary_detail)
-		.on(salary_slip.name == salary_detail.parent)
-		.where((salary_detail.parent.isin(salary_slips)) & (salary_detail.parentfield == component_type))
+		frappe.qb.from_(salary_detail)
 		.select(
 			salary_detail.parent,
-			salary_detail.salary_component,
-			salary_detail.amount,
-			salary_slip.exchange_rate,
+			*(
+				Sum(
+					Case().when(
+						(salary_detail.parentfield == parentfield)
+						& (salary_detail.salary_component == component),
+						salary_detail.amount,
+					)
+				).as_(f"component_{idx}")
+				for idx, (parentfield, component) in enumerate(components)
+			),
+		)
+		.where(
+			(salary_detail.parenttype == "Salary Slip")
+			& (salary_detail.parent.isin([ss.name for ss in salary_slips]))
+		)
+		.groupby(salary_detail.parent)
+	).run(as_dict=True)
+
+	return {d.parent: d for d in result}
+
+
+@frappe.whitelist()
+def export_salary_register(filters, file_format="CSV"):
+	"""Queues the export of the register, the file is written page by page and shared with the user when ready"""
+	if not frappe.get_doc("Report", "Salary Register").is_permitted():
+		frappe.throw(_("You are not permitted to export the Salary Register"), frappe.PermissionError)
+
+	if isinstance(filters, str):
+		filters = json.loads(filters)
+
+	if file_format not in ("CSV", "Excel"):
+		frappe.throw(_("File format must be CSV or Excel"))
+
+	job_id = get_export_job_id(filters, file_format, frappe.session.user)
+	if is_job_enqueued(job_id):
+		frappe.throw(_("Salary Register export with these filters is already in progress"))
+
+	frappe.enqueue(
+		write_salary_register,
+		queue="long",
+		timeout=3000,
+		job_id=job_id,
+		deduplicate=True,
+		filters=filters,
+		file_format=file_format,
+		user=frappe.session.user,
+	)
+	frappe.msgprint(
+		_("Salary Register export is queued. The file will be shared with you once it is ready"),
+		alert=True,
+		indicator="blue",
+	)
+
+
+def get_export_job_id(filters: dict, file_format: str, user: str) -> str:
+	"""Exports are deduplicated per user and filters, an export with other filters is queued alongside"""
+	key = hashlib.sha256(f"{user}|{file_format}|{frappe.as_json(filters)}".encode()).hexdigest()[:16]
+	return f"salary_register_export::{key}"
+
+
+def write_salary_register(filters, file_format, user):
+	filters = frappe._dict(filters)
+	company_currency = erpnext.get_company_currency(filters.get("company"))
+	earning_types, ded_types = get_earning_and_deduction_types(filters, company_currency)
+	columns = [column for column in get_columns(earning_types, ded_types) if not column.get("hidden")]
+	rows = (
+		[row.get(column["fieldname"]) for column in columns]
+		for row in get_data(filters, company_currency, earning_types, ded_types)
+	)
+
+	extension = "xlsx" if file_format == "Excel" else "csv"
+	file_name = f"{EXPORT_FILE_PREFIX}{now_datetime().strftime('%Y%m%d%H%M%S')}_{frappe.generate_hash(length=8)}.{extension}"
+	path = frappe.get_site_path("private", "files", file_name)
+	header = [column["label"] for column in columns]
+
+	if file_format == "Excel":
+		write_xlsx(path, header, rows)
+	else:
+		with open(path, "w", newline="", encoding="utf-8") as f:
+			writer = csv.writer(f)
+			writer.writerow(header)
+			writer.writerows(rows)
+
+	# a private file not attached to any document can only be read by its owner, the user running the job
+	file = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+		}
+	)
+	file.insert()
+
+	frappe.publish_realtime(
+		"salary_register_export", {"file_url": file.file_url}, user=user, after_commit=True
+	)
+
+
+def delete_expired_exports():
+	"""Called from hooks. Deletes exported registers older than a day"""
+	File = frappe.qb.DocType("File")
+	expired = (
+		frappe.qb.from_(File)
+		.select(File.name)
+		.where(
+			(File.file_name.like(f"{EXPORT_FILE_PREFIX}%"))
+			& (File.is_private == 1)
+			& (File.attached_to_doctype.isnull())
+			& (File.creation < add_days(now_datetime(), -1))
 		)
-	).run(as_dict=1)
+	).run(pluck=True)
+
+	for name in expired:
+		frappe.delete_doc("File", name, ignore_permissions=True)
 
-	ss_map = {}
 
-	for d in result:
-		ss_map.setdefault(d.parent, frappe._dict()).setdefault(d.salary_component, 0.0)
-		if currency == company_currency:
-			ss_map[d.parent][d.salary_component] += flt(d.amount) * flt(
-				d.exchange_rate if d.exchange_rate else 1
-			)
-		else:
-			ss_map[d.parent][d.salary_component] += flt(d.amount)
+def write_xlsx(path, header, rows):
+	from openpyxl import Workbook
 
-	return ss_map
+	# write-only workbooks flush rows to disk instead of keeping the sheet in memory
+	workbook = Workbook(write_only=True)
+	sheet = workbook.create_sheet(_("Salary Register"))
+	sheet.append(header)
+	for row in rows:
+		sheet.append(row)
+	workbook.save(path)
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import flt, getdate
+
+from erpnext.setup.doctype.employee.test_employee import make_employee
+
+from hrms.payroll.doctype.employee_tax_exemption_declaration.test_employee_tax_exemption_declaration import (
+	create_payroll_period,
+)
+from hrms.payroll.doctype.salary_slip.test_salary_slip import (
+	create_salary_slips_for_payroll_period,
+	create_tax_slab,
+)
+from hrms.payroll.doctype.salary_structure.test_salary_structure import make_salary_structure
+from hrms.payroll.report.salary_register.salary_register import (
+	execute,
+	export_salary_register,
+	get_salary_slip_pages,
+)
+
+
+class TestSalaryRegister(IntegrationTestCase):
+	def setUp(self):
+		self.employee = make_employee("test_salary_register@salary.com", company="_Test Company")
+		frappe.db.delete("Salary Slip", {"employee": self.employee})
+
+		self.payroll_period = create_payroll_period(name="_Test Payroll Period", company="_Test Company")
+		create_tax_slab(
+			self.payroll_period,
+			allow_tax_exemption=True,
+			currency="INR",
+			effective_date=getdate("2019-04-01"),
+			company="_Test Company",
+		)
+		salary_structure = make_salary_structure(
+			"Monthly Salary Structure Test for Salary Register",
+			"Monthly",
+			employee=self.employee,
+			company="_Test Company",
+			currency="INR",
+			payroll_period=self.payroll_period,
+		)
+		create_salary_slips_for_payroll_period(
+			self.employee, salary_structure.name, self.payroll_period, deduct_random=False, num=3
+		)
+		self.filters = frappe._dict(
+			company="_Test Company",
+			employee=self.employee,
+			from_date=self.payroll_period.start_date,
+			to_date=self.payroll_period.end_date,
+			docstatus="Submitted",
+			currency="INR",
+		)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_component_amounts_are_pivoted_per_salary_slip(self):
+		columns, data = execute(self.filters)
+		self.assertEqual(len(data), 3)
+
+		fieldnames = {column["fieldname"] for column in columns}
+		date_of_joining = frappe.db.get_value("Employee", self.employee, "date_of_joining")
+		for row in data:
+			slip = frappe.get_doc("Salary Slip", row["salary_slip_id"])
+			self.assertEqual(row["data_of_joining"], date_of_joining)
+			self.assertEqual(flt(row["net_pay"], 2), flt(slip.net_pay, 2))
+
+			for detail in slip.earnings + slip.deductions:
+				if not detail.amount:
+					continue
+				self.assertIn(frappe.scrub(detail.salary_component), fieldnames)
+				self.assertEqual(flt(row[frappe.scrub(detail.salary_component)], 2), flt(detail.amount, 2))
+
+	def test_salary_slips_are_paged_by_name(self):
+		pages = list(get_salary_slip_pages(self.filters, "INR", page_size=2))
+		self.assertEqual([len(page) for page in pages], [2, 1])
+
+		names = [slip.name for page in pages for slip in page]
+		self.assertEqual(names, sorted(names))
+		self.assertEqual(
+			names,
+			frappe.get_all(
+				"Salary Slip",
+				filters={"employee": self.employee, "docstatus": 1},
+				order_by="name",
+				pluck="name",
+			),
+		)
+
+	def test_exports_are_deduplicated_per_filters(self):
+		module = "hrms.payroll.report.salary_register.salary_register"
+		other_filters = self.filters.copy()
+		other_filters.employee = None
+
+		with (
+			patch(f"{module}.is_job_enqueued", return_value=False),
+			patch(f"{module}.frappe.enqueue") as enqueue,
+		):
+			export_salary_register(frappe.as_json(self.filters))
+			export_salary_register(frappe.as_json(self.filters))
+			export_salary_register(frappe.as_json(other_filters))
+			export_salary_register(frappe.as_json(self.filters), "Excel")
+
+		job_ids = [call.kwargs["job_id"] for call in enqueue.call_args_list]
+		self.assertEqual(job_ids[0], job_ids[1])
+		self.assertEqual(len(set(job_ids)), 3)
+
+		# an export with the same filters in progress is reported instead of being dropped silently
+		with patch(f"{module}.is_job_enqueued", return_value=True):
+			self.assertRaises(frappe.ValidationError, export_salary_register, frappe.as_json(self.filters))
@@ -1,4 +1,5 @@
 import frappe
+from frappe.utils import cint
 
 
 def sanitize_expression(string: str | None = None) -> str | None:
@@ -39,3 +40,8 @@ def get_payroll_settings_for_payment_days() -> dict:
 		],
 		as_dict=True,
 	)
+
+
+def get_payroll_processing_batch_size() -> int:
+	"""Returns the number of employees to be processed per background job in a payroll run"""
+	return cint(frappe.db.get_single_value("Payroll Settings", "payroll_processing_batch_size")) or 500
@@ -1,4 +1,105 @@
+from datetime import date
+
 import frappe
+from frappe.utils import getdate
+
+# redis hash of holiday calendars by holiday list
+HOLIDAY_CALENDAR = "holiday_calendar"
+
+
+class HolidayCalendar:
+	"""Holidays of a Holiday List as bitmaps per year, bit `n` being set if the `n`th day of the year
+	(0 for Jan 1) is a holiday. Weekly offs are also set in a separate bitmap.
+
+	Membership checks and counts over a range are bit operations on at most one integer per year,
+	so callers can check holidays for many dates and employees without querying `Holiday` again.
+	"""
+
+	def __init__(self, holiday_list: str, years: dict[int, tuple[int, int]]):
+		self.holiday_list = holiday_list
+		# year: (holidays, weekly offs)
+		self.years = years
+
+	@classmethod
+	def build(cls, holiday_list: str) -> "HolidayCalendar":
+		Holiday = frappe.qb.DocType("Holiday")
+		holidays = (
+			frappe.qb.from_(Holiday)
+			.select(Holiday.holiday_date, Holiday.weekly_off)
+			.where((Holiday.parent == holiday_list) & (Holiday.parenttype == "Holiday List"))
+		).run()
+
+		years = {}
+		for holiday_date, weekly_off in holidays:
+			holiday_date = getdate(holiday_date)
+			bit = 1 << day_of_year(holiday_date)
+			holidays_bitmap, weekly_off_bitmap = years.get(holiday_date.year, (0, 0))
+			years[holiday_date.year] = (holidays_bitmap | bit, weekly_off_bitmap | (bit if weekly_off else 0))
+
+		return cls(holiday_list, years)
+
+	def is_holiday(self, for_date, skip_weekly_offs: bool = False) -> bool:
+		for_date = getdate(for_date)
+		return bool(self.get_bitmap(for_date.year, skip_weekly_offs) >> day_of_year(for_date) & 1)
+
+	def is_weekly_off(self, for_date) -> bool:
+		for_date = getdate(for_date)
+		return bool(self.years.get(for_date.year, (0, 0))[1] >> day_of_year(for_date) & 1)
+
+	def count(self, start_date, end_date, skip_weekly_offs: bool = False) -> int:
+		"""Returns the number of holidays between the dates, both inclusive"""
+		return sum(
+			bitmap.bit_count()
+			for _year, _offset, bitmap in self.get_bitmaps(start_date, end_date, skip_weekly_offs)
+		)
+
+	def get_dates(self, start_date, end_date, skip_weekly_offs: bool = False) -> list[date]:
+		"""Returns holidays between the dates in ascending order"""
+		dates = []
+		for year, offset, bitmap in self.get_bitmaps(start_date, end_date, skip_weekly_offs):
+			year_start = date(year, 1, 1).toordinal() + offset
+			while bitmap:
+				lowest_bit = bitmap & -bitmap
+				dates.append(date.fromordinal(year_start + lowest_bit.bit_length() - 1))
+				bitmap ^= lowest_bit
+
+		return dates
+
+	def get_bitmaps(self, start_date, end_date, skip_weekly_offs: bool = False):
+		"""Yields year, offset of the first day in range and the bitmap of holidays in the range for each year"""
+		start_date, end_date = getdate(start_date), getdate(end_date)
+		if start_date > end_date:
+			return
+
+		for year in range(start_date.year, end_date.year + 1):
+			bitmap = self.get_bitmap(year, skip_weekly_offs)
+			if not bitmap:
+				continue
+
+			first_day = day_of_year(start_date) if year == start_date.year else 0
+			last_day = day_of_year(end_date) if year == end_date.year else 365
+			yield year, first_day, (bitmap >> first_day) & ((1 << (last_day - first_day + 1)) - 1)
+
+	def get_bitmap(self, year: int, skip_weekly_offs: bool = False) -> int:
+		holidays, weekly_offs = self.years.get(year, (0, 0))
+		return holidays & ~weekly_offs if skip_weekly_offs else holidays
+
+
+def get_holiday_calendar(holiday_list: str | None) -> HolidayCalendar | None:
+	"""Returns the cached calendar of the holiday list, built on first use after the list changes"""
+	if not holiday_list:
+		return None
+
+	years = frappe.cache().hget(HOLIDAY_CALENDAR, holiday_list)
+	if years is None:
+		years = HolidayCalendar.build(holiday_list).years
+		frappe.cache().hset(HOLIDAY_CALENDAR, holiday_list, years)
+
+	return HolidayCalendar(holiday_list, years)
+
+
+def day_of_year(for_date: date) -> int:
+	return for_date.timetuple().tm_yday - 1
 
 
 def get_holiday_dates_between(
@@ -9,26 +110,22 @@ def get_holiday_dates_between(
 	as_dict: bool = False,
 	select_weekly_off: bool = False,
 ) -> list:
-	Holiday = frappe.qb.DocType("Holiday")
-	query = frappe.qb.from_(Holiday).select(Holiday.holiday_date)
-
-	if select_weekly_off:
-		query = query.select(Holiday.weekly_off)
+	calendar = get_holiday_calendar(holiday_list)
+	if not calendar:
+		return []
 
-	query = query.where(
-		(Holiday.parent == holiday_list) & (Holiday.holiday_date.between(start_date, end_date))
-	)
+	holiday_dates = calendar.get_dates(start_date, end_date, skip_weekly_offs)
+	if not as_dict:
+		return holiday_dates
 
-	if skip_weekly_offs:
-		query = query.where(Holiday.weekly_off == 0)
-
-	if as_dict:
-		return query.run(as_dict=True)
+	holidays = [frappe._dict(holiday_date=holiday_date) for holiday_date in holiday_dates]
+	if select_weekly_off:
+		for holiday in holidays:
+			holiday.weekly_off = int(calendar.is_weekly_off(holiday.holiday_date))
 
-	return query.run(pluck=True)
+	return holidays
 
 
 def invalidate_cache(doc, method=None):
-	from hrms.payroll.doctype.salary_slip.salary_slip import HOLIDAYS_BETWEEN_DATES
-
-	frappe.cache().delete_value(HOLIDAYS_BETWEEN_DATES)
+	"""Clears the calendar of the changed holiday list only"""
+	frappe.cache().hdel(HOLIDAY_CALENDAR, doc.name)
@@ -0,0 +1,185 @@
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from itertools import groupby
+
+import frappe
+from frappe.utils import cint, flt, to_timedelta
+
+ALTERNATING_LOGS = "Alternating entries as IN and OUT during the same shift"
+STRICT_LOG_TYPE = "Strictly based on Log Type in Employee Checkin"
+FIRST_AND_LAST_LOG = "First Check-in and Last Check-out"
+EVERY_VALID_LOG = "Every Valid Check-in and Check-out"
+
+
+class ShiftAttendanceCalculator:
+	"""Computes attendance of a Shift Type's shifts from their check-ins: in and out time, working hours,
+	late entry and early exit, status by the working hours thresholds and overtime.
+
+	Shift Type settings are resolved once, so check-ins of any number of employees and shifts
+	are processed in a single pass. Used by auto attendance, and through the attendance it marks,
+	by Overtime Slips.
+	"""
+
+	def __init__(self, shift_type: dict):
+		self.check_in_out_type = shift_type.determine_check_in_and_check_out
+		self.working_hours_calc_type = shift_type.working_hours_calculation_based_on
+		self.late_entry_grace_period = (
+			timedelta(minutes=cint(shift_type.late_entry_grace_period))
+			if cint(shift_type.enable_late_entry_marking)
+			else None
+		)
+		self.early_exit_grace_period = (
+			timedelta(minutes=cint(shift_type.early_exit_grace_period))
+			if cint(shift_type.enable_early_exit_marking)
+			else None
+		)
+		self.absent_threshold = flt(shift_type.working_hours_threshold_for_absent)
+		self.half_day_threshold = flt(shift_type.working_hours_threshold_for_half_day)
+		self.allow_overtime = cint(shift_type.get("allow_overtime"))
+		self.standard_working_hours = (
+			get_standard_working_hours(shift_type.start_time, shift_type.end_time)
+			if self.allow_overtime
+			else None
+		)
+
+	def calculate_for_shifts(self, logs: list[dict]) -> Iterator[tuple[list[dict], dict]]:
+		"""Yields the logs of every shift with its attendance.
+		Logs of many employees are accepted ordered by employee, shift start and time"""
+		for _key, shift_logs in groupby(logs, key=lambda log: (log.employee, log.shift_start)):
+			shift_logs = list(shift_logs)
+			yield shift_logs, self.calculate(shift_logs)
+
+	def calculate(self, logs: list[dict]) -> dict:
+		"""Returns attendance of a single shift from its logs in chronological order"""
+		working_hours, in_time, out_time = get_working_hours(
+			[log.time for log in logs],
+			[log.get("log_type") for log in logs],
+			self.check_in_out_type,
+			self.working_hours_calc_type,
+		)
+		attendance = frappe._dict(
+			working_hours=working_hours,
+			in_time=in_time,
+			out_time=out_time,
+			late_entry=bool(
+				self.late_entry_grace_period is not None
+				and in_time
+				and in_time > logs[0].shift_start + self.late_entry_grace_period
+			),
+			early_exit=bool(
+				self.early_exit_grace_period is not None
+				and out_time
+				and out_time < logs[0].shift_end - self.early_exit_grace_period
+			),
+			overtime={},
+		)
+
+		if self.absent_threshold and working_hours < self.absent_threshold:
+			attendance.status = "Absent"
+		elif self.half_day_threshold and working_hours < self.half_day_threshold:
+			attendance.status = "Half Day"
+		else:
+			attendance.status = "Present"
+			if self.allow_overtime:
+				attendance.overtime = get_overtime(self.standard_working_hours, working_hours)
+
+		return attendance
+
+
+def get_working_hours(
+	times: list[datetime], log_types: list[str | None], check_in_out_type: str, working_hours_calc_type: str
+) -> tuple[float, datetime | None, datetime | None]:
+	"""Returns total working hours, in time and out time from the times and log types of a shift's logs
+	in chronological order. Zero working hours are returned for all invalid cases.
+
+	:param check_in_out_type: One of: 'Alternating entries as IN and OUT during the same shift', 'Strictly based on Log Type in Employee Checkin'
+	:param working_hours_calc_type: One of: 'First Check-in and Last Check-out', 'Every Valid Check-in and Check-out'
+	"""
+	total_hours = 0
+	in_time = out_time = None
+
+	if check_in_out_type == ALTERNATING_LOGS:
+		in_time = times[0]
+		if len(times) >= 2:
+			out_time = times[-1]
+
+		if working_hours_calc_type == FIRST_AND_LAST_LOG:
+			# assumption in this case: First log always taken as IN, Last log always taken as OUT
+			total_hours = time_diff_in_hours(in_time, times[-1])
+		elif working_hours_calc_type == EVERY_VALID_LOG:
+			total_hours = sum(
+				time_diff_in_hours(start, end) for start, end in zip(times[::2], times[1::2], strict=False)
+			)
+
+	elif check_in_out_type == STRICT_LOG_TYPE:
+		if working_hours_calc_type == FIRST_AND_LAST_LOG:
+			in_time = next(
+				(time for time, log_type in zip(times, log_types, strict=True) if log_type == "IN"), None
+			)
+			out_time = next(
+				(
+					time
+					for time, log_type in zip(reversed(times), reversed(log_types), strict=True)
+					if log_type == "OUT"
+				),
+				None,
+			)
+			if in_time and out_time:
+				total_hours = time_diff_in_hours(in_time, out_time)
+
+		elif working_hours_calc_type == EVERY_VALID_LOG:
+			# pairs an IN with the OUT right after it, logs between a pair not matching the type are ignored
+			pair_in = pair_out = None
+			for time, log_type in zip(times, log_types, strict=True):
+				if pair_in and pair_out:
+					in_time = in_time or pair_in
+					out_time = pair_out
+					total_hours += time_diff_in_hours(pair_in, pair_out)
+					pair_in = pair_out = None
+
+				if not pair_in:
+					pair_in = time if log_type == "IN" else None
+					in_time = in_time or pair_in
+				elif not pair_out:
+					pair_out = time if log_type == "OUT" else None
+
+			if pair_in and pair_out:
+				out_time = pair_out
+				total_hours += time_diff_in_hours(pair_in, pair_out)
+
+	return total_hours, in_time, out_time
+
+
+def get_overtime(standard_working_hours: float, working_hours: float) -> dict:
+	"""Returns the standard working hours and overtime duration if the working hours exceed the standard"""
+	if working_hours > standard_working_hours:
+		return {
+			"standard_working_hours": standard_working_hours,
+			"actual_overtime_duration": working_hours - standard_working_hours,
+		}
+
+	return {}
+
+
+def get_payable_overtime_duration(
+	actual_overtime_duration: float, maximum_overtime_hours_allowed: float
+) -> float:
+	"""Returns the overtime duration capped at the Overtime Type's maximum, if set"""
+	overtime_duration = flt(actual_overtime_duration)
+	if flt(maximum_overtime_hours_allowed) > 0:
+		return min(overtime_duration, flt(maximum_overtime_hours_allowed))
+
+	return overtime_duration
+
+
+def get_standard_working_hours(start_time: timedelta | str, end_time: timedelta | str) -> float:
+	# times are strings on unsaved docs or docs built from client side values
+	start_time, end_time = to_timedelta(start_time), to_timedelta(end_time)
+	if end_time < start_time:
+		end_time += timedelta(days=1)
+
+	return round(abs(end_time - start_time).total_seconds() / 3600, 2)
+
+
+def time_diff_in_hours(start: datetime, end: datetime) -> float:
+	return round(float((end - start).total_seconds()) / 3600, 2)